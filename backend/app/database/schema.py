@@ -0,0 +1,49 @@
+"""
+In-place schema upgrades for existing databases.
+
+`Base.metadata.create_all` creates missing tables but never changes existing ones, so
+columns added to a model after its table was first created are added here at startup.
+Every step checks the live schema first and is safe to run on every start.
+"""
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# Columns added to existing tables: (table, column, column definition)
+ADDED_COLUMNS = [
+    ("mcp_server_settings", "tool_catalog", "VARCHAR"),
+    ("mcp_server_settings", "manifest_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("mcp_server_settings", "transport", "VARCHAR"),
+    ("tool_permissions", "cache_ttl_seconds", "INTEGER"),
+    ("tool_permissions", "timeout_seconds", "INTEGER"),
+]
+
+
+def add_missing_columns(connection: Connection) -> List[str]:
+    """
+    Adds every column of ADDED_COLUMNS that an existing table lacks.
+    Run with `AsyncConnection.run_sync` after `create_all`.
+
+    Returns:
+        list: "table.column" for each column added.
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    existing = {}
+    added = []
+    for table, column, definition in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        if table not in existing:
+            existing[table] = {c["name"] for c in inspector.get_columns(table)}
+        if column in existing[table]:
+            continue
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+        existing[table].add(column)
+        added.append(f"{table}.{column}")
+        logger.info(f"Added missing column {table}.{column}")
+    return added
@@ -6,6 +6,7 @@ import nest_asyncio
 from .routes import agent,auth,user,settings,tool_permissions,tool_execution,providers
 from fastapi.middleware.cors import CORSMiddleware
 from .database import database
+from .database.schema import add_missing_columns
 from contextlib import asynccontextmanager
 
 
@@ -30,6 +31,10 @@ async def lifespan(app: FastAPI):
     try:
         async with database.engine.begin() as conn:
             await conn.run_sync(database.Base.metadata.create_all)
+            # create_all never alters existing tables; add columns introduced since
+            added = await conn.run_sync(add_missing_columns)
+        if added:
+            print(f"✅ Added missing columns: {', '.join(added)}")
         print("✅ Database tables initialized successfully.")
     except Exception as e:
         print(f"❌ Error during database table initialization: {e}")
@@ -85,6 +90,10 @@ async def lifespan(app: FastAPI):
             # Swallow ALL errors during shutdown cancellation to prevent "RuntimeError: cancel scope" noise.
             # This is harmless as the server is dying anyway.
             pass
+
+    # Close pooled MCP sessions
+    from .services.mcp.session_pool import session_pool
+    await session_pool.close_all()
             
     print("Lifespan: Server shutdown complete.")
 
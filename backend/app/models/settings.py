@@ -34,7 +34,10 @@ class McpServerSetting(database.Base):
         
         # Caching
         tools_manifest (str): Cached JSON of available tools to avoid network calls on every turn.
+        tool_catalog (str): Precompiled catalog built from the manifest at refresh time (see tool_catalog.py).
+        manifest_version (int): Bumped whenever a refresh adds, removes or changes a tool, or rewrites the stored catalog.
         last_synced_at (DateTime): When the tool cache was last updated.
+        transport (str): Transport that last worked for this server ("sse" or "streamable_http").
     """
     __tablename__ = "mcp_server_settings"
 
@@ -56,7 +59,10 @@ class McpServerSetting(database.Base):
     
     # Caching columns
     tools_manifest = Column(String, nullable=True) # JSON cache of tools list
+    tool_catalog = Column(String, nullable=True) # JSON catalog: sanitized schemas, descriptions, BM25 docs
+    manifest_version = Column(Integer, default=0, nullable=False, server_default="0") # Bumped on tool changes
     last_synced_at = Column(DateTime, nullable=True) # Timestamp of last refresh
+    transport = Column(String, nullable=True) # Discovered MCP transport, tried first on new sessions
 
     # Relationships
     tool_permissions = relationship("ToolPermission", back_populates="server_setting", cascade="all, delete-orphan")
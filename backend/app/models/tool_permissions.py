@@ -12,6 +12,10 @@ class ToolPermission(Base):
     server_setting_id = Column(Integer, ForeignKey("mcp_server_settings.id"), nullable=False)
     tool_name = Column(String(255), nullable=False)
     is_enabled = Column(Boolean, default=True, nullable=False)
+    # Result cache TTL in seconds. NULL = use the tool's readOnlyHint, 0 = never cache
+    cache_ttl_seconds = Column(Integer, nullable=True)
+    # Call timeout in seconds. NULL = adaptive (learned from observed latency)
+    timeout_seconds = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -30,7 +30,7 @@ import asyncio
 
 # --- MODIFIED: Import the parameterized agent factory, not the global one ---
 from app.services.agent.agent_factory import get_session_memory, get_llm
-from ..services.agent_manager import get_or_create_agent
+from ..services.agent_manager import get_or_create_agent, schedule_warm_up
 # --- NEW: Import for fetching user-specific data ---
 from app.services.mcp.config import get_user_servers
 
@@ -61,6 +61,7 @@ async def ask_agent_stream(
     model_provider: str = Query("gemini"), # new param
     model: str = Query("gemini-2.5-flash"), # new param, renamed from model_name for cleaner URL
     resume: bool = Query(False), # New param for resuming interrupted sessions
+    tool_token_budget: Optional[int] = Query(None, ge=0), # Prompt tokens for bound tool schemas (0 = no limit)
     db: AsyncSession = Depends(database.get_db),
 ) -> EventSourceResponse:
     """
@@ -129,6 +130,8 @@ async def ask_agent_stream(
     
     agent_input = {"input": prompt, "chat_history": chat_history} if not resume else {}
     config = {"configurable": {"user_id": user_id, "thread_id": actual_session_id}}
+    if tool_token_budget is not None:
+        config["configurable"]["tool_token_budget"] = tool_token_budget
     
     # Notify user of start (if not resuming, although the service handles some notifications, 
     # we can yield an initial event here if strictly necessary, but the service works better)
@@ -147,6 +150,21 @@ async def ask_agent_stream(
 
 
 
+# Route to pre-build the agent and open MCP sessions when the chat UI opens
+@router.post("/api/agent/warmup", status_code=status.HTTP_202_ACCEPTED)
+async def warm_up_agent(
+    model_provider: str = Query("gemini"),
+    model: str = Query("gemini-2.5-flash"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Starts building the user's agent and opening their MCP sessions in the background,
+    so the first prompt finds everything warm. Returns immediately.
+    """
+    started = schedule_warm_up(current_user.id, model_provider, model)
+    return {"status": "warming" if started else "already_warming"}
+
+
 # --- UNCHANGED: Your other routes for managing chat history are fine ---
 
 @router.get("/api/chats/", response_model=List[Dict])
@@ -7,6 +7,7 @@ from ..auth.hashing import Hash
 from ..auth.oauth2 import get_current_user
 from ..auth import jwt_token
 from fastapi.security import OAuth2PasswordRequestForm
+from ..services.agent_manager import schedule_session_warm_up
 
 router = APIRouter(tags=["Auth"])
 
@@ -65,5 +66,10 @@ async def login(request: OAuth2PasswordRequestForm = Depends(), db: AsyncSession
     access_token = jwt_token.create_access_token(
         data={"sub": user.email})
 
+    # Open MCP sessions while the client loads the chat. The agent itself is warmed by the
+    # chat view for the model it selects (POST /api/agent/warmup); warming a default model
+    # here would race that build for the user's single cached agent.
+    schedule_session_warm_up(user.id)
+
     return {"access_token": access_token, "token_type": "bearer"}
 
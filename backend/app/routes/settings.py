@@ -8,7 +8,9 @@ from pydantic import BaseModel
 from fastapi import APIRouter
 from ..schemas.settings import McpServerSettingCreate, McpServerSettingRead, McpServerSettingUpdate
 from ..models.settings import McpServerSetting 
-from ..services.mcp.connector import MCPConnector
+from ..services.mcp.connector import MCPConnector, invalidate_tools_cache
+from ..services.mcp.circuit_breaker import server_health
+from ..services.mcp.retry_policy import retry_stats
 from ..auth.oauth2 import get_current_user
 from ..models import User
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -66,7 +68,10 @@ async def _refresh_manifest_internal(setting_id: int, db: AsyncSession, current_
             pass
             
     # 2. Connect and Fetch Tools
-    # 2. Connect and Fetch Tools
+    # Drop cached tool lists (all credentials) and make fetches already in flight discard
+    # their results; the refresh itself bypasses the cache and doesn't join those fetches
+    invalidate_tools_cache(db_setting.server_url)
+
     # Let exceptions bubble up so they can be handled by the caller or global exception handler
     connector = MCPConnector(
         server_url=db_setting.server_url,
@@ -74,13 +79,42 @@ async def _refresh_manifest_internal(setting_id: int, db: AsyncSession, current_
         server_name=db_setting.server_name,
         setting_id=setting_id,
         oauth_config=oauth_config,
-        db_session=db
+        db_session=db,
+        transport=db_setting.transport
     )
-    tools = await connector.list_tools()
+    tools = await connector.list_tools(force=True)
     
-    # 3. Update Database
+    # 3. Update Database (raw manifest + the precompiled catalog agent builds load directly)
     import datetime
-    db_setting.tools_manifest = json.dumps(tools)
+    from ..services.agent.tool_catalog import build_tool_catalog, load_tool_catalog, diff_tool_catalogs, has_changes
+    new_catalog = build_tool_catalog(tools, db_setting.server_name)
+    old_catalog = load_tool_catalog(db_setting.tool_catalog, db_setting.server_name, db_setting.tools_manifest)
+    diff = diff_tool_catalogs(old_catalog, new_catalog)
+
+    if has_changes(diff):
+        # Cached agents compare this version and patch in only the affected tools
+        db_setting.manifest_version = (db_setting.manifest_version or 0) + 1
+        logger.info(
+            f"Tools changed for server '{db_setting.server_name}' (v{db_setting.manifest_version}): "
+            f"added={diff['added']}, removed={diff['removed']}, changed={diff['changed']}"
+        )
+    # Unchanged tools: leave the stored manifest alone unless the catalog needs regenerating
+    # (older rows, format bumps, renamed servers, reordered tool lists)
+    try:
+        stored_catalog = json.loads(db_setting.tool_catalog) if db_setting.tool_catalog else {}
+    except Exception:
+        stored_catalog = {}
+    catalog_current = (
+        stored_catalog.get("format") == new_catalog["format"]
+        and stored_catalog.get("server_name") == new_catalog["server_name"]
+        and stored_catalog.get("content_hash") == new_catalog["content_hash"]
+    )
+    if has_changes(diff) or not catalog_current:
+        if not has_changes(diff):
+            # Parsed catalogs are cached per manifest_version; a rewritten catalog needs a new one
+            db_setting.manifest_version = (db_setting.manifest_version or 0) + 1
+        db_setting.tools_manifest = json.dumps(tools)
+        db_setting.tool_catalog = json.dumps(new_catalog)
     db_setting.last_synced_at = datetime.datetime.utcnow()
     db.add(db_setting)
     await db.commit()
@@ -262,6 +296,49 @@ async def delete_mcp_setting(
 
 
 
+# Route to get connection health for the user's MCP servers
+@router.get("/api/mcp/health")
+async def get_mcp_health(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(database.get_db)
+):
+    """
+    Returns circuit-breaker health (closed / open / half_open) and retry counters for each
+    of the user's servers.
+    """
+    statement = select(McpServerSetting).where(McpServerSetting.user_id == current_user.id)
+    result = await db.execute(statement)
+    settings = result.scalars().all()
+    return {
+        setting.server_name: {
+            "id": setting.id,
+            **server_health(setting.server_url),
+            "retries": retry_stats(setting.server_url),
+        }
+        for setting in settings
+    }
+
+# Route to get in-process cache and pool counters (diagnostics)
+@router.get("/api/mcp/cache-stats")
+async def get_mcp_cache_stats(current_user: User = Depends(get_current_user)):
+    """
+    Returns size and hit/miss counters of the MCP session pool, the tools/list cache, the
+    compiled tool-schema cache, the shared tool search indexes and the tool search result
+    cache for this worker process.
+    """
+    from ..services.mcp.session_pool import session_pool
+    from ..services.mcp.connector import _TOOLS_CACHE
+    from ..services.agent.schema_cache import schema_model_cache
+    from ..services.agent.shared_index import shared_index_stats
+    from ..services.agent.search_cache import search_result_cache
+    return {
+        "session_pool": session_pool.snapshot(),
+        "tools_cache": _TOOLS_CACHE.snapshot(),
+        "schema_cache": schema_model_cache.snapshot(),
+        "search_indexes": shared_index_stats(),
+        "search_cache": search_result_cache.snapshot(),
+    }
+
 # Route to get server presets
 @router.get("/api/mcp/presets")
 async def get_server_presets():
@@ -342,7 +419,8 @@ async def list_server_tools(
             credentials=credentials,
             server_name=db_setting.server_name,
             setting_id=setting_id,
-            oauth_config=oauth_config
+            oauth_config=oauth_config,
+            transport=db_setting.transport
         )
         tools = await connector.list_tools()
         return {"status": "success", "tools": tools}
@@ -11,6 +11,8 @@ from ..models.user import User
 import httpx
 from datetime import datetime, timedelta
 from app.services.mcp.connector import MCPConnector
+from app.services.mcp.latency import get_latency_stats, list_tracked_tools
+from app.services.security.permissions import invalidate_approval_cache
 
 
 router = APIRouter(prefix="/api", tags=["tool-permissions"])
@@ -21,12 +23,22 @@ class ToolInfo(BaseModel):
     name: str
     description: str | None = None
     is_enabled: bool = True
+    read_only: bool = False
+    cache_ttl_seconds: int | None = None
+    timeout_seconds: int | None = None
 
 
 class ToolToggleRequest(BaseModel):
     is_enabled: bool
 
 
+class ToolSettingsRequest(BaseModel):
+    # None = follow the tool's readOnlyHint, 0 = never cache, >0 = cache results for N seconds
+    cache_ttl_seconds: int | None = None
+    # None = adaptive (learned from observed latency), >0 = fixed call timeout in seconds
+    timeout_seconds: int | None = None
+
+
 class ToolApprovalRequest(BaseModel):
     tool_name: str
     server_name: str | None = None
@@ -88,7 +100,8 @@ async def get_server_tools(
             credentials=credentials,
             server_name=server_name,
             setting_id=server_id,
-            oauth_config=oauth_config
+            oauth_config=oauth_config,
+            transport=server_setting.transport
         )
         # MCPConnector.list_tools returns List[Dict] directly
         tools_data = await connector.list_tools()
@@ -109,6 +122,8 @@ async def get_server_tools(
     permissions = result.scalars().all()
     
     permission_map = {p.tool_name: p.is_enabled for p in permissions}
+    cache_ttl_map = {p.tool_name: p.cache_ttl_seconds for p in permissions}
+    timeout_map = {p.tool_name: p.timeout_seconds for p in permissions}
     
     # Combine tools with permission status
     result = []
@@ -118,7 +133,10 @@ async def get_server_tools(
         result.append(ToolInfo(
             name=tool_name,
             description=tool.get("description"),
-            is_enabled=permission_map.get(tool_name, True)  # Default to enabled
+            is_enabled=permission_map.get(tool_name, True),  # Default to enabled
+            read_only=bool((tool.get("annotations") or {}).get("readOnlyHint")),
+            cache_ttl_seconds=cache_ttl_map.get(tool_name),
+            timeout_seconds=timeout_map.get(tool_name)
         ))
     
     return result
@@ -176,6 +194,110 @@ async def toggle_tool(
     return {"message": f"Tool {tool_name} {'enabled' if request.is_enabled else 'disabled'}", "is_enabled": permission.is_enabled}
 
 
+@router.patch("/mcp/settings/{server_id}/tools/{tool_name}/settings")
+async def update_tool_settings(
+    server_id: int,
+    tool_name: str,
+    request: ToolSettingsRequest,
+
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Update per-tool execution settings (result cache TTL, call timeout).
+    Only the fields present in the request body are changed.
+    """
+    # Verify server belongs to user
+    result = await db.execute(
+        select(McpServerSetting).filter(
+            McpServerSetting.id == server_id,
+            McpServerSetting.user_id == current_user.id
+        )
+    )
+    server_setting = result.scalars().first()
+    
+    if not server_setting:
+        raise HTTPException(status_code=404, detail="Server not found")
+
+    if request.cache_ttl_seconds is not None and request.cache_ttl_seconds < 0:
+        raise HTTPException(status_code=400, detail="cache_ttl_seconds must be >= 0")
+    if request.timeout_seconds is not None and request.timeout_seconds <= 0:
+        raise HTTPException(status_code=400, detail="timeout_seconds must be > 0")
+    updates = request.model_dump(exclude_unset=True)
+    
+    # Find or create tool permission
+    result = await db.execute(
+        select(ToolPermission).filter(
+            ToolPermission.user_id == current_user.id,
+            ToolPermission.server_setting_id == server_id,
+            ToolPermission.tool_name == tool_name
+        )
+    )
+    permission = result.scalars().first()
+    
+    if permission:
+        for field, value in updates.items():
+            setattr(permission, field, value)
+        permission.updated_at = datetime.utcnow()
+    else:
+        permission = ToolPermission(
+            user_id=current_user.id,
+            server_setting_id=server_id,
+            tool_name=tool_name,
+            is_enabled=True,
+            **updates
+        )
+        db.add(permission)
+    
+    await db.commit()
+    await db.refresh(permission)
+    
+    return {
+        "message": f"Settings updated for {tool_name}",
+        "cache_ttl_seconds": permission.cache_ttl_seconds,
+        "timeout_seconds": permission.timeout_seconds,
+    }
+
+
+@router.get("/mcp/settings/{server_id}/tools/latency")
+async def get_tool_latency(
+    server_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get learned latency percentiles and the effective call timeout for each tool of a server.
+    """
+    result = await db.execute(
+        select(McpServerSetting).filter(
+            McpServerSetting.id == server_id,
+            McpServerSetting.user_id == current_user.id
+        )
+    )
+    server_setting = result.scalars().first()
+    
+    if not server_setting:
+        raise HTTPException(status_code=404, detail="Server not found")
+
+    result = await db.execute(
+        select(ToolPermission).filter(
+            ToolPermission.user_id == current_user.id,
+            ToolPermission.server_setting_id == server_id
+        )
+    )
+    timeout_map = {p.tool_name: p.timeout_seconds for p in result.scalars().all()}
+
+    latency = {}
+    for tool_name in await list_tracked_tools(server_setting.server_url):
+        stats = await get_latency_stats(server_setting.server_url, tool_name)
+        override = timeout_map.get(tool_name)
+        stats["timeout_override"] = override
+        if override:
+            stats["timeout_seconds"] = override
+        latency[tool_name] = stats
+    return latency
+
+
 @router.get("/tool-approvals", response_model=List[ToolApprovalResponse])
 async def get_tool_approvals(
     db: AsyncSession = Depends(get_db),
@@ -235,6 +357,7 @@ async def create_tool_approval(
         db.add(approval)
     
     await db.commit()
+    invalidate_approval_cache(current_user.id)
     await db.refresh(approval)
     
     return approval
@@ -262,8 +385,7 @@ async def delete_tool_approval(
     
     await db.delete(approval)
     await db.commit()
-    
-    await db.commit()
+    invalidate_approval_cache(current_user.id)
     
     return {"message": f"Approval for {tool_name} removed"}
 
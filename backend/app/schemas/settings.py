@@ -35,6 +35,7 @@ class McpServerSettingUpdate(BaseModel):
 class McpServerSettingRead(McpServerSettingCreate):
     id: int
     user_id: str
+    transport: Optional[str] = None
 
 # A plausible definition for McpConnectionTestRequest
 class McpConnectionTestRequest(BaseModel):
@@ -1,6 +1,6 @@
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from langchain.agents import create_tool_calling_agent
 
@@ -9,7 +9,7 @@ from langchain.agents import create_tool_calling_agent
 from .patches import apply_gemini_patch
 from .prompts import build_agent_prompt, build_langgraph_prompt
 from .llm_factory import get_llm
-from .tools import build_tools_from_servers
+from .tools import build_tools_from_servers, server_tool_state
 from .memory import get_session_memory
 # Import Checkpointer Factory
 from .checkpointer_factory import get_checkpointer
@@ -27,7 +27,8 @@ async def create_final_agent_pipeline(
     user_mcp_servers: Dict[str, Any], 
     user_id: str = None,
     model_provider: str = "gemini",
-    model_name: str = "gemini-2.5-flash"
+    model_name: str = "gemini-2.5-flash",
+    tool_permissions: Optional[Dict[int, Dict[str, Any]]] = None
 ) -> Any:
     """
     Creates a user-specific AgentExecutor pipeline on-demand.
@@ -43,6 +44,8 @@ async def create_final_agent_pipeline(
         user_id (str, optional): The ID of the authenticated user.
         model_provider (str): The name of the LLM provider (default: "gemini").
         model_name (str): The specific model version to use.
+        tool_permissions (dict, optional): The user's `ToolPermission` rows by server setting id
+            and tool name, if the caller already loaded them (see `tools.fetch_tool_permissions`).
 
     Returns:
         GraphAgentExecutor: An initialized executor ready to handle user queries.
@@ -52,8 +55,11 @@ async def create_final_agent_pipeline(
     llm = get_llm(model_provider, model_name)
     
     # 2. Build Tools (User Specific)
-    # Pass blocking=False because the Graph handles permissions via 'human_review' node/interrupts
-    all_tools = await build_tools_from_servers(user_mcp_servers, user_id=user_id, blocking=False)
+    # Pass blocking=False because the Graph handles permissions via 'human_review' node/interrupts.
+    # These are lightweight descriptors; the registry builds a StructuredTool when one is bound or called.
+    all_tools = await build_tools_from_servers(
+        user_mcp_servers, user_id=user_id, blocking=False, tool_permissions=tool_permissions
+    )
     
 
     logger.info(f"Agent created with {len(all_tools)} tools: {[t.name for t in all_tools]}")
@@ -80,13 +86,23 @@ async def create_final_agent_pipeline(
     langgraph_prompt = build_langgraph_prompt()
     
     # Pass model_provider to enable conditional tool nodes
-    graph = create_graph_agent(llm, all_tools, langgraph_prompt, model_provider=model_provider)
+    graph = create_graph_agent(llm, all_tools, langgraph_prompt, model_provider=model_provider, tool_registry=tool_registry)
     
     # Compile with checkpointer to enable interrupts
     app = graph.compile(checkpointer=checkpointer, interrupt_before=["human_review"])
     
     # Wrap in compatibility layer
-    agent_executor = GraphAgentExecutor(app, checkpointer=checkpointer, tool_registry=tool_registry)
+    # Per-server tool state lets agent_manager patch manifest and permission changes in
+    # without a rebuild; servers without a recorded state are re-synced on first use
+    server_states = {}
+    if tool_permissions is not None:
+        server_states = {
+            name: server_tool_state(info, tool_permissions)
+            for name, info in user_mcp_servers.items() if isinstance(info, dict)
+        }
+    agent_executor = GraphAgentExecutor(
+        app, checkpointer=checkpointer, tool_registry=tool_registry, server_states=server_states
+    )
     logger.info("Successfully created LangGraph agent.")
     
     return agent_executor
\ No newline at end of file
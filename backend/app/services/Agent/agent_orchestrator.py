@@ -5,14 +5,16 @@ from typing import TypedDict, Annotated, Sequence, List, Dict, Any, Union, Optio
 from langchain_core.messages import BaseMessage, FunctionMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
 from langgraph.graph import StateGraph, END, add_messages
 from langgraph.prebuilt import ToolNode
 
 from .tools import build_tools_from_servers
+from .tool_budget import resolve_budget, select_tools
 from .llm_factory import get_llm
 from .prompts import build_agent_prompt
-from app.services.security.permissions import check_tool_approval, PendingApproval
-from app.database.database import AsyncSessionLocal
+from app.services.security.permissions import check_tool_approval, get_standing_approvals, PendingApproval
+from app.services.mcp.circuit_breaker import is_server_available
 
 logger = logging.getLogger(__name__)
 
@@ -204,97 +206,104 @@ async def route_tools(state: AgentState, config: RunnableConfig) -> str:
     
     requires_approval = False
     
-    # We need to check permissions against DB
+    # We need to check permissions against the user's standing approvals
     if user_id:
-        async with AsyncSessionLocal() as db:
-            from app.models import ToolApproval
-            from sqlalchemy.future import select
-            from datetime import datetime
-
-            # Attempt to strip server prefix if present (format: ServerName_ToolName)
-            # This is heuristic but necessary given the deduplication logic.
-            from ...services.agent.tools import _deduplicate_tool_names # Just for reference
-            
-            # Check all tools in one batch query
-            actual_tool_calls = [tc for tc in tool_calls if tc["name"] != "search_tools"]
+        # Attempt to strip server prefix if present (format: ServerName_ToolName)
+        # This is heuristic but necessary given the deduplication logic.
+        from ...services.agent.tools import deduplicate_tool_names # Just for reference
+        
+        # Check all tools against the user's standing approvals
+        actual_tool_calls = [tc for tc in tool_calls if tc["name"] != "search_tools"]
+        
+        if actual_tool_calls:
+            # Sanitize tool names for DB check
+            # We assume the user approves the "Raw" tool name or we need to store the unique name.
+            # Currently permissions logic seems to use RAW names.
+            # We'll try to check BOTH unique name and raw name (by splitting).
             
-            if actual_tool_calls:
-                # Sanitize tool names for DB check
-                # We assume the user approves the "Raw" tool name or we need to store the unique name.
-                # Currently permissions logic seems to use RAW names.
-                # We'll try to check BOTH unique name and raw name (by splitting).
+            names_to_check = []
+            for tc in actual_tool_calls:
+                t_name = tc["name"]
+                names_to_check.append(t_name)
+                if "_" in t_name:
+                     # Try stripping first part (ServerName_ToolName)
+                     parts = t_name.split("_", 1)
+                     if len(parts) == 2:
+                         names_to_check.append(parts[1])
+
+            try:
+                # Standing approvals come from the per-user in-memory cache (one query on a miss)
+                approvals = await get_standing_approvals(user_id)
+                approval_map = {name: approvals[name] for name in names_to_check if name in approvals}
+            except Exception as e:
+                 logger.error(f"Error checking tool approvals: {e}")
+                 approval_map = {} # Fail allowed (fallback to needs_approval=True)
+
+            for tool_call in actual_tool_calls:
+                tool_name = tool_call["name"]
                 
-                names_to_check = []
-                for tc in actual_tool_calls:
-                    t_name = tc["name"]
-                    names_to_check.append(t_name)
-                    if "_" in t_name:
-                         # Try stripping first part (ServerName_ToolName)
-                         parts = t_name.split("_", 1)
-                         if len(parts) == 2:
-                             names_to_check.append(parts[1])
-
-                try:
-                    stmt = select(ToolApproval).where(
-                        ToolApproval.user_id == user_id,
-                        ToolApproval.tool_name.in_(names_to_check)
-                    )
-                    result = await db.execute(stmt)
-                    # Map both raw and unique names if found
-                    approvals = result.scalars().all()
-                    approval_map = {}
-                    for a in approvals:
-                        approval_map[a.tool_name] = a
-                        
-                except Exception as e:
-                     logger.error(f"Error checking tool approvals: {e}")
-                     approval_map = {} # Fail allowed (fallback to needs_approval=True)
-
-                for tool_call in actual_tool_calls:
-                    tool_name = tool_call["name"]
-                    
-                    # Whitelist internal tools
-                    if tool_name.startswith("_"):
-                        continue
-                        
-                    # Check unique name then raw name
-                    approval = approval_map.get(tool_name)
-                    if not approval and "_" in tool_name:
-                         raw_name = tool_call["name"].split("_", 1)[1]
-                         approval = approval_map.get(raw_name)
-
-                    needs_approval = True
+                # Whitelist internal tools
+                if tool_name.startswith("_"):
+                    continue
                     
-                    if approval:
-                        # Check expiry
-                        is_expired = approval.expires_at and approval.expires_at < datetime.utcnow()
-                        if not is_expired and approval.approval_type == 'always':
-                            needs_approval = False
+                # Check unique name then raw name
+                approval = approval_map.get(tool_name)
+                if not approval and "_" in tool_name:
+                     raw_name = tool_call["name"].split("_", 1)[1]
+                     approval = approval_map.get(raw_name)
+
+                needs_approval = True
+                
+                if approval:
+                    # Check expiry
+                    if not approval.is_expired() and approval.approval_type == 'always':
+                        needs_approval = False
+                
+                if needs_approval:
+                    requires_approval = True
+                    # Attempt to extract server name from tool name (format: ServerName_ToolName)
+                    derived_server_name = "unknown"
+                    if "_" in tool_name:
+                        parts = tool_name.split("_", 1)
+                        if len(parts) == 2:
+                            derived_server_name = parts[0]
                     
-                    if needs_approval:
-                        requires_approval = True
-                        # Attempt to extract server name from tool name (format: ServerName_ToolName)
-                        derived_server_name = "unknown"
-                        if "_" in tool_name:
-                            parts = tool_name.split("_", 1)
-                            if len(parts) == 2:
-                                derived_server_name = parts[0]
-                        
-                        approval_id = PendingApproval.create(
-                            user_id=user_id,
-                            tool_name=tool_name, 
-                            server_name=derived_server_name,
-                            tool_input=tool_call.get('args', {})
-                        )
-                        logger.info(f"Blocking tool {tool_name} for approval. Created PendingApproval ID: {approval_id}")
-                        print(f"DEBUG: route_tools BLOCKED {tool_name} -> {approval_id}")
-                    else:
-                        print(f"DEBUG: route_tools ALLOWED {tool_name} (pre-approved)")                    
+                    approval_id = PendingApproval.create(
+                        user_id=user_id,
+                        tool_name=tool_name, 
+                        server_name=derived_server_name,
+                        tool_input=tool_call.get('args', {})
+                    )
+                    logger.info(f"Blocking tool {tool_name} for approval. Created PendingApproval ID: {approval_id}")
+                    print(f"DEBUG: route_tools BLOCKED {tool_name} -> {approval_id}")
+                else:
+                    print(f"DEBUG: route_tools ALLOWED {tool_name} (pre-approved)")                    
     if requires_approval:
         return "human_review"
     else:
         return "tools"
 
+def _latest_user_text(messages: Sequence[BaseMessage]) -> str:
+    """Text of the most recent user message, used to rank tools for binding."""
+    for msg in reversed(messages):
+        if getattr(msg, "type", None) == "human":
+            content = msg.content
+            if isinstance(content, list):
+                return " ".join(
+                    str(block.get("text", "")) if isinstance(block, dict) else str(block)
+                    for block in content
+                )
+            return str(content)
+    return ""
+
+def _called_tool_names(messages: Sequence[BaseMessage]) -> List[str]:
+    """Names of the tools the agent has called so far in this conversation."""
+    return [
+        tc["name"]
+        for msg in messages
+        for tc in (getattr(msg, "tool_calls", None) or [])
+    ]
+
 # --- Graph Construction ---
 
 def create_graph_agent(llm, tools, prompt):
@@ -309,7 +318,7 @@ from functools import partial
 
 # --- Graph Construction ---
 
-def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
+def create_graph_agent(llm, tools, prompt, model_provider="gemini", tool_registry=None):
     """
     Builds and compiles the LangGraph StateGraph for the agent.
 
@@ -321,15 +330,22 @@ def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
 
     Args:
         llm: The Language Model instance.
-        tools: List of available LangChain tools.
+        tools: List of available tools; LangChain tools or lazy descriptors (see `tools.ToolDescriptor`).
         prompt: The system chat prompt template.
         model_provider (str): The provider name (e.g., "gemini") to adapt node logic if needed.
+        tool_registry (ToolRegistry, optional): Registry that builds and caches descriptors when they
+            are bound or called. A private one holding `tools` is created if omitted.
 
     Returns:
         StateGraph: The uncompiled LangGraph workflow definition.
     """
     workflow = StateGraph(AgentState)
 
+    if tool_registry is None:
+        from .tool_registry import ToolRegistry
+        tool_registry = ToolRegistry()
+        tool_registry.register_tools(tools)
+
     # 1. Define Logic (Inner Function to capture scope)
     async def agent_node(state: AgentState, config: RunnableConfig):
         """
@@ -348,10 +364,13 @@ def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
         # Let's assume we bind the tools passed in.
         
         # Check for tool_registry in config
-        tool_registry = config.get("configurable", {}).get("tool_registry")
-        current_tools = list(tools) # Copy initial tools
+        registry = config.get("configurable", {}).get("tool_registry") or tool_registry
+        # Registered tools are read live, so tools patched into the registry after a
+        # manifest refresh are picked up; built-in tools (search_tools) come from `tools`
+        current_tools = [t for t in tools if registry.get_descriptor(t.name) is None] + registry.list_tools()
+        discovered = []
         
-        if tool_registry:
+        if registry:
             # Check if last message was a tool output from "search_tools"
             last_msg = state["messages"][-1]
             if isinstance(last_msg, ToolMessage) and last_msg.name == "search_tools":
@@ -365,17 +384,44 @@ def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
                      if isinstance(found_tools_data, list):
                          for t_data in found_tools_data:
                              t_name = t_data.get("name")
-                             t_inst = tool_registry.get_tool(t_name)
+                             t_inst = registry.get_descriptor(t_name)
                              if t_inst:
-                                 current_tools.append(t_inst)
-                         logger.info(f"Dynamically added tools: {[t.name for t in current_tools if t not in tools]}")
+                                 # Already candidates; pinning makes sure they are bound
+                                 discovered.append(t_name)
+                         logger.info(f"Dynamically added tools: {discovered}")
                  except Exception as e:
                      logger.error(f"Failed to parse search_tools output: {e}")
 
-        # Bind tools to LLM
-        # Add search_tools if not present and registry is available? 
-        # Actually search_tools should be in the initial 'tools' list if enabled.
-        
+        # Hide tools whose MCP server is currently down (circuit open) so the LLM
+        # doesn't pick them and stall the turn; they come back once the server recovers.
+        unavailable = [
+            t.name for t in current_tools
+            if not is_server_available((t.metadata or {}).get("server_url"))
+        ]
+        if unavailable:
+            logger.warning(f"agent_node: Skipping {len(unavailable)} tools from unavailable servers: {unavailable}")
+            current_tools = [t for t in current_tools if t.name not in unavailable]
+
+        # Keep bound schemas within the prompt-token budget; the rest stay reachable via search_tools
+        budget = resolve_budget(config.get("configurable", {}).get("tool_token_budget"))
+        pinned = [t.name for t in current_tools if registry.get_descriptor(t.name) is None] + discovered
+        current_tools, bound_tokens = select_tools(
+            current_tools,
+            budget,
+            relevance=registry.relevance_scores(_latest_user_text(state["messages"])) if budget > 0 else {},
+            usage=registry.usage_counts(),
+            pinned=pinned,
+            conversation_tools=_called_tool_names(state["messages"]),
+        )
+        logger.info(f"agent_node: Tool schemas use ~{bound_tokens} tokens (budget: {budget or 'unlimited'})")
+
+        # Build only what gets bound; the registry caches built tools across turns
+        current_tools = [
+            t if isinstance(t, BaseTool) else registry.get_tool(t.name)
+            for t in current_tools
+        ]
+        current_tools = [t for t in current_tools if t is not None]
+
         logger.info(f"agent_node: Binding {len(current_tools)} tools to LLM...")
         llm_with_tools = llm.bind_tools(current_tools)
         
@@ -402,10 +448,11 @@ def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
         This allows partial execution: denied tools have error responses injected,
         and this node only executes the remaining approved tools.
         """
-        def __init__(self, tools_list):
-            from langgraph.prebuilt import ToolNode
-            self._inner_tool_node = ToolNode(tools_list)
-            self._tools_by_name = {t.name: t for t in tools_list}
+        def __init__(self, tools_list, registry):
+            # Already-built tools (e.g. search_tools) are used as-is; descriptors are
+            # resolved (and built on first use) through the registry
+            self._tools_by_name = {t.name: t for t in tools_list if isinstance(t, BaseTool)}
+            self._registry = registry
             
         async def __call__(self, state: AgentState, config: RunnableConfig = None):
             messages = state.get("messages", [])
@@ -439,11 +486,12 @@ def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
                     continue
                 
                 # Execute the tool
-                tool = self._tools_by_name.get(tool_name)
+                tool = self._tools_by_name.get(tool_name) or self._registry.get_tool(tool_name)
                 if tool:
                     try:
                         logger.info(f"FilteredToolNode: Executing {tool_name}")
                         result = await tool.ainvoke(tool_call.get("args", {}))
+                        self._registry.record_use(tool_name)
                         new_messages.append(
                             ToolMessage(
                                 content=str(result),
@@ -476,7 +524,7 @@ def create_graph_agent(llm, tools, prompt, model_provider="gemini"):
     workflow.add_node("agent", agent_node)
     
     # Use FilteredToolNode instead of standard ToolNode
-    workflow.add_node("tools", FilteredToolNode(tools))
+    workflow.add_node("tools", FilteredToolNode(tools, tool_registry))
     
     workflow.add_node("human_review", human_review_node)
 
@@ -533,12 +581,14 @@ class GraphAgentExecutor:
         checkpointer: Persistence mechanism for graph state.
         thread_id (str): Default thread ID for session management.
         tool_registry: Registry of available tools for dynamic loading.
+        server_states (dict): Server name -> `tools.server_tool_state` the registered tools were built from.
     """
-    def __init__(self, graph, checkpointer=None, thread_id="default", tool_registry=None):
+    def __init__(self, graph, checkpointer=None, thread_id="default", tool_registry=None, server_states=None):
         self.graph = graph
         self.checkpointer = checkpointer
         self.thread_id = thread_id
         self.tool_registry = tool_registry
+        self.server_states = server_states or {}
         
     async def invoke(self, input_dict: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
         """
@@ -0,0 +1,397 @@
+"""
+Incremental BM25 index for the tool registry.
+
+`rank_bm25.BM25Okapi` is built from the full corpus and can't change afterwards, so any
+change to a registry (a server added, a tool toggled, a manifest refresh) used to
+re-tokenize and re-index every tool. This index keeps what BM25 needs per document and per
+term and updates it in place:
+
+- postings: term -> {doc_id: term frequency}, so a document's contribution can be removed
+  exactly (each document also keeps its own term counts);
+- document frequencies are the posting list sizes;
+- the average document length comes from a running total of lengths.
+
+Adding, removing or updating a document costs O(terms in that document).
+
+Scoring has two paths. Small indexes are scored in Python over the postings of the query
+terms. From AGENT_BM25_VECTORIZE_MIN_DOCS documents on (and when NumPy is installed), the
+postings are compiled into a term-major CSR matrix of term frequencies, a query is scored
+as a sparse dot product (one vectorized pass per query term) and the top k are picked with
+`argpartition` instead of a full sort. The matrix can't be edited in place, so changes made
+after it was compiled are tracked on the side: removed documents are masked out and added
+or updated ones are scored from the postings. Once those pending changes exceed
+AGENT_BM25_COMPACT_RATIO of the index, the next query recompiles the matrix.
+
+IDF uses the non-negative form `log(1 + (N - df + 0.5) / (df + 0.5))` (as in Lucene).
+BM25Okapi's epsilon floor for very common terms depends on the average IDF of the whole
+vocabulary, which can't be maintained cheaply; rankings are otherwise the same.
+
+Scoring methods accept `CorpusStats` from outside so that several indexes (a registry's
+own and the shared catalog indexes it uses, see `shared_index.py`) can be scored as one
+corpus.
+"""
+import heapq
+import logging
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Below this many documents the pure-Python path is faster than compiling a matrix
+AGENT_BM25_VECTORIZE_MIN_DOCS = int(os.getenv("AGENT_BM25_VECTORIZE_MIN_DOCS", 256))
+# Share of documents changed since the last compile that triggers a recompile
+AGENT_BM25_COMPACT_RATIO = float(os.getenv("AGENT_BM25_COMPACT_RATIO", 0.1))
+
+
+def bm25_idf(documents: int, document_frequency: int) -> float:
+    return math.log(1.0 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def bm25_term_score(weight: float, freq: float, length: float, average_length: float, k1: float, b: float) -> float:
+    """Contribution of one term (`weight` = idf * query frequency) to a document's score."""
+    return weight * freq * (k1 + 1) / (freq + k1 * (1 - b + b * length / average_length))
+
+
+@dataclass
+class CorpusStats:
+    """
+    Collection statistics for scoring one query: document count, total document length and
+    the document frequencies of the query terms. Stats of disjoint document sets add up.
+    """
+    documents: int = 0
+    total_length: float = 0.0
+    document_frequencies: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / self.documents if self.documents else 0.0
+
+    def merge(self, other: "CorpusStats") -> "CorpusStats":
+        self.documents += other.documents
+        self.total_length += other.total_length
+        for term, df in other.document_frequencies.items():
+            self.document_frequencies[term] = self.document_frequencies.get(term, 0) + df
+        return self
+
+    def weights(self, query_tokens: List[str]) -> List[Tuple[str, float]]:
+        """(term, idf * query frequency) for the query terms found in the corpus."""
+        return [
+            (term, bm25_idf(self.documents, self.document_frequencies[term]) * query_freq)
+            for term, query_freq in Counter(t for t in query_tokens if t).items()
+            if self.document_frequencies.get(term)
+        ]
+
+
+def query_terms(query_tokens: List[str]) -> set:
+    return {token for token in query_tokens if token}
+
+
+def top_slots(scores: "np.ndarray", k: int) -> List[Tuple[int, float]]:
+    """(slot, score) of the `k` highest positive scores, best first, via `argpartition`."""
+    count = min(k, int(np.count_nonzero(scores)))
+    if count <= 0:
+        return []
+    top = np.argpartition(-scores, count - 1)[:count]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return list(zip(top.tolist(), scores[top].tolist()))
+
+
+class _CsrMatrix:
+    """
+    Term-major CSR snapshot of the postings: row `term_rows[t]` holds the document slots
+    containing term t (`indices[indptr[r]:indptr[r + 1]]`) and their term frequencies.
+    Slots follow the order of `doc_lengths`.
+    """
+    def __init__(self, postings: Dict[str, Dict[str, int]], doc_lengths: Dict[str, int]):
+        self.doc_ids: List[str] = list(doc_lengths)
+        self.slots: Dict[str, int] = {doc_id: slot for slot, doc_id in enumerate(self.doc_ids)}
+        self.lengths = np.fromiter(doc_lengths.values(), dtype=np.float64, count=len(doc_lengths))
+        self.alive = np.ones(len(self.doc_ids), dtype=bool)
+        self.dead = 0
+
+        self.term_rows: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        freqs: List[int] = []
+        slots = self.slots
+        for term, posting in postings.items():
+            self.term_rows[term] = len(self.term_rows)
+            indices.extend(slots[doc_id] for doc_id in posting)
+            freqs.extend(posting.values())
+            indptr.append(len(indices))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+
+    def kill(self, doc_id: str):
+        slot = self.slots.get(doc_id)
+        if slot is not None and self.alive[slot]:
+            self.alive[slot] = False
+            self.dead += 1
+
+    def row(self, term: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(slots, term frequencies) of a term; empty arrays for unknown terms."""
+        row = self.term_rows.get(term)
+        if row is None:
+            return self.indices[:0], self.freqs[:0]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.freqs[start:end]
+
+    def score(self, weights: List[Tuple[str, float]], average_length: float, k1: float, b: float) -> "np.ndarray":
+        """Scores by slot, as one sparse dot product per query term (dead slots included)."""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float64)
+        for term, weight in weights:
+            slots, freqs = self.row(term)
+            if not len(slots):
+                continue
+            norm = k1 * (1 - b + b * self.lengths[slots] / average_length)
+            # Slots are unique within a row, so fancy-index accumulation is exact
+            scores[slots] += weight * freqs * (k1 + 1) / (freqs + norm)
+        return scores
+
+
+class IncrementalBM25:
+    """
+    BM25 index over documents identified by string ids.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Length normalization.
+        vectorize_min_docs (int): Index size from which queries use the CSR matrix
+            (ignored without NumPy).
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75, vectorize_min_docs: int = AGENT_BM25_VECTORIZE_MIN_DOCS):
+        self.k1 = k1
+        self.b = b
+        self.vectorize_min_docs = vectorize_min_docs
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        # Compiled matrix and the documents added or replaced since it was compiled
+        self._matrix: Optional[_CsrMatrix] = None
+        self._pending: set = set()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    @property
+    def average_length(self) -> float:
+        return self._total_length / len(self._doc_lengths) if self._doc_lengths else 0.0
+
+    def document_frequency(self, term: str) -> int:
+        return len(self._postings.get(term, ()))
+
+    def add(self, doc_id: str, tokens: Iterable[str]):
+        """Indexes a document, replacing any previous version with the same id."""
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+
+        terms = Counter(token for token in tokens if token)
+        length = sum(terms.values())
+        for term, freq in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        if self._matrix is not None:
+            self._pending.add(doc_id)
+
+    # Same operation; the name reads better at call sites that replace a document
+    update = add
+
+    def remove(self, doc_id: str) -> bool:
+        """Drops a document from the index. Returns False if it wasn't indexed."""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        if self._matrix is not None:
+            self._matrix.kill(doc_id)
+            self._pending.discard(doc_id)
+        return True
+
+    def idf(self, term: str) -> float:
+        return bm25_idf(len(self._doc_lengths), self.document_frequency(term))
+
+    def corpus_stats(self, terms: Iterable[str]) -> CorpusStats:
+        """This index's statistics for the given query terms."""
+        return CorpusStats(
+            documents=len(self._doc_lengths),
+            total_length=self._total_length,
+            document_frequencies={term: self.document_frequency(term) for term in terms},
+        )
+
+    def _score_postings(
+        self, weights: List[Tuple[str, float]], average_length: float, doc_ids: Optional[Iterable[str]] = None
+    ) -> Dict[str, float]:
+        """Pure-Python scoring over the postings, optionally limited to `doc_ids`."""
+        allowed = set(doc_ids) if doc_ids is not None else None
+        k1, b = self.k1, self.b
+        scores: Dict[str, float] = {}
+        for term, weight in weights:
+            for doc_id, freq in self._postings.get(term, {}).items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + bm25_term_score(
+                    weight, freq, self._doc_lengths[doc_id], average_length, k1, b
+                )
+        return scores
+
+    def _score_documents(
+        self, weights: List[Tuple[str, float]], average_length: float, doc_ids: Iterable[str]
+    ) -> Dict[str, float]:
+        """Pure-Python scoring of a few documents from their own term counts."""
+        k1, b = self.k1, self.b
+        scores: Dict[str, float] = {}
+        for doc_id in doc_ids:
+            terms = self._doc_terms[doc_id]
+            length = self._doc_lengths[doc_id]
+            score = 0.0
+            for term, weight in weights:
+                freq = terms.get(term)
+                if freq:
+                    score += bm25_term_score(weight, freq, length, average_length, k1, b)
+            if score:
+                scores[doc_id] = score
+        return scores
+
+    def _compiled(self) -> Optional[_CsrMatrix]:
+        """The CSR matrix for vectorized scoring, (re)compiled when missing or too stale."""
+        if np is None or len(self._doc_lengths) < self.vectorize_min_docs:
+            # Drop a matrix compiled while the index was larger
+            self._matrix = None
+            self._pending.clear()
+            return None
+        matrix = self._matrix
+        if matrix is None or len(self._pending) + matrix.dead > AGENT_BM25_COMPACT_RATIO * len(self._doc_lengths):
+            matrix = self._matrix = _CsrMatrix(self._postings, self._doc_lengths)
+            self._pending.clear()
+        return matrix
+
+    def _score_matrix(
+        self,
+        matrix: _CsrMatrix,
+        weights: List[Tuple[str, float]],
+        average_length: float,
+        doc_ids: Optional[Iterable[str]] = None,
+    ) -> Tuple["np.ndarray", Dict[str, float]]:
+        """
+        Vectorized scoring: (scores by matrix slot, scores of documents changed since the
+        compile). Slots of removed or replaced documents and of documents outside
+        `doc_ids` score 0.
+        """
+        scores = matrix.score(weights, average_length, self.k1, self.b)
+
+        if doc_ids is not None:
+            allowed = set(doc_ids)
+            keep = np.zeros(len(matrix.doc_ids), dtype=bool)
+            keep[[matrix.slots[d] for d in allowed if d in matrix.slots]] = True
+            scores[~(keep & matrix.alive)] = 0.0
+            pending = self._pending & allowed
+        else:
+            if matrix.dead:
+                scores[~matrix.alive] = 0.0
+            pending = self._pending
+
+        pending_scores: Dict[str, float] = {}
+        if pending:
+            pending_scores = self._score_documents(weights, average_length, pending)
+        return scores, pending_scores
+
+    def _prepare(
+        self, query_tokens: List[str], stats: Optional[CorpusStats]
+    ) -> Tuple[List[Tuple[str, float]], float]:
+        if stats is None:
+            stats = self.corpus_stats(query_terms(query_tokens))
+        return stats.weights(query_tokens), stats.average_length or 1.0
+
+    def get_scores(
+        self,
+        query_tokens: List[str],
+        doc_ids: Optional[Iterable[str]] = None,
+        stats: Optional[CorpusStats] = None,
+    ) -> Dict[str, float]:
+        """
+        BM25 scores for a tokenized query.
+
+        Args:
+            query_tokens (list): Query terms (repeated terms count repeatedly, as in BM25Okapi).
+            doc_ids (iterable, optional): Restrict scoring to these documents.
+            stats (CorpusStats, optional): Collection statistics to score with, when this index
+                is part of a larger corpus. Defaults to the index's own.
+
+        Returns:
+            dict: doc_id -> score, for documents containing at least one query term.
+        """
+        if not self._doc_lengths:
+            return {}
+        weights, average_length = self._prepare(query_tokens, stats)
+        if not weights:
+            return {}
+        matrix = self._compiled()
+        if matrix is None:
+            return self._score_postings(weights, average_length, doc_ids)
+
+        scores, pending_scores = self._score_matrix(matrix, weights, average_length, doc_ids)
+        hits = np.flatnonzero(scores)
+        result = dict(zip([matrix.doc_ids[slot] for slot in hits], scores[hits].tolist()))
+        result.update(pending_scores)
+        return result
+
+    def top_k(
+        self,
+        query_tokens: List[str],
+        k: int,
+        doc_ids: Optional[Iterable[str]] = None,
+        stats: Optional[CorpusStats] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        The `k` best-scoring documents containing at least one query term.
+
+        Returns:
+            list: (doc_id, score) pairs, best first.
+        """
+        if not self._doc_lengths or k <= 0:
+            return []
+        weights, average_length = self._prepare(query_tokens, stats)
+        if not weights:
+            return []
+        matrix = self._compiled()
+        if matrix is None:
+            scores = self._score_postings(weights, average_length, doc_ids)
+            return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+        scores, pending_scores = self._score_matrix(matrix, weights, average_length, doc_ids)
+        best = [(matrix.doc_ids[slot], score) for slot, score in top_slots(scores, k)]
+        if pending_scores:
+            best = heapq.nlargest(k, best + list(pending_scores.items()), key=lambda item: item[1])
+        return best
+
+    def stats(self) -> Dict[str, float]:
+        """Document count, vocabulary size, average length and matrix state."""
+        return {
+            "documents": len(self._doc_lengths),
+            "terms": len(self._postings),
+            "average_length": self.average_length,
+            "vectorized": self._matrix is not None,
+            "pending": len(self._pending) + (self._matrix.dead if self._matrix is not None else 0),
+        }
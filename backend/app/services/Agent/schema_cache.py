@@ -0,0 +1,174 @@
+"""
+Process-wide cache of compiled argument models for MCP tools.
+
+Every agent build turns each tool's JSON input schema into a sanitized schema and a
+Pydantic model. Users connected to the same server share identical schemas, so the
+compiled result is cached by a hash of the normalized schema (plus the model name) and
+reused across builds and users. Eviction is LRU.
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, Field, create_model
+
+logger = logging.getLogger(__name__)
+
+AGENT_SCHEMA_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_SCHEMA_CACHE_MAX_ENTRIES", 4096))
+
+_ARRAY_ITEM_TYPES = {
+    "object": List[Dict[str, Any]],
+    "integer": List[int],
+    "number": List[float],
+    "boolean": List[bool],
+}
+
+_SCALAR_TYPES = {
+    "object": Dict[str, Any],
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+}
+
+
+def _sanitize_schema(schema: Any) -> Any:
+    """
+    Recursively remove unsupported keys from the schema (e.g. title, default)
+    to avoid warnings/errors with LangChain & Gemini.
+    """
+    if isinstance(schema, dict):
+        new_schema = schema.copy() # Avoid modifying original in place if possible, though deepcopy is safer
+        # Remove offending keys
+        for key in ["title", "default", "additionalProperties", "example", "examples"]:
+            if key in new_schema:
+                del new_schema[key]
+
+        # FIX: Gemini requires 'items' for type: array
+        if new_schema.get("type") == "array" and "items" not in new_schema:
+            new_schema["items"] = {"type": "string"}
+
+        # Recurse for nested dictionaries (e.g. properties)
+        for k, v in new_schema.items():
+            new_schema[k] = _sanitize_schema(v)
+        return new_schema
+
+    elif isinstance(schema, list):
+        return [_sanitize_schema(item) for item in schema]
+
+    return schema
+
+
+def _python_type(prop_info: Dict[str, Any]) -> Any:
+    """Maps a JSON schema property to the Python type used in the argument model."""
+    prop_type_str = prop_info.get("type", "string")
+    if prop_type_str == "array":
+        items_type = prop_info.get("items", {}).get("type", "string")
+        return _ARRAY_ITEM_TYPES.get(items_type, List[str])
+    return _SCALAR_TYPES.get(prop_type_str, str)
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    """Hash of the normalized (key-sorted, compact) JSON form of a schema."""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _compile(input_schema: Dict[str, Any], model_name: str) -> Tuple[Type[BaseModel], Dict[str, Any]]:
+    # Sanitize schema to remove unsupported keys
+    sanitized = _sanitize_schema(input_schema)
+
+    properties = sanitized.get("properties", {})
+    required_fields = sanitized.get("required", [])
+
+    fields = {}
+    for prop_name, prop_info in properties.items():
+        field_description = prop_info.get("description", f"The {prop_name} for the tool.")
+        if prop_name in required_fields:
+            fields[prop_name] = (_python_type(prop_info), Field(..., description=field_description))
+        else:
+            fields[prop_name] = (_python_type(prop_info), Field(None, description=field_description))
+
+    # Create dynamic model
+    class ToolModel(BaseModel):
+        model_config = ConfigDict(title=None)
+
+    model = create_model(model_name, __base__=ToolModel, **fields)
+    return model, sanitized
+
+
+@dataclass
+class _CompiledSchema:
+    model: Type[BaseModel]
+    sanitized_schema: Dict[str, Any]
+
+
+class SchemaModelCache:
+    """
+    LRU cache of (Pydantic argument model, sanitized schema) keyed by schema hash and model name.
+
+    Args:
+        max_entries (int): Maximum number of compiled models kept.
+    """
+    def __init__(self, max_entries: int = AGENT_SCHEMA_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], _CompiledSchema]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_or_compile(
+        self, input_schema: Dict[str, Any], model_name: str, digest: Optional[str] = None
+    ) -> Tuple[Type[BaseModel], Dict[str, Any]]:
+        """
+        Returns the argument model and sanitized schema for `input_schema`, compiling on a miss.
+
+        Args:
+            input_schema (dict): Raw JSON schema of the tool's input.
+            model_name (str): Name given to the generated model class.
+            digest (str, optional): Precomputed `schema_hash(input_schema)`.
+
+        Raises:
+            Exception: If the model can't be built; failures are not cached.
+        """
+        key = (digest or schema_hash(input_schema), model_name)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.model, entry.sanitized_schema
+
+        self.stats["misses"] += 1
+        model, sanitized = _compile(input_schema, model_name)
+        self._entries[key] = _CompiledSchema(model=model, sanitized_schema=sanitized)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return model, sanitized
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns size and counters for diagnostics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": (self.stats["hits"] / lookups) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+# Shared by every agent build in the process
+schema_model_cache = SchemaModelCache()
+
+
+def compile_args_model(
+    input_schema: Dict[str, Any], tool_name: str, digest: Optional[str] = None
+) -> Tuple[Type[BaseModel], Dict[str, Any]]:
+    """
+    Cached `(args_schema model, sanitized schema)` for a tool's input schema.
+    `digest` is the schema hash when already known (e.g. from the tool catalog).
+    """
+    # Titles are stripped by _sanitize_schema, so the name always comes from the tool
+    model_name = f"{tool_name.capitalize()}InputModel"
+    return schema_model_cache.get_or_compile(input_schema, model_name, digest=digest)
@@ -0,0 +1,72 @@
+"""
+Process-wide LRU cache of tool search results.
+
+Agents repeat the same `search_tools` queries within a conversation, and users with the
+same catalogs and the same enabled tools ask the same things. Results are cached by
+(normalized query, mode, limit, registry search signature). The signature
+(`ToolRegistry.search_signature`) covers the shared catalogs a registry sees with their
+visibility masks, plus a per-registry version of its own index, so identical registries
+share entries and any change to a registry makes its old entries unreachable (they age
+out of the LRU).
+"""
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AGENT_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_SEARCH_CACHE_MAX_ENTRIES", 4096))
+
+SearchKey = Tuple[str, str, int, str]
+
+
+def normalize_query(query: str) -> str:
+    """Collapses whitespace; both search tokenizers ignore it, so results don't change."""
+    return " ".join(query.split())
+
+
+class SearchResultCache:
+    """
+    LRU cache of ranked tool names per search key.
+
+    Args:
+        max_entries (int): Maximum number of cached searches.
+    """
+    def __init__(self, max_entries: int = AGENT_SEARCH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[SearchKey, Tuple[str, ...]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: SearchKey) -> Optional[List[str]]:
+        names = self._entries.get(key)
+        if names is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return list(names)
+
+    def put(self, key: SearchKey, names: List[str]):
+        self._entries[key] = tuple(names)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns size and counters for diagnostics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": (self.stats["hits"] / lookups) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+# Shared by every registry in the process
+search_result_cache = SearchResultCache()
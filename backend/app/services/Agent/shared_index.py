@@ -0,0 +1,214 @@
+"""
+Process-wide BM25 indexes of tool catalogs, shared by every agent.
+
+Most users connect the same public MCP servers, so a private search index per cached agent
+stores the same postings once per user. A `CatalogIndex` holds the postings of one catalog,
+keyed by (server_url, server_name, content_hash); the server name is part of every tool's
+indexed text. It is built once and never modified (a new manifest has a new content hash,
+hence a new index), and lives only as long as some registry uses it.
+
+What one registry sees of a catalog is a `CatalogView`: a bitmask over the index's document
+slots (disabled tools are never set; an inactive server has no view at all) plus the counts
+BM25 needs. Scoring applies the mask before top-k selection. A registry merges the
+statistics of its views and of its own index (`CorpusStats`), so scores are the same as
+those of a private index over the same tools. Per user, a catalog costs one bit per tool
+and a name per visible tool; postings memory scales with distinct catalogs.
+
+The dense vectors used by hybrid search (`tool_embeddings.py`) are kept per catalog index
+as well, computed on first use.
+"""
+import heapq
+import logging
+import weakref
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .bm25_index import (
+    AGENT_BM25_VECTORIZE_MIN_DOCS, CorpusStats, _CsrMatrix, bm25_term_score, np, top_slots,
+)
+from .tool_embeddings import dense_ranking, embed_texts, embedding_document
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogIndex:
+    """
+    Read-only BM25 postings of one tool catalog, addressed by document slot (the position
+    of the tool in the catalog).
+
+    Args:
+        key (tuple): (server_url, server_name, content_hash).
+        entries (list): The catalog's tool entries.
+    """
+    def __init__(self, key: Tuple[str, str, str], entries: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.key = key
+        self.k1 = k1
+        self.b = b
+        self.names: List[str] = []
+        self.slots: Dict[str, int] = {}
+        self.lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._entries = entries
+        self._embeddings = None
+
+        for entry in entries:
+            slot = len(self.names)
+            self.names.append(entry["name"])
+            self.slots.setdefault(entry["name"], slot)
+            tokens = entry.get("bm25_tokens")
+            if tokens is None:
+                from .tool_registry import tokenize
+                tokens = tokenize(f"{entry['unique_name']} {entry['description']}")
+            terms = Counter(token for token in tokens if token)
+            for term, freq in terms.items():
+                self._postings.setdefault(term, {})[slot] = freq
+            self.lengths.append(sum(terms.values()))
+
+        self._matrix: Optional[_CsrMatrix] = None
+        if np is not None and len(self.names) >= AGENT_BM25_VECTORIZE_MIN_DOCS:
+            self._matrix = _CsrMatrix(self._postings, dict(enumerate(self.lengths)))
+            # Only one form of the postings is kept
+            self._postings = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def vectorized(self) -> bool:
+        return self._matrix is not None
+
+    def embeddings(self) -> "np.ndarray":
+        """Normalized float32 vectors of the catalog's tools by slot, computed on first use."""
+        if self._embeddings is None:
+            self._embeddings = embed_texts(
+                [embedding_document(e["unique_name"], e["description"]) for e in self._entries]
+            )
+        return self._embeddings
+
+
+class CatalogView:
+    """
+    One registry's visible subset of a `CatalogIndex`.
+
+    Args:
+        index (CatalogIndex): The shared index.
+    """
+    def __init__(self, index: CatalogIndex):
+        self.index = index
+        self.mask = 0
+        self.documents = 0
+        self.total_length = 0
+        # Visible slot -> name of the tool in the registry
+        self.names: Dict[int, str] = {}
+        self._mask_array = None
+
+    def show(self, slot: int, name: str):
+        if not self.mask >> slot & 1:
+            self.mask |= 1 << slot
+            self.documents += 1
+            self.total_length += self.index.lengths[slot]
+            self._mask_array = None
+        self.names[slot] = name
+
+    def hide(self, slot: int):
+        if self.mask >> slot & 1:
+            self.mask &= ~(1 << slot)
+            self.documents -= 1
+            self.total_length -= self.index.lengths[slot]
+            self._mask_array = None
+        self.names.pop(slot, None)
+
+    def _visible(self) -> "np.ndarray":
+        # Boolean form of the bitmask for the vectorized path, rebuilt after a change
+        if self._mask_array is None:
+            size = len(self.index)
+            packed = np.frombuffer(self.mask.to_bytes((size + 7) // 8 or 1, "little"), dtype=np.uint8)
+            self._mask_array = np.unpackbits(packed, bitorder="little")[:size].astype(bool)
+        return self._mask_array
+
+    def corpus_stats(self, terms: Iterable[str]) -> CorpusStats:
+        """Statistics of the visible documents for the given query terms."""
+        index = self.index
+        frequencies = {}
+        for term in terms:
+            if index._matrix is not None:
+                slots, _ = index._matrix.row(term)
+                frequencies[term] = int(np.count_nonzero(self._visible()[slots])) if len(slots) else 0
+            else:
+                mask = self.mask
+                frequencies[term] = sum(1 for slot in index._postings.get(term, ()) if mask >> slot & 1)
+        return CorpusStats(
+            documents=self.documents, total_length=self.total_length, document_frequencies=frequencies
+        )
+
+    def _score_postings(self, weights: List[Tuple[str, float]], average_length: float) -> Dict[int, float]:
+        index, mask = self.index, self.mask
+        scores: Dict[int, float] = {}
+        for term, weight in weights:
+            for slot, freq in index._postings.get(term, {}).items():
+                if mask >> slot & 1:
+                    scores[slot] = scores.get(slot, 0.0) + bm25_term_score(
+                        weight, freq, index.lengths[slot], average_length, index.k1, index.b
+                    )
+        return scores
+
+    def _score_matrix(self, weights: List[Tuple[str, float]], average_length: float) -> "np.ndarray":
+        index = self.index
+        scores = index._matrix.score(weights, average_length, index.k1, index.b)
+        scores[~self._visible()] = 0.0
+        return scores
+
+    def get_scores(self, weights: List[Tuple[str, float]], average_length: float) -> Dict[str, float]:
+        """Registry name -> score of the visible tools matching the weighted query terms."""
+        if not self.documents or not weights:
+            return {}
+        if self.index._matrix is None:
+            scores = self._score_postings(weights, average_length)
+            return {self.names[slot]: score for slot, score in scores.items()}
+        scores = self._score_matrix(weights, average_length)
+        hits = np.flatnonzero(scores)
+        return dict(zip([self.names[slot] for slot in hits.tolist()], scores[hits].tolist()))
+
+    def top_k(self, weights: List[Tuple[str, float]], average_length: float, k: int) -> List[Tuple[str, float]]:
+        """(registry name, score) of the `k` best visible tools, best first."""
+        if not self.documents or not weights or k <= 0:
+            return []
+        if self.index._matrix is None:
+            scores = self._score_postings(weights, average_length)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        else:
+            best = top_slots(self._score_matrix(weights, average_length), k)
+        return [(self.names[slot], score) for slot, score in best]
+
+    def dense_top_k(self, query_vector: "np.ndarray", k: int) -> List[Tuple[str, float]]:
+        """(registry name, similarity) of the `k` visible tools closest to the query vector."""
+        if not self.documents or k <= 0:
+            return []
+        best = dense_ranking(self.index.embeddings(), query_vector, k, visible=self._visible())
+        return [(self.names[slot], score) for slot, score in best]
+
+
+# (server_url, server_name, content_hash) -> index, kept while any registry holds a view of it
+_CATALOG_INDEXES: "weakref.WeakValueDictionary[Tuple[str, str, str], CatalogIndex]" = weakref.WeakValueDictionary()
+
+
+def get_catalog_index(server_url: str, catalog: Dict[str, Any]) -> CatalogIndex:
+    """Returns the shared index of a catalog, building it on first use."""
+    key = (server_url, catalog.get("server_name", ""), catalog.get("content_hash", ""))
+    index = _CATALOG_INDEXES.get(key)
+    if index is None:
+        index = CatalogIndex(key, catalog.get("tools", []))
+        _CATALOG_INDEXES[key] = index
+        logger.debug(f"Built shared search index for {key[1]} ({len(index)} tools)")
+    return index
+
+
+def shared_index_stats() -> Dict[str, Any]:
+    """Number of live shared catalog indexes and the tools they hold."""
+    indexes = list(_CATALOG_INDEXES.values())
+    return {
+        "catalogs": len(indexes),
+        "documents": sum(len(index) for index in indexes),
+        "vectorized": sum(1 for index in indexes if index.vectorized),
+        "embedded": sum(1 for index in indexes if index._embeddings is not None),
+    }
@@ -0,0 +1,131 @@
+"""
+Prompt-token budgeting for the tools bound to the LLM.
+
+Every bound tool costs its name, description and argument schema in prompt tokens on each
+LLM call. With large MCP servers that can dominate the prompt, so `agent_node` binds only
+as many tools as fit in a per-request budget:
+
+- `search_tools` and tools the agent just discovered through it are always bound;
+- the remaining tools are ranked by relevance to the latest user message (scored by the
+  registry's active search mode: fused hybrid RRF scores by default, BM25 scores in bm25
+  mode), boosted for tools already used in this conversation and for tools this agent
+  calls often, and added best-first until the budget is spent.
+
+Everything left out stays reachable through `search_tools`. A budget of 0 binds every tool.
+Token costs come from the tool catalog (`schema_tokens`) and are estimated once for tools
+that have none (e.g. `search_tools`); the estimate is stored in the tool's own metadata.
+"""
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .tool_catalog import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Default per-request budget in prompt tokens for bound tool schemas (0 = no limit)
+AGENT_TOOL_TOKEN_BUDGET = int(os.getenv("AGENT_TOOL_TOKEN_BUDGET", 16000))
+# Weight of log(1 + calls) relative to a normalized relevance score of 1.0
+AGENT_TOOL_USAGE_WEIGHT = float(os.getenv("AGENT_TOOL_USAGE_WEIGHT", 0.25))
+# Bonus for tools already called in the current conversation, so multi-step work keeps its tools
+AGENT_TOOL_CONVERSATION_BOOST = float(os.getenv("AGENT_TOOL_CONVERSATION_BOOST", 2.0))
+
+
+def tool_tokens(tool: Any) -> int:
+    """
+    Prompt tokens a tool adds when bound: the catalog's `schema_tokens` when available,
+    otherwise an estimate from the name, description and argument schema, cached in the
+    tool's metadata so it is dropped with the tool and never shared by same-named tools.
+    """
+    tokens = getattr(tool, "schema_tokens", None)
+    if tokens is None:
+        tokens = (getattr(tool, "metadata", None) or {}).get("schema_tokens")
+    if tokens:
+        return tokens
+
+    schema = {}
+    args_schema = getattr(tool, "args_schema", None)
+    if args_schema is not None and hasattr(args_schema, "model_json_schema"):
+        try:
+            schema = args_schema.model_json_schema()
+        except Exception:
+            schema = {}
+    tokens = estimate_tokens(f"{tool.name} {tool.description} {json.dumps(schema, separators=(',', ':'))}")
+    metadata = getattr(tool, "metadata", None)
+    if isinstance(metadata, dict):
+        metadata["schema_tokens"] = tokens
+    else:
+        try:
+            tool.metadata = {"schema_tokens": tokens}
+        except (AttributeError, TypeError, ValueError):
+            pass
+    return tokens
+
+
+def resolve_budget(override: Optional[int] = None) -> int:
+    """The budget for a request: an explicit per-request value, else AGENT_TOOL_TOKEN_BUDGET."""
+    if override is None:
+        return AGENT_TOOL_TOKEN_BUDGET
+    return max(0, int(override))
+
+
+def select_tools(
+    candidates: Iterable[Any],
+    budget: int,
+    relevance: Dict[str, float],
+    usage: Dict[str, int],
+    pinned: Iterable[str] = (),
+    conversation_tools: Iterable[str] = (),
+) -> Tuple[List[Any], int]:
+    """
+    Picks the tools to bind.
+
+    Args:
+        candidates: Tools (or descriptors) that could be bound, in their natural order.
+        budget (int): Token budget; 0 or less binds everything.
+        relevance (dict): Tool name -> relevance score for the current query.
+        usage (dict): Tool name -> number of calls made through this agent.
+        pinned: Names that are always bound, budget or not.
+        conversation_tools: Names called earlier in this conversation (ranked first among the rest).
+
+    Returns:
+        tuple: (selected tools in candidate order, tokens they use).
+    """
+    candidates = list(candidates)
+    if budget <= 0:
+        return candidates, sum(tool_tokens(t) for t in candidates)
+
+    pinned = set(pinned)
+    in_conversation = set(conversation_tools)
+    top_relevance = max(relevance.values(), default=0.0) or 1.0
+
+    def score(tool: Any) -> float:
+        value = max(relevance.get(tool.name, 0.0), 0.0) / top_relevance
+        value += AGENT_TOOL_USAGE_WEIGHT * math.log1p(usage.get(tool.name, 0))
+        if tool.name in in_conversation:
+            value += AGENT_TOOL_CONVERSATION_BOOST
+        return value
+
+    chosen = set()
+    spent = 0
+    for tool in candidates:
+        if tool.name in pinned:
+            chosen.add(tool.name)
+            spent += tool_tokens(tool)
+
+    ranked = sorted(
+        (t for t in candidates if t.name not in chosen),
+        key=score,
+        reverse=True,
+    )
+    for tool in ranked:
+        cost = tool_tokens(tool)
+        if spent + cost > budget:
+            # Smaller tools further down may still fit
+            continue
+        chosen.add(tool.name)
+        spent += cost
+
+    return [t for t in candidates if t.name in chosen], spent
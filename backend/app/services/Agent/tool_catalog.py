@@ -0,0 +1,196 @@
+"""
+Precompiled tool catalogs.
+
+A catalog is the normalized, versioned form of a server's `tools/list` result. It is
+generated once when the manifest is refreshed and stored next to it
+(`McpServerSetting.tool_catalog`), so agent builds don't repeat the per-tool work:
+
+    {
+        "format": 1,
+        "content_hash": "<sha256 of the canonical tools/list JSON>",
+        "server_name": "GitHub",
+        "generated_at": "2025-01-01T00:00:00",
+        "tools": [
+            {
+                "name": "search_issues",
+                "unique_name": "GitHub_search_issues",
+                "description": "<description shown to the LLM>",
+                "argument_schema": {...},       # raw input schema
+                "sanitized_schema": {...},      # schema after _sanitize_schema
+                "schema_hash": "<sha256>",      # key into the compiled-model cache
+                "schema_tokens": 123,           # rough token cost of binding the tool
+                "bm25_tokens": ["github", ...], # search document for the tool registry
+                "annotations": {...} | null,
+            },
+        ],
+    }
+
+Parsed catalogs are interned per process by (setting id, server name, manifest_version),
+so every build after the first for the same stored content reuses one in-memory object
+without hashing or keeping the stored text. A refresh that rewrites the catalog bumps
+`manifest_version`, which retires the old entry.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schema_cache import _sanitize_schema, schema_hash
+from .tool_registry import tokenize
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FORMAT = 1
+
+AGENT_CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CATALOG_CACHE_MAX_ENTRIES", 1024))
+
+# (setting id, server_name, manifest_version) -> parsed catalog
+_CATALOG_CACHE: "OrderedDict[Tuple[Any, str, int], Dict[str, Any]]" = OrderedDict()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting tool schemas."""
+    return max(1, len(text) // 4)
+
+
+def build_tool_catalog(tools: List[Dict[str, Any]], server_name: str) -> Dict[str, Any]:
+    """
+    Builds the catalog for a server from the tool list returned by `MCPConnector.list_tools`.
+
+    Args:
+        tools (list): Tool dicts with name, description, argument_schema and annotations.
+        server_name (str): The user's name for the server; part of tool names and descriptions.
+
+    Returns:
+        dict: The catalog (see module docstring).
+    """
+    canonical = json.dumps(tools, sort_keys=True, separators=(",", ":"), default=str)
+    sanitized_server_name = server_name.replace(' ', '')
+
+    entries = []
+    for tool_info in tools:
+        tool_name = tool_info.get("name")
+        if not tool_name:
+            continue
+        description = tool_info.get("description") or "No description provided."
+        full_description = f"{description} This tool is from the '{server_name}' server."
+        unique_name = f"{sanitized_server_name}_{tool_name}"
+        input_schema = tool_info.get("argument_schema")
+        sanitized = _sanitize_schema(input_schema) if input_schema else None
+
+        entries.append({
+            "name": tool_name,
+            "unique_name": unique_name,
+            "description": full_description,
+            "argument_schema": input_schema,
+            "sanitized_schema": sanitized,
+            "schema_hash": schema_hash(input_schema) if input_schema else None,
+            "schema_tokens": estimate_tokens(
+                f"{unique_name} {full_description} {json.dumps(sanitized or {}, separators=(',', ':'))}"
+            ),
+            "bm25_tokens": tokenize(f"{unique_name} {full_description}"),
+            "annotations": tool_info.get("annotations"),
+        })
+
+    return {
+        "format": CATALOG_FORMAT,
+        "content_hash": hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
+        "server_name": server_name,
+        "generated_at": datetime.datetime.utcnow().isoformat(),
+        "tools": entries,
+    }
+
+
+def entry_fingerprint(entry: Dict[str, Any]) -> str:
+    """Hash of everything about a tool that ends up in the built LangChain tool."""
+    material = {
+        "description": entry.get("description"),
+        "schema_hash": entry.get("schema_hash"),
+        "annotations": entry.get("annotations"),
+    }
+    return schema_hash(material)
+
+
+def diff_tool_entries(
+    old_entries: List[Dict[str, Any]], new_entries: List[Dict[str, Any]]
+) -> Dict[str, List[str]]:
+    """
+    Structural diff of two lists of catalog entries, by tool name.
+
+    Returns:
+        dict: {"added": [...], "removed": [...], "changed": [...]} of tool names (sorted).
+    """
+    old = {entry["name"]: entry_fingerprint(entry) for entry in old_entries}
+    new = {entry["name"]: entry_fingerprint(entry) for entry in new_entries}
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": sorted(name for name in old.keys() & new.keys() if old[name] != new[name]),
+    }
+
+
+def diff_tool_catalogs(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    """`diff_tool_entries` for two catalogs; a missing old catalog counts as empty."""
+    return diff_tool_entries((old or {}).get("tools", []), new.get("tools", []))
+
+
+def has_changes(diff: Dict[str, List[str]]) -> bool:
+    """True if a diff from `diff_tool_catalogs` has any added, removed or changed tool."""
+    return any(diff.values())
+
+
+def _parse_tool_catalog(
+    catalog_json: Optional[str], server_name: str, manifest_json: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    if catalog_json:
+        try:
+            catalog = json.loads(catalog_json)
+            if catalog.get("format") == CATALOG_FORMAT and catalog.get("server_name") == server_name:
+                return catalog
+        except Exception as e:
+            logger.warning(f"Failed to parse tool catalog for {server_name}, rebuilding from manifest: {e}")
+
+    if manifest_json:
+        try:
+            return build_tool_catalog(json.loads(manifest_json), server_name)
+        except Exception as e:
+            logger.warning(f"Failed to parse tool cache for {server_name}, falling back to network: {e}")
+
+    return None
+
+
+def load_tool_catalog(
+    catalog_json: Optional[str],
+    server_name: str,
+    manifest_json: Optional[str] = None,
+    setting_id: Optional[int] = None,
+    manifest_version: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the parsed catalog for a server, or None if neither a usable catalog nor a
+    manifest is stored.
+
+    A stored catalog is used as-is when its format and server name match. Otherwise (older
+    rows, renamed servers) one is built from the raw manifest. With a `setting_id` and
+    `manifest_version` (the stored row's identity) the result is interned under them;
+    without, it is parsed on every call.
+    """
+    if setting_id is None or manifest_version is None:
+        return _parse_tool_catalog(catalog_json, server_name, manifest_json)
+
+    key = (setting_id, server_name, manifest_version)
+    cached = _CATALOG_CACHE.get(key)
+    if cached is not None:
+        _CATALOG_CACHE.move_to_end(key)
+        return cached
+
+    catalog = _parse_tool_catalog(catalog_json, server_name, manifest_json)
+    if catalog is None:
+        return None
+    _CATALOG_CACHE[key] = catalog
+    while len(_CATALOG_CACHE) > AGENT_CATALOG_CACHE_MAX_ENTRIES:
+        _CATALOG_CACHE.popitem(last=False)
+    return catalog
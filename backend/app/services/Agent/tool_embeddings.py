@@ -0,0 +1,173 @@
+"""
+Local dense vectors for hybrid tool search.
+
+BM25 only matches the words a tool's name and description actually use, so paraphrases
+miss ("open a ticket" vs. `create_issue`). This module embeds text without a model or any
+network access, with a signed hashing vectorizer over three feature families:
+
+- words, with snake_case / camelCase names split and plurals folded;
+- concepts from a small bundled synonym table (SYNONYM_GROUPS), so "ticket" and "issue",
+  or "open" and "create", share a feature;
+- character trigrams of each word, down-weighted, for inflections and near spellings.
+
+Features are hashed with CRC32 (stable across processes) into AGENT_TOOL_EMBEDDING_DIM
+dimensions and each vector is L2-normalized once, so a similarity is a single dot product.
+Document vectors are stacked into contiguous float32 matrices (see `shared_index.py` and
+`ToolRegistry`). Rankings are combined with BM25 by `reciprocal_rank_fusion`.
+
+Requires NumPy; without it hybrid search falls back to BM25.
+"""
+import logging
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .bm25_index import np
+
+logger = logging.getLogger(__name__)
+
+AGENT_TOOL_EMBEDDING_DIM = int(os.getenv("AGENT_TOOL_EMBEDDING_DIM", 256))
+# Cosine similarity below which a tool is not a dense-search candidate
+AGENT_TOOL_EMBEDDING_MIN_SIMILARITY = float(os.getenv("AGENT_TOOL_EMBEDDING_MIN_SIMILARITY", 0.2))
+# Standard RRF constant: larger values flatten the advantage of top ranks
+AGENT_TOOL_RRF_K = int(os.getenv("AGENT_TOOL_RRF_K", 60))
+
+_CONCEPT_WEIGHT = 1.0
+_WORD_WEIGHT = 1.0
+_TRIGRAM_WEIGHT = 0.25
+
+# Words that say nothing about what a tool does (catalog descriptions end with
+# "This tool is from the '<server>' server.")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or the this that to tool "
+    "server with you your me my i please can could would will".split()
+)
+
+# Concept -> words that mean roughly the same thing in tool names and requests.
+# A word may belong to several concepts ("open" a ticket vs. "open" a file).
+SYNONYM_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "create": ("create", "new", "add", "make", "open", "submit", "raise", "insert", "compose", "generate", "start"),
+    "get": ("get", "fetch", "read", "retrieve", "show", "view", "load", "open", "display", "describe", "inspect"),
+    "list": ("list", "enumerate", "browse", "all", "index"),
+    "search": ("search", "find", "lookup", "query", "look", "locate", "discover", "filter"),
+    "update": ("update", "edit", "modify", "change", "patch", "rename", "set", "replace", "amend"),
+    "delete": ("delete", "remove", "drop", "erase", "destroy", "trash", "purge", "archive"),
+    "send": ("send", "post", "notify", "email", "mail", "reply", "dm", "message", "tell"),
+    "run": ("run", "execute", "invoke", "trigger", "launch", "call", "start"),
+    "issue": ("issue", "ticket", "bug", "task", "incident", "problem", "defect", "card", "todo"),
+    "message": ("message", "msg", "chat", "conversation", "thread", "dm", "channel"),
+    "user": ("user", "member", "person", "people", "account", "profile", "contact", "assignee"),
+    "repository": ("repository", "repo", "project", "codebase"),
+    "pull_request": ("pr", "pull", "merge", "review", "mr"),
+    "document": ("document", "doc", "page", "note", "article", "file", "wiki"),
+    "folder": ("folder", "directory", "dir", "path"),
+    "calendar": ("calendar", "event", "meeting", "schedule", "appointment", "invite"),
+    "comment": ("comment", "reply", "annotation", "feedback", "remark"),
+    "image": ("image", "picture", "photo", "screenshot", "img", "figure"),
+    "database": ("database", "db", "table", "sql", "record", "row", "collection"),
+    "code": ("code", "source", "commit", "branch", "diff", "snippet"),
+    "status": ("status", "state", "health", "progress"),
+    "summary": ("summary", "summarize", "overview", "digest", "recap"),
+}
+
+_CONCEPTS: Dict[str, Tuple[str, ...]] = {}
+for _concept, _words in SYNONYM_GROUPS.items():
+    for _word in _words:
+        _CONCEPTS[_word] = _CONCEPTS.get(_word, ()) + (_concept,)
+
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_WORD = re.compile(r"[a-z]+|\d+")
+
+
+def _normalize_word(word: str) -> str:
+    # Fold common plurals so "issues" matches "issue" and the synonym table
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def embedding_words(text: str) -> List[str]:
+    """Lowercased content words of a text, with identifiers split and plurals folded."""
+    text = _CAMEL.sub(r"\1 \2", text).lower()
+    return [
+        _normalize_word(word) for word in _WORD.findall(text)
+        if word not in _STOPWORDS
+    ]
+
+
+def embedding_document(name: str, description: str) -> str:
+    """
+    Text embedded for a tool: its server-prefixed name and description, the same on the
+    shared-catalog and registry paths so a tool's vector doesn't depend on where it is indexed.
+    """
+    return f"{name} {description}"
+
+
+def _features(text: str) -> Dict[str, float]:
+    features: Dict[str, float] = {}
+    for word in embedding_words(text):
+        features[f"w:{word}"] = features.get(f"w:{word}", 0.0) + _WORD_WEIGHT
+        for concept in _CONCEPTS.get(word, ()):
+            features[f"c:{concept}"] = features.get(f"c:{concept}", 0.0) + _CONCEPT_WEIGHT
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            gram = f"g:{padded[i:i + 3]}"
+            features[gram] = features.get(gram, 0.0) + _TRIGRAM_WEIGHT
+    return features
+
+
+def embed_text(text: str, dim: int = AGENT_TOOL_EMBEDDING_DIM) -> "np.ndarray":
+    """L2-normalized float32 vector of a text (all zeros if it has no content words)."""
+    values: Dict[int, float] = {}
+    for feature, weight in _features(text).items():
+        digest = zlib.crc32(feature.encode("utf-8"))
+        # Low bits pick the dimension, one high bit the sign (keeps collisions unbiased)
+        values[digest % dim] = values.get(digest % dim, 0.0) + (weight if digest & 0x80000000 else -weight)
+    vector = np.zeros(dim, dtype=np.float32)
+    if values:
+        vector[list(values)] = list(values.values())
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector
+
+
+def embed_texts(texts: Sequence[str], dim: int = AGENT_TOOL_EMBEDDING_DIM) -> "np.ndarray":
+    """Contiguous (len(texts), dim) float32 matrix of normalized vectors."""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        matrix[row] = embed_text(text, dim)
+    return matrix
+
+
+def dense_ranking(
+    matrix: "np.ndarray", query_vector: "np.ndarray", k: int, visible: Optional["np.ndarray"] = None
+) -> List[Tuple[int, float]]:
+    """
+    (row, similarity) of the `k` rows most similar to the query, best first; rows below
+    AGENT_TOOL_EMBEDDING_MIN_SIMILARITY or outside `visible` are left out.
+    """
+    if not len(matrix) or k <= 0:
+        return []
+    similarities = matrix @ query_vector
+    if visible is not None:
+        similarities = np.where(visible, similarities, -1.0)
+    candidates = np.flatnonzero(similarities >= AGENT_TOOL_EMBEDDING_MIN_SIMILARITY)
+    if not len(candidates):
+        return []
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-similarities[candidates], k - 1)[:k]]
+    candidates = candidates[np.argsort(-similarities[candidates], kind="stable")]
+    return list(zip(candidates.tolist(), similarities[candidates].tolist()))
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = AGENT_TOOL_RRF_K) -> Dict[str, float]:
+    """Fused score per item: the sum over rankings of 1 / (k + rank), ranks starting at 1."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return fused
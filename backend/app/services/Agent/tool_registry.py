@@ -1,104 +1,319 @@
 
+import hashlib
+import heapq
+import itertools
 import logging
-from typing import List, Dict, Any, Union
+import os
+from typing import List, Dict, Any, Optional, Tuple, Union
 from langchain_core.tools import StructuredTool
-from rank_bm25 import BM25Okapi
 import re
 
+from .bm25_index import CorpusStats, IncrementalBM25, np, query_terms
+from .shared_index import CatalogView, get_catalog_index
+from .tool_embeddings import dense_ranking, embed_text, embedding_document, reciprocal_rank_fusion
+from .search_cache import normalize_query, search_result_cache
+
 logger = logging.getLogger(__name__)
 
+# Default search mode: "hybrid" (BM25 + local dense vectors, fused), "bm25" or "keyword"
+AGENT_TOOL_SEARCH_MODE = os.getenv("AGENT_TOOL_SEARCH_MODE", "hybrid")
+# Candidates taken from each ranking before fusion
+AGENT_TOOL_SEARCH_CANDIDATES = int(os.getenv("AGENT_TOOL_SEARCH_CANDIDATES", 50))
+
+# Distinguishes registries in search cache keys (unlike id(), never reused)
+_REGISTRY_IDS = itertools.count(1)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Simple tokenizer that splits by non-alphanumeric characters and lowercases.
+    """
+    return re.split(r'\W+', text.lower())
+
+
 class ToolRegistry:
     """
-    Registry for managing and searching tools using BM25 and keyword matching.
+    Registry for managing and searching tools using BM25, local embeddings and keyword matching.
+
+    Tools may be registered as built `StructuredTool`s or as lazy descriptors (anything with
+    `name`, `description` and `materialize()`, e.g. `tools.ToolDescriptor`). Search works on
+    the descriptors; a `StructuredTool` is built the first time `get_tool` asks for it and
+    is then cached for the life of the registry.
+
+    The BM25 index is incremental: registering or removing tools only (re)indexes those
+    tools, so manifest patches and permission toggles don't re-index the whole registry.
+    Descriptors backed by a tool catalog are indexed in the process-wide catalog index
+    (`shared_index.py`) and only flagged visible here; other tools (built tools, renamed
+    variants) go to the registry's own index. Both are scored as one corpus.
+
+    Hybrid search also ranks tools by cosine similarity of local hashed embeddings
+    (`tool_embeddings.py`), which catches paraphrases BM25 misses, and fuses both rankings
+    with reciprocal-rank fusion. BM25 and hybrid results are cached process-wide
+    (`search_cache.py`) under the registry's `search_signature`.
     """
     def __init__(self):
-        self._tools: Dict[str, StructuredTool] = {}
-        self._bm25 = None
-        self._corpus = []
-        self._tool_names = []
+        self._entries: Dict[str, Any] = {}
+        self._built: Dict[str, StructuredTool] = {}
+        # Calls per tool through this registry's agent; used to rank tools for binding
+        self._usage: Dict[str, int] = {}
+        # Tools without a shared catalog index
+        self._index = IncrementalBM25()
+        # Shared catalog key -> this registry's view of it
+        self._views: Dict[Tuple[str, str, str], CatalogView] = {}
+        # Tool name -> (catalog key, slot) for tools indexed in a shared catalog
+        self._shared: Dict[str, Tuple[Tuple[str, str, str], int]] = {}
+        # Dense vectors of tools in the registry's own index, stacked on demand
+        self._vectors: Dict[str, Any] = {}
+        self._local_matrix: Optional[Tuple[List[str], Any]] = None
+        # Search cache identity: own-index version and the signature derived from it
+        self._uid = next(_REGISTRY_IDS)
+        self._local_version = 0
+        self._signature: Optional[str] = None
 
-    def register_tools(self, tools: List[StructuredTool]):
+    def register_tools(self, tools: List[Any]):
         """
-        Registers a list of tools and rebuilds the search index.
+        Registers a list of tools (built or descriptors) and indexes them. A tool with the
+        name of a registered one replaces it.
         """
         for tool in tools:
-            self._tools[tool.name] = tool
-        
-        self._rebuild_index()
+            self._entries[tool.name] = tool
+            self._built.pop(tool.name, None)
+            if isinstance(tool, StructuredTool):
+                self._built[tool.name] = tool
+            self._unindex(tool.name)
+            self._index_tool(tool)
 
-    def _rebuild_index(self):
+    def remove_tools(self, tool_names: List[str]):
         """
-        Rebuilds the BM25 index based on current tools.
+        Unregisters tools (built ones are dropped too) and removes them from the index.
         """
-        self._tool_names = list(self._tools.keys())
-        # Create corpus from tool name and description
-        self._corpus = [
-            self._tokenize(f"{name} {self._tools[name].description}") 
-            for name in self._tool_names
-        ]
-        if self._corpus:
-            self._bm25 = BM25Okapi(self._corpus)
-        else:
-            self._bm25 = None
+        for name in tool_names:
+            self._entries.pop(name, None)
+            self._built.pop(name, None)
+            self._unindex(name)
+
+    def _index_tool(self, tool: Any):
+        self._signature = None
+        catalog = getattr(tool, "catalog", None)
+        # Renamed variants have no precomputed tokens and are indexed under their own name
+        if catalog is not None and getattr(tool, "bm25_tokens", None) is not None:
+            index = get_catalog_index(tool.server_url, catalog)
+            slot = index.slots.get(tool.tool_name)
+            if slot is not None:
+                view = self._views.get(index.key)
+                if view is None:
+                    view = self._views[index.key] = CatalogView(index)
+                view.show(slot, tool.name)
+                self._shared[tool.name] = (index.key, slot)
+                return
+        self._index.update(tool.name, self._document_tokens(tool))
+        self._local_matrix = None
+        self._local_version += 1
+
+    def _unindex(self, name: str):
+        location = self._shared.pop(name, None)
+        if location is None:
+            if self._index.remove(name):
+                self._vectors.pop(name, None)
+                self._local_matrix = None
+                self._local_version += 1
+                self._signature = None
+            return
+        self._signature = None
+        key, slot = location
+        view = self._views[key]
+        view.hide(slot)
+        if not view.documents:
+            # Drops the reference that keeps an unused shared index alive
+            del self._views[key]
+
+    def _corpus_stats(self, tokens: List[str]) -> CorpusStats:
+        # Statistics of every tool in the registry: own index plus visible shared tools
+        terms = query_terms(tokens)
+        stats = self._index.corpus_stats(terms)
+        for view in self._views.values():
+            stats.merge(view.corpus_stats(terms))
+        return stats
 
     def _tokenize(self, text: str) -> List[str]:
+        return tokenize(text)
+
+    def _document_tokens(self, tool: Any) -> List[str]:
+        # Tool name and description, precomputed by the tool catalog when available
+        tokens = getattr(tool, "bm25_tokens", None)
+        if tokens is not None:
+            return tokens
+        return self._tokenize(f"{tool.name} {tool.description}")
+
+    def _bm25_ranking(self, tokens: List[str], limit: int) -> List[Tuple[str, float]]:
+        """Best `limit` tools by BM25, over the registry's own index and its shared views."""
+        stats = self._corpus_stats(tokens)
+        weights, average_length = stats.weights(tokens), stats.average_length or 1.0
+
+        # Best `limit` of each index (visibility masks applied), merged; only tools
+        # matching at least one query term are returned
+        ranked = self._index.top_k(tokens, limit, stats=stats)
+        for view in self._views.values():
+            ranked.extend(view.top_k(weights, average_length, limit))
+        return heapq.nlargest(limit, ranked, key=lambda item: item[1])
+
+    def _local_vectors(self) -> Tuple[List[str], Any]:
+        # (names, contiguous float32 matrix) for tools in the registry's own index
+        if self._local_matrix is None:
+            names = [name for name in self._entries if name not in self._shared]
+            for name in names:
+                if name not in self._vectors:
+                    tool = self._entries[name]
+                    self._vectors[name] = embed_text(embedding_document(tool.name, tool.description))
+            matrix = np.stack([self._vectors[name] for name in names]) if names else np.zeros((0, 1), dtype=np.float32)
+            self._local_matrix = (names, matrix)
+        return self._local_matrix
+
+    def _dense_ranking(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Best `limit` tools by embedding similarity to the query."""
+        query_vector = embed_text(query)
+        names, matrix = self._local_vectors()
+        ranked = [(names[row], score) for row, score in dense_ranking(matrix, query_vector, limit)]
+        for view in self._views.values():
+            ranked.extend(view.dense_top_k(query_vector, limit))
+        return heapq.nlargest(limit, ranked, key=lambda item: item[1])
+
+    def _hybrid_scores(self, query: str, candidates: int) -> Dict[str, float]:
+        """Reciprocal-rank fusion of the top `candidates` of the BM25 and dense rankings."""
+        lexical = self._bm25_ranking(self._tokenize(query), candidates)
+        dense = self._dense_ranking(query, candidates)
+        return reciprocal_rank_fusion([
+            [name for name, _ in lexical],
+            [name for name, _ in dense],
+        ])
+
+    def search_signature(self) -> str:
         """
-        Simple tokenizer that splits by non-alphanumeric characters and lowercases.
+        Digest of everything search results depend on: the shared catalogs this registry
+        sees with their visibility masks, and its own index (identified by registry and
+        version, as its tools are private). Registries with the same shared tools and no
+        tools of their own have the same signature.
         """
-        return re.split(r'\W+', text.lower())
+        if self._signature is None:
+            material = (
+                sorted((view.index.key, view.mask) for view in self._views.values()),
+                (self._uid, self._local_version) if len(self._index) else None,
+            )
+            self._signature = hashlib.blake2b(repr(material).encode("utf-8"), digest_size=16).hexdigest()
+        return self._signature
 
-    def search(self, query: str, limit: int = 5, mode: str = "bm25") -> List[StructuredTool]:
+    def search(self, query: str, limit: int = 5, mode: Optional[str] = None) -> List[Any]:
         """
-        Search for tools matching the query.
+        Search for tools matching the query. Returns registered entries (descriptors are
+        not built); use `get_tool` for the executable tool.
         
         Args:
             query: The search query.
             limit: Maximum number of tools to return.
-            mode: "bm25" (semantic-ish) or "keyword" (substring match).
+            mode: "hybrid" (BM25 + local embeddings), "bm25" or "keyword" (substring match).
+                Defaults to AGENT_TOOL_SEARCH_MODE; hybrid needs NumPy and falls back to BM25.
         """
-        if not self._tools:
+        if not self._entries:
             return []
+        mode = mode or AGENT_TOOL_SEARCH_MODE
+        if mode not in ("keyword", "bm25", "hybrid"):
+            logger.warning(f"Unknown search mode '{mode}', defaulting to keyword.")
+            mode = "keyword"
 
         if mode == "keyword":
             results = []
             query_lower = query.lower()
-            for name, tool in self._tools.items():
+            for name, tool in self._entries.items():
                 if query_lower in name.lower() or query_lower in tool.description.lower():
                     results.append(tool)
                 if len(results) >= limit:
                     break
             return results
-        
-        elif mode == "bm25":
-            if not self._bm25:
-                # Fallback to keyword if index build failed or empty
-                return self.search(query, limit, mode="keyword")
-            
-            tokenized_query = self._tokenize(query)
-            scores = self._bm25.get_scores(tokenized_query)
-            
-            # Zip scores with tool names and sort
-            scored_tools = sorted(
-                zip(self._tool_names, scores), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
-            
-            # content filtering: return tools with score > 0
-            top_tools = [
-                self._tools[name] 
-                for name, score in scored_tools 
-                if score > 0
-            ][:limit]
-            
-            return top_tools
-        
-        else:
-            logger.warning(f"Unknown search mode '{mode}', defaulting to keyword.")
-            return self.search(query, limit, mode="keyword")
+
+        key = (normalize_query(query), mode, limit, self.search_signature())
+        names = search_result_cache.get(key)
+        if names is None:
+            names = self._ranked_names(query, limit, mode)
+            search_result_cache.put(key, names)
+        return [self._entries[name] for name in names if name in self._entries]
+
+    def _ranked_names(self, query: str, limit: int, mode: str) -> List[str]:
+        """Uncached BM25 or hybrid search; returns tool names, best first."""
+        if mode == "hybrid" and np is not None:
+            fused = self._hybrid_scores(query, max(limit, AGENT_TOOL_SEARCH_CANDIDATES))
+            return [name for name, _ in heapq.nlargest(limit, fused.items(), key=lambda item: item[1])]
+        return [name for name, _ in self._bm25_ranking(self._tokenize(query), limit)]
+
+    def relevance_scores(self, query: str) -> Dict[str, float]:
+        """
+        Relevance of the registered tools to `query` (tools not listed score 0): fused
+        hybrid scores of the top candidates in hybrid mode, else BM25 scores.
+        """
+        if not query:
+            return {}
+        if AGENT_TOOL_SEARCH_MODE == "hybrid" and np is not None:
+            return self._hybrid_scores(query, AGENT_TOOL_SEARCH_CANDIDATES)
+        tokens = self._tokenize(query)
+        stats = self._corpus_stats(tokens)
+        scores = self._index.get_scores(tokens, stats=stats)
+        weights, average_length = stats.weights(tokens), stats.average_length or 1.0
+        for view in self._views.values():
+            scores.update(view.get_scores(weights, average_length))
+        return scores
+
+    def record_use(self, tool_name: str):
+        """Counts a call to a tool."""
+        self._usage[tool_name] = self._usage.get(tool_name, 0) + 1
+
+    def usage_counts(self) -> Dict[str, int]:
+        """Tool name -> number of recorded calls."""
+        return dict(self._usage)
+
+    def get_descriptor(self, tool_name: str) -> Any:
+        """Returns the registered entry for a tool without building it."""
+        return self._entries.get(tool_name)
 
     def get_tool(self, tool_name: str) -> Union[StructuredTool, None]:
-        return self._tools.get(tool_name)
+        """
+        Returns the executable tool, building (and caching) it on first use.
+        A tool whose build fails is logged and treated as missing.
+        """
+        tool = self._built.get(tool_name)
+        if tool is not None:
+            return tool
+        entry = self._entries.get(tool_name)
+        if entry is None:
+            return None
+        try:
+            tool = entry.materialize()
+        except Exception as e:
+            logger.error(f"Failed to build tool '{tool_name}': {e}", exc_info=True)
+            return None
+        self._built[tool_name] = tool
+        return tool
+
+    def get_tools(self, tool_names: List[str]) -> List[StructuredTool]:
+        """Builds (or reuses) the named tools, skipping unknown or unbuildable ones."""
+        tools = (self.get_tool(name) for name in tool_names)
+        return [tool for tool in tools if tool is not None]
+
+    def list_tools(self) -> List[Any]:
+        """All registered entries, unbuilt descriptors included."""
+        return list(self._entries.values())
+
+    def list_server_tools(self, server_name: str) -> List[Any]:
+        """Registered entries that belong to one MCP server."""
+        return [t for t in self._entries.values() if getattr(t, "server_name", None) == server_name]
 
     def get_all_tools(self) -> List[StructuredTool]:
-        return list(self._tools.values())
+        return self.get_tools(list(self._entries.keys()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Registered vs. built tool counts and search index sizes."""
+        return {
+            "registered": len(self._entries),
+            "built": len(self._built),
+            "index": self._index.stats(),
+            "shared_catalogs": len(self._views),
+            "shared_tools": len(self._shared),
+        }
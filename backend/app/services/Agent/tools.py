@@ -1,32 +1,36 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, List, Optional, Tuple
 from langchain_core.tools import StructuredTool
-from pydantic import create_model, Field, ConfigDict, BaseModel, BaseModel
+from pydantic import Field, BaseModel
 
 from ..mcp.connector import MCPConnector
+from ..mcp.circuit_breaker import is_server_available
+from ..mcp.result_cache import resolve_cache_ttl
+from .schema_cache import compile_args_model, schema_hash
+from .tool_catalog import build_tool_catalog, load_tool_catalog, entry_fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Servers whose tools are built at the same time, and how long one server may take
+MCP_BUILD_CONCURRENCY = int(os.getenv("MCP_BUILD_CONCURRENCY", 8))
+MCP_BUILD_SERVER_TIMEOUT = float(os.getenv("MCP_BUILD_SERVER_TIMEOUT", 10))
+# How long a blocking tool call waits for the user to approve it
+TOOL_APPROVAL_TIMEOUT = float(os.getenv("TOOL_APPROVAL_TIMEOUT", 60))
+
 class ToolException(Exception):
     pass
 
-def create_tool_func(tool_name: str, connector, pydantic_model=None, user_id: str=None, unique_tool_name: str=None, blocking: bool = True):
+def create_tool_func(tool_name: str, connector, pydantic_model=None, user_id: str=None, unique_tool_name: str=None, blocking: bool = True, cache_ttl: int = 0, timeout: Optional[float] = None):
     """
     Creates the asynchronous and synchronous functions that the LangChain tool will wrap.
-    Includes permission checking logic and retry mechanism.
+    Includes permission checking logic; retries are left to the connector's per-server policy.
+    `cache_ttl` > 0 enables the per-user result cache for read-only tools.
+    `timeout` overrides the adaptive call timeout (None = learned from observed latency).
     """
-    from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-
-    # Define retry strategy: exponential backoff, max 3 attempts
-    # We retry on specific exceptions that might be transient
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((TimeoutError, ConnectionError)), # Add more if needed
-        reraise=True
-    )
+    # Retries happen once, in the connector, under the server's RetryPolicy (retry_policy.py)
     async def async_func(*args, **kwargs):
         # Handle positional argument if passed (sometimes happens with single-input tools)
         if args:
@@ -48,7 +52,7 @@ def create_tool_func(tool_name: str, connector, pydantic_model=None, user_id: st
         # If blocking is False (used for LangGraph), we SKIP the check here.
         # The Graph is responsible for checking permissions BEFORE calling the tool.
         if blocking and user_id:
-            from app.services.security.permissions import save_tool_approval, PendingApproval
+            from app.services.security.permissions import check_tool_approval, PendingApproval
             # Create a fresh async session for the check
             from app.database.database import AsyncSessionLocal
             
@@ -76,15 +80,8 @@ def create_tool_func(tool_name: str, connector, pydantic_model=None, user_id: st
                     logger.info(f"Blocking tool {approval_name} (raw: {tool_name}) for approval {approval_id}")
                     
                     try:
-                        # Wait for approval
-                        approved = False
-                        for _ in range(60): # 60 seconds timeout
-                            await asyncio.sleep(1)
-                            pending = PendingApproval.get(approval_id)
-                            # Check if approved changed from None to True/False
-                            if pending and pending['approved'] is not None:
-                                approved = pending['approved']
-                                break
+                        # Resumes as soon as the request is approved or denied
+                        approved = await PendingApproval.wait(approval_id, timeout=TOOL_APPROVAL_TIMEOUT)
                         
                         if not approved:
                             raise ToolException(f"Tool execution denied for {tool_name}")
@@ -92,7 +89,7 @@ def create_tool_func(tool_name: str, connector, pydantic_model=None, user_id: st
                         PendingApproval.remove(approval_id)
 
         # 2. Execute tool
-        return await connector.run_tool(tool_name, kwargs)
+        return await connector.run_tool(tool_name, kwargs, cache_ttl=cache_ttl, user_scope=user_id, timeout=timeout)
     
     def sync_func(**kwargs):
         # This is a fallback, primarily for non-async agents.
@@ -107,225 +104,359 @@ def create_tool_func(tool_name: str, connector, pydantic_model=None, user_id: st
     return sync_func, async_func
 
 
-def _sanitize_schema(schema: Any) -> Any:
+class ToolDescriptor:
     """
-    Recursively remove unsupported keys from the schema (e.g. title, default)
-    to avoid warnings/errors with LangChain & Gemini.
+    Compact, not-yet-built form of an MCP tool.
+
+    Holds only what search and binding need plus references to shared state (the interned
+    catalog entry, the per-server connector), so a registry can list thousands of tools
+    cheaply. `materialize()` builds the `StructuredTool` (argument model, closures) when the
+    tool is actually bound or invoked.
     """
-    if isinstance(schema, dict):
-        new_schema = schema.copy() # Avoid modifying original in place if possible, though deepcopy is safer
-        # Remove offending keys
-        for key in ["title", "default", "additionalProperties", "example", "examples"]:
-            if key in new_schema:
-                del new_schema[key]
-        
-        # FIX: Gemini requires 'items' for type: array
-        if new_schema.get("type") == "array" and "items" not in new_schema:
-            new_schema["items"] = {"type": "string"}
-
-        # Recurse for nested dictionaries (e.g. properties)
-        for k, v in new_schema.items():
-            new_schema[k] = _sanitize_schema(v)
-        return new_schema
-            
-    elif isinstance(schema, list):
-        return [_sanitize_schema(item) for item in schema]
-    
-    return schema
+    __slots__ = (
+        "name", "server_name", "server_url", "schema_hash", "variant",
+        "_entry", "_catalog", "_connector", "_user_id", "_blocking", "_cache_ttl", "_timeout",
+    )
+
+    def __init__(self, entry: Dict[str, Any], server_name: str, connector, user_id: str = None,
+                 blocking: bool = True, cache_ttl: int = 0, timeout: Optional[float] = None,
+                 catalog: Optional[Dict[str, Any]] = None):
+        self.name = entry["unique_name"]
+        self.server_name = server_name
+        self.server_url = connector.server_url
+        self.schema_hash = entry.get("schema_hash")
+        # Set by deduplicate_tool_names when another server exposes the same name
+        self.variant = 0
+        self._entry = entry
+        self._catalog = catalog
+        self._connector = connector
+        self._user_id = user_id
+        self._blocking = blocking
+        self._cache_ttl = cache_ttl
+        self._timeout = timeout
+
+    @property
+    def tool_name(self) -> str:
+        """Name of the tool on its MCP server (without the server prefix)."""
+        return self._entry["name"]
+
+    @property
+    def entry(self) -> Dict[str, Any]:
+        """The catalog entry this descriptor was made from."""
+        return self._entry
+
+    @property
+    def catalog(self) -> Optional[Dict[str, Any]]:
+        """The (interned) catalog the entry belongs to; the registry indexes it once per process."""
+        return self._catalog
+
+    @property
+    def description(self) -> str:
+        description = self._entry["description"]
+        return f"{description} (Variant {self.variant})" if self.variant else description
+
+    @property
+    def schema_tokens(self) -> Optional[int]:
+        return self._entry.get("schema_tokens")
+
+    @property
+    def bm25_tokens(self) -> Optional[List[str]]:
+        # Precomputed tokens are for the catalog name; renamed variants are re-tokenized
+        return self._entry.get("bm25_tokens") if self.name == self._entry["unique_name"] else None
+
+    @property
+    def call_settings(self) -> Tuple[int, Optional[float]]:
+        """(cache_ttl, timeout) baked into the built tool."""
+        return self._cache_ttl, self._timeout
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "server_name": self.server_name,
+            "server_url": self.server_url,
+            "schema_tokens": self.schema_tokens,
+        }
+
+    def materialize(self) -> StructuredTool:
+        """
+        Builds the LangChain tool.
+
+        Raises:
+            Exception: If the argument model can't be created from the tool's schema.
+        """
+        tool_name = self._entry["name"]
+        input_schema = self._entry.get("argument_schema")
+        pydantic_model = None
+
+        # Create the Pydantic model dynamically from the tool's schema
+        if input_schema and input_schema.get("type") == "object" and "properties" in input_schema:
+            # Compiled models are shared across builds and users with the same schema
+            pydantic_model, _ = compile_args_model(input_schema, tool_name, digest=self.schema_hash)
+
+        sync_func, async_func = create_tool_func(
+            tool_name, self._connector, pydantic_model, user_id=self._user_id,
+            unique_tool_name=self.name, blocking=self._blocking,
+            cache_ttl=self._cache_ttl, timeout=self._timeout
+        )
+        return StructuredTool.from_function(
+            func=sync_func,
+            coroutine=async_func,
+            name=self.name,
+            description=self.description,
+            args_schema=pydantic_model, # Pass the dynamically created model here
+            # Lets the agent hide tools from servers whose circuit breaker is open
+            metadata=self.metadata,
+        )
 
-    return built_tools
 
-def _deduplicate_tool_names(tools: List[StructuredTool]) -> List[StructuredTool]:
+def deduplicate_tool_names(tools: List[ToolDescriptor], taken_names: Optional[List[str]] = None) -> List[ToolDescriptor]:
     """
     Ensures that all tools in the list have unique names.
     If duplicates are found, appends _2, _3, etc.
+    `taken_names` are names already in use (e.g. in a registry the tools are being added to).
     """
     seen_names = {}
+    taken = set(taken_names or [])
     
     for tool in tools:
         original_name = tool.name
-        if original_name in seen_names:
-            count = seen_names[original_name]
-            seen_names[original_name] += 1
-            new_name = f"{original_name}_{count}"
-            tool.name = new_name
-            tool.description = f"{tool.description} (Variant {count})"
+        count = seen_names.get(original_name, 1)
+        name = original_name
+        while name in taken:
+            count += 1 # First duplicate becomes _2
+            name = f"{original_name}_{count}"
+        if name != original_name:
+            tool.name = name
+            tool.variant = count
             # Note: We don't change the function name, just the tool name exposed to LLM
-        else:
-            seen_names[original_name] = 2 # Next one will be _2
+        seen_names[original_name] = count
+        taken.add(name)
             
     return tools
 
-async def build_tools_from_servers(user_mcp_servers: Dict[str, Dict[str, Any]], user_id: str = None, blocking: bool = True) -> List[StructuredTool]:
+def create_connector(server_name: str, server_info: Any) -> MCPConnector:
     """
-    Builds LangChain tools from a user-specific server dictionary.
-    This function is now called on every request with the current user's data.
+    Creates the connector for one entry of a user-specific server dictionary
+    (as returned by `get_user_servers`). Accepts a bare URL string for the old format.
+    """
+    if isinstance(server_info, str):
+        return MCPConnector(server_info, server_name=server_name)
+    return MCPConnector(
+        server_info.get("url"),
+        credentials=server_info.get("credentials"),
+        server_name=server_name,
+        oauth_config=server_info.get("oauth_config"),
+        setting_id=server_info.get("id"),
+        transport=server_info.get("transport")
+    )
+
+async def build_server_tools(
+    server_name: str,
+    server_info: Any,
+    user_id: str = None,
+    blocking: bool = True,
+    tool_permissions: Optional[Dict[int, Dict[str, Any]]] = None
+) -> List[ToolDescriptor]:
+    """
+    Builds the tool descriptors for a single server: loads its manifest (or lists tools over
+    the network), applies the user's tool permissions and describes each tool.
+    `tool_permissions` is the output of `fetch_tool_permissions`.
+    Returns an empty list if the server's tools are unavailable.
     """
     built_tools = []
-    for server_name, server_info in user_mcp_servers.items():
-        try:
-            # Handle both old/simple format (str) and new format (dict) for safety
-            if isinstance(server_info, str):
-                url = server_info
-                creds = None
-                oauth_config = None
-                setting_id = None
-            else:
-                url = server_info.get("url")
-                creds = server_info.get("credentials")
-                oauth_config = server_info.get("oauth_config")
-                setting_id = server_info.get("id")
-            
-            # Create connector (Lazy init)
-            connector = MCPConnector(
-                url, 
-                credentials=creds, 
-                server_name=server_name, 
-                oauth_config=oauth_config,
-                setting_id=setting_id
+    try:
+        # Create connector (Lazy init)
+        connector = create_connector(server_name, server_info)
+        url = connector.server_url
+        setting_id = connector.setting_id
+        
+        # --- CACHE LOGIC START ---
+        # Precompiled catalog from the last manifest refresh (or built from the raw manifest)
+        catalog = None
+        if isinstance(server_info, dict):
+            catalog = load_tool_catalog(
+                server_info.get("tool_catalog"), server_name, server_info.get("tools_manifest"),
+                setting_id=setting_id, manifest_version=server_info.get("manifest_version")
             )
+        
+        if catalog is None:
+            # Don't stall the agent build on a server whose circuit is open
+            if not is_server_available(url):
+                logger.warning(f"Skipping tools for server '{server_name}': server is unavailable (circuit open)")
+                return []
+
+            # Fallback to network call
+            # logger.info(f"Fetching tools via network for {server_name}...")
+            try:
+                catalog = build_tool_catalog(await connector.list_tools(), server_name)
+            except Exception as e:
+                logger.error(f"Skipping tools for server '{server_name}' due to connection error: {e}")
+                return []
+        # --- CACHE LOGIC END ---
+        catalog_tools = catalog["tools"]
+        
+        # Permissions for all of the user's servers were loaded in one query by the caller
+        disabled_tools = set()
+        perm_rows = {}
+        if user_id and setting_id:
+            if tool_permissions is None:
+                # Fail closed: without permission rows we can't tell which tools are disabled
+                logger.error(f"Skipping tools for server '{server_name}': tool permissions unavailable")
+                return []
+            perm_rows = tool_permissions.get(setting_id, {})
+
+            for tool_info in catalog_tools:
+                t_name = tool_info.get("name")
+                perm = perm_rows.get(t_name)
+                # Default is enabled if no record exists
+                if perm is not None and not perm.is_enabled:
+                    disabled_tools.add(t_name)
+                    logger.info(f"Tool '{t_name}' is DISABLED for user {user_id}, skipping.")
+
+        for tool_info in catalog_tools:
+            tool_name = tool_info.get("name")
             
-            # --- CACHE LOGIC START ---
-            tools_data = []
-            manifest_json = server_info.get("tools_manifest") if isinstance(server_info, dict) else None
-            
-            if manifest_json:
-                try:
-                    tools_data = json.loads(manifest_json)
-                    # logger.info(f"Loaded {len(tools_data)} tools from cache for {server_name}")
-                except Exception as e:
-                    logger.warning(f"Failed to parse tool cache for {server_name}, falling back to network: {e}")
-                    manifest_json = None # Fallback
-            
-            if not manifest_json:
-                # Fallback to network call
-                # logger.info(f"Fetching tools via network for {server_name}...")
-                try:
-                    tools_data = await connector.list_tools()
-                except Exception as e:
-                    logger.error(f"Skipping tools for server '{server_name}' due to connection error: {e}")
-                    continue
-            # --- CACHE LOGIC END ---
-            
-            # Get all permissions for this server/user in ONE batch query (Avoid N+1 bottleneck)
-            disabled_tools = set()
-            if user_id and setting_id:
-                from app.database.database import AsyncSessionLocal
-                from app.models import ToolPermission
-                from sqlalchemy.future import select
-                
-                async with AsyncSessionLocal() as db:
-                    # Select all permission records for this user and server
-                    stmt = select(ToolPermission).where(
-                        ToolPermission.user_id == user_id,
-                        ToolPermission.server_setting_id == setting_id
-                    )
-                    result = await db.execute(stmt)
-                    perms = result.scalars().all()
-                    
-                    # Store as a dict for quick lookup
-                    perm_map = {p.tool_name: p.is_enabled for p in perms}
-                    
-                    for tool_info in tools_data:
-                        t_name = tool_info.get("name")
-                        # Default is enabled if no record exists
-                        is_enabled = perm_map.get(t_name, True)
-                        if not is_enabled:
-                            disabled_tools.add(t_name)
-                            logger.info(f"Tool '{t_name}' is DISABLED for user {user_id}, skipping.")
-
-            for tool_info in tools_data:
-                tool_name = tool_info.get("name")
-                
-                # Skip disabled tools
-                if tool_name in disabled_tools:
-                    continue
-                    
-                description = tool_info.get("description", "No description provided.")
-                input_schema = tool_info.get("argument_schema")
-                pydantic_model = None
+            # Skip disabled tools
+            if tool_name in disabled_tools:
+                continue
 
-                # Create the Pydantic model dynamically from the tool's schema
-                if input_schema and input_schema.get("type") == "object" and "properties" in input_schema:
-                    try:
-                        # Sanitize schema to remove unsupported keys
-                        input_schema = _sanitize_schema(input_schema)
-                        
-                        properties = input_schema.get("properties", {})
-                        required_fields = input_schema.get("required", [])
-                        
-                        fields = {}
-                        for prop_name, prop_info in properties.items():
-                            prop_type_str = prop_info.get("type", "string")
-                            
-                            if prop_type_str == "array":
-                                items_type = prop_info.get("items", {}).get("type", "string")
-                                if items_type == "object":
-                                    python_type = List[Dict[str, Any]]
-                                elif items_type == "integer":
-                                    python_type = List[int]
-                                elif items_type == "number":
-                                    python_type = List[float]
-                                elif items_type == "boolean":
-                                    python_type = List[bool]
-                                else:
-                                    python_type = List[str]
-                            elif prop_type_str == "object":
-                                python_type = Dict[str, Any]
-                            elif prop_type_str == "integer":
-                                python_type = int
-                            elif prop_type_str == "number":
-                                python_type = float
-                            elif prop_type_str == "boolean":
-                                python_type = bool
-                            else:
-                                python_type = str
-                            
-                            field_description = prop_info.get("description", f"The {prop_name} for the tool.")
-                            
-                            if prop_name in required_fields:
-                                fields[prop_name] = (python_type, Field(..., description=field_description))
-                            else:
-                                fields[prop_name] = (python_type, Field(None, description=field_description))
-
-                        model_name = input_schema.get("title", f"{tool_name.capitalize()}InputModel")
-                        
-                        # Create dynamic model
-                        class ToolModel(BaseModel):
-                            model_config = ConfigDict(title=None)
-
-                        pydantic_model = create_model(
-                            model_name, 
-                            __base__=ToolModel,
-                            **fields
-                        )
-
-                    except Exception as e:
-                        logger.error(f"Error creating Pydantic model for tool '{tool_name}': {e}", exc_info=True)
-                        continue # Skip this tool if its model can't be created
-                
-                # Use server name in tool name to avoid collisions across servers
-                # Sanitized to remove spaces/special chars if needed, but keep uniqueness
-                # FIX: Ensure uniqueness below
-                sanitized_server_name = server_name.replace(' ', '')
-                unique_tool_name = f"{sanitized_server_name}_{tool_name}"
-                full_description = f"{description} This tool is from the '{server_name}' server."
-
-                sync_func, async_func = create_tool_func(tool_name, connector, pydantic_model, user_id=user_id, unique_tool_name=unique_tool_name, blocking=blocking)
-                tool_instance = StructuredTool.from_function(
-                    func=sync_func, 
-                    coroutine=async_func, 
-                    name=unique_tool_name,
-                    description=full_description,
-                    args_schema=pydantic_model, # Pass the dynamically created model here
-                )
-                built_tools.append(tool_instance)
+            perm = perm_rows.get(tool_name)
+            cache_ttl = resolve_cache_ttl(
+                tool_info.get("annotations"),
+                perm.cache_ttl_seconds if perm is not None else None
+            )
+            timeout = perm.timeout_seconds if perm is not None else None
+
+            # Server-prefixed name and description are precomputed by the catalog; the
+            # StructuredTool itself is only built once the agent binds or calls the tool
+            built_tools.append(ToolDescriptor(
+                tool_info, server_name, connector, user_id=user_id,
+                blocking=blocking, cache_ttl=cache_ttl, timeout=timeout, catalog=catalog
+            ))
+    except Exception as e:
+        logger.error(f"Skipping tools for server '{server_name}' due to connection error: {e}")
+        return []
+
+    return built_tools
+
+async def fetch_tool_permissions(user_id: str, server_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Loads the user's `ToolPermission` rows for the given servers in one query.
+
+    Returns:
+        dict: {server_setting_id: {tool_name: ToolPermission}}.
+
+    Raises:
+        Exception: If the query fails.
+    """
+    from app.database.database import AsyncSessionLocal
+    from app.models import ToolPermission
+    from sqlalchemy.future import select
+
+    permissions: Dict[int, Dict[str, Any]] = {}
+    if not user_id or not server_ids:
+        return permissions
+
+    async with AsyncSessionLocal() as db:
+        stmt = select(ToolPermission).where(
+            ToolPermission.user_id == user_id,
+            ToolPermission.server_setting_id.in_(server_ids)
+        )
+        result = await db.execute(stmt)
+        for perm in result.scalars().all():
+            permissions.setdefault(perm.server_setting_id, {})[perm.tool_name] = perm
+    return permissions
+
+def server_setting_ids(user_mcp_servers: Dict[str, Any]) -> List[int]:
+    """IDs of the stored server settings in a user-specific server dictionary."""
+    return [
+        info["id"] for info in user_mcp_servers.values()
+        if isinstance(info, dict) and info.get("id")
+    ]
+
+def server_tool_state(server_info: Dict[str, Any], tool_permissions: Dict[int, Dict[str, Any]]) -> str:
+    """
+    Fingerprint of what decides a server's tool set for a user: its `manifest_version` and
+    the user's permission rows for it. A cached agent whose fingerprint for a server
+    differs has that server's tools re-synced (see `diff_server_tools`).
+    """
+    perms = tool_permissions.get(server_info.get("id"), {})
+    return schema_hash({
+        "manifest_version": server_info.get("manifest_version", 0),
+        "permissions": {
+            name: [perm.is_enabled, perm.cache_ttl_seconds, perm.timeout_seconds]
+            for name, perm in perms.items()
+        },
+    })
+
+def diff_server_tools(
+    current: List[ToolDescriptor], fresh: List[ToolDescriptor]
+) -> Dict[str, List[str]]:
+    """
+    Diff of a server's registered descriptors against freshly built ones, by tool name.
+    A tool is "changed" if its catalog entry or its per-user call settings differ, so
+    toggled and re-tuned tools show up as removed, added or changed.
+
+    Returns:
+        dict: {"added": [...], "removed": [...], "changed": [...]} of tool names (sorted).
+    """
+    def fingerprints(descriptors):
+        return {d.tool_name: (entry_fingerprint(d.entry), d.call_settings) for d in descriptors}
+
+    old, new = fingerprints(current), fingerprints(fresh)
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": sorted(name for name in old.keys() & new.keys() if old[name] != new[name]),
+    }
+
+async def build_tools_from_servers(
+    user_mcp_servers: Dict[str, Dict[str, Any]],
+    user_id: str = None,
+    blocking: bool = True,
+    tool_permissions: Optional[Dict[int, Dict[str, Any]]] = None
+) -> List[ToolDescriptor]:
+    """
+    Builds tool descriptors from a user-specific server dictionary.
+    This function is now called on every request with the current user's data.
+    Call `materialize()` (or register them with a `ToolRegistry`) to get LangChain tools.
+
+    `tool_permissions` (from `fetch_tool_permissions`) lets callers that already loaded the
+    user's permission rows share them; otherwise they are loaded here, once for all servers.
+
+    Servers are processed concurrently (at most MCP_BUILD_CONCURRENCY at a time). A server
+    that doesn't finish within MCP_BUILD_SERVER_TIMEOUT contributes no tools instead of
+    delaying the whole build.
+    """
+    if tool_permissions is None and user_id:
+        try:
+            tool_permissions = await fetch_tool_permissions(user_id, server_setting_ids(user_mcp_servers))
         except Exception as e:
-            logger.error(f"Skipping tools for server '{server_name}' due to connection error: {e}")
-            continue
+            logger.error(f"Failed to load tool permissions for user {user_id}: {e}")
+
+    semaphore = asyncio.Semaphore(MCP_BUILD_CONCURRENCY)
+
+    async def _build_with_deadline(server_name: str, server_info: Any) -> List[ToolDescriptor]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    build_server_tools(
+                        server_name, server_info, user_id=user_id, blocking=blocking,
+                        tool_permissions=tool_permissions
+                    ),
+                    timeout=MCP_BUILD_SERVER_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Tools unavailable for server '{server_name}': not ready within {MCP_BUILD_SERVER_TIMEOUT}s")
+                return []
+
+    per_server = await asyncio.gather(
+        *(_build_with_deadline(name, info) for name, info in user_mcp_servers.items())
+    )
+    built_tools = [tool for server_tools in per_server for tool in server_tools]
             
     # Final Deduplication Pass
-    built_tools = _deduplicate_tool_names(built_tools)
+    built_tools = deduplicate_tool_names(built_tools)
     return built_tools
 
 def create_tool_search_tool(tool_registry: Any, user_id: str):
@@ -335,17 +466,21 @@ def create_tool_search_tool(tool_registry: Any, user_id: str):
     class ToolSearchInput(BaseModel):
         query: str = Field(..., description="The search query to find relevant tools.")
     
-    async def search_tools_func(query: str):
+    def search_tools_sync(query: str):
         tools = tool_registry.search(query, limit=5)
-        return [
+        # JSON so agent_node can parse the result and bind the tools it found
+        return json.dumps([
             {"name": t.name, "description": t.description} 
             for t in tools
-        ]
+        ])
+
+    async def search_tools_func(query: str):
+        return search_tools_sync(query)
 
     return StructuredTool.from_function(
-        func=lambda query: tool_registry.search(query, limit=5), # sync fallback
+        func=search_tools_sync, # sync fallback, same payload
         coroutine=search_tools_func,
         name="search_tools",
-        description="Search for available tools based on a query. Use this to find tools that can help you verify your task.",
+        description="Search for available tools based on a query. Not every tool is listed up front; use this to find tools that can help you complete your task.",
         args_schema=ToolSearchInput
     )
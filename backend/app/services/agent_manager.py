@@ -1,9 +1,15 @@
 
+import asyncio
 import json
 import logging
 import hashlib
 from typing import Dict, Any, Tuple, Optional, List
 from app.services.agent.agent_factory import create_final_agent_pipeline
+from app.services.agent.tools import (
+    fetch_tool_permissions, server_setting_ids, server_tool_state, diff_server_tools,
+    build_server_tools, deduplicate_tool_names
+)
+from app.services.mcp.singleflight import SingleFlight
 from langchain.agents import AgentExecutor
 
 logger = logging.getLogger(__name__)
@@ -12,49 +18,42 @@ logger = logging.getLogger(__name__)
 # We use a simple dict for now. For production with many users, consider an LRU Cache or TTLCache.
 _AGENT_CACHE: Dict[str, Tuple[AgentExecutor, str]] = {}
 
-async def _fetch_tool_permissions(user_id: str, server_ids: List[int]) -> Dict[str, bool]:
+# In-flight agent builds keyed by (user_id, config_hash): a warm-up and the first prompt share one build
+_AGENT_BUILDS = SingleFlight("agent-build")
+# In-flight warm-ups keyed by (user_id, provider, model), so repeated chat opens don't stack
+_WARMUPS = SingleFlight("agent-warmup")
+_WARMUP_TASKS: set = set()
+
+async def _fetch_tool_permissions(user_id: str, server_ids: List[int]) -> Optional[Dict[int, Dict[str, Any]]]:
     """
-    Fetches all tool permissions for the user's servers.
-    Returns a dict of {tool_name: is_enabled}.
+    Fetches all tool permissions for the user's servers in one query.
+
+    Returns:
+        dict: {server_setting_id: {tool_name: ToolPermission}}, handed to the agent build
+        (so it doesn't query again) and used to sync cached agents. None if the query failed.
     """
-    from app.database.database import AsyncSessionLocal
-    from app.models import ToolPermission
-    from sqlalchemy.future import select
-    
-    permissions = {}
-    
     if not server_ids:
-        return permissions
+        return {}
     
     try:
-        async with AsyncSessionLocal() as db:
-            stmt = select(ToolPermission).where(
-                ToolPermission.user_id == user_id,
-                ToolPermission.server_setting_id.in_(server_ids)
-            )
-            result = await db.execute(stmt)
-            for perm in result.scalars().all():
-                # Use server_id + tool_name as key to avoid conflicts
-                key = f"{perm.server_setting_id}:{perm.tool_name}"
-                permissions[key] = perm.is_enabled
+        return await fetch_tool_permissions(user_id, server_ids)
     except Exception as e:
-        logger.warning(f"Failed to fetch tool permissions for cache hash: {e}")
-    
-    return permissions
+        logger.warning(f"Failed to fetch tool permissions: {e}")
+        return None
 
 def _compute_config_hash(
     user_servers: Dict[str, Any], 
     model_provider: str, 
-    model_name: str,
-    tool_permissions: Dict[str, bool] = None
+    model_name: str
 ) -> str:
     """
-    Computes a stable hash of the user's configuration, including server settings,
-    selected model, AND tool permissions.
+    Computes a stable hash of the user's configuration: server settings and selected model.
+    Tool lists and tool permissions are left out; cached agents pick those up through
+    `_sync_server_tools`.
     """
     try:
         # Sort keys to ensure deterministic JSON
-        # Combine servers + model config + tool permissions
+        # Combine servers + model config
         # NEW: Sanitize servers to exclude volatile credentials from hash
         sanitized_servers = {}
         for s_name, s_info in user_servers.items():
@@ -63,6 +62,13 @@ def _compute_config_hash(
                 # Solution: Hash the credentials and store only the hash.
                 server_copy = s_info.copy()
                 creds = server_copy.pop("credentials", None)
+                # Discovered transport is connection detail, not agent configuration
+                server_copy.pop("transport", None)
+                # Tool lists don't force a rebuild: a new manifest_version is patched into
+                # the cached agent by _sync_server_tools
+                server_copy.pop("tools_manifest", None)
+                server_copy.pop("tool_catalog", None)
+                server_copy.pop("manifest_version", None)
                 
                 if creds:
                     # Convert to string deterministically and hash
@@ -76,8 +82,7 @@ def _compute_config_hash(
         config_data = {
             "servers": sanitized_servers,
             "provider": model_provider,
-            "model": model_name,
-            "tool_permissions": tool_permissions or {}
+            "model": model_name
         }
         encoded = json.dumps(config_data, sort_keys=True).encode('utf-8')
         return hashlib.sha256(encoded).hexdigest()
@@ -93,42 +98,111 @@ async def get_or_create_agent(
 ) -> Tuple[AgentExecutor, bool]:
     """
     Retrieves a cached agent or creates a new one if the configuration has changed.
-    Now includes tool permissions in the hash to invalidate cache on tool toggle.
+    Manifest refreshes and tool permission changes are applied to a cached agent in place.
     """
     # Extract server IDs for permission lookup
-    server_ids = []
-    for server_name, server_info in user_servers.items():
-        if isinstance(server_info, dict) and server_info.get("id"):
-            server_ids.append(server_info["id"])
+    server_ids = server_setting_ids(user_servers)
     
-    # Fetch tool permissions to include in hash
-    tool_permissions = await _fetch_tool_permissions(user_id, server_ids)
+    # Loaded once per request: used to sync a cached agent or handed to the build below
+    permission_rows = await _fetch_tool_permissions(user_id, server_ids)
     
-    current_hash = _compute_config_hash(user_servers, model_provider, model_name, tool_permissions)
+    current_hash = _compute_config_hash(user_servers, model_provider, model_name)
     
     # Check cache
     if user_id in _AGENT_CACHE:
         cached_agent, cached_hash = _AGENT_CACHE[user_id]
         if cached_hash == current_hash and current_hash != "":
+            await _sync_server_tools(cached_agent, user_id, user_servers, permission_rows)
             return cached_agent, True
         else:
             logger.info(f"Agent configuration changed for user {user_id}. Rebuilding...")
     
-    # Build new agent
-    logger.info(f"Building new agent for user {user_id} with model {model_provider}/{model_name}...")
-    agent_executor = await create_final_agent_pipeline(
-        user_mcp_servers=user_servers, 
-        user_id=user_id,
-        model_provider=model_provider,
-        model_name=model_name
-    )
-    
-    # Update cache
-    if current_hash:
-        _AGENT_CACHE[user_id] = (agent_executor, current_hash)
+    async def _build():
+        logger.info(f"Building new agent for user {user_id} with model {model_provider}/{model_name}...")
+        agent_executor = await create_final_agent_pipeline(
+            user_mcp_servers=user_servers, 
+            user_id=user_id,
+            model_provider=model_provider,
+            model_name=model_name,
+            tool_permissions=permission_rows
+        )
         
+        # Update cache
+        if current_hash:
+            _AGENT_CACHE[user_id] = (agent_executor, current_hash)
+        return agent_executor
+
+    # Build new agent (or join a build already running for the same configuration)
+    if not current_hash:
+        return await _build(), False
+    agent_executor = await _AGENT_BUILDS.do((user_id, current_hash), _build)
     return agent_executor, False
 
+def _all_disabled(
+    descriptors: List[Any], server_info: Dict[str, Any], permission_rows: Dict[int, Dict[str, Any]]
+) -> bool:
+    """True if the user's permission rows disable every one of the server's `descriptors`."""
+    perms = permission_rows.get(server_info.get("id"), {})
+    return all(
+        perms.get(d.tool_name) is not None and not perms[d.tool_name].is_enabled for d in descriptors
+    )
+
+async def _sync_server_tools(
+    agent_executor: Any,
+    user_id: str,
+    user_servers: Dict[str, Any],
+    permission_rows: Optional[Dict[int, Dict[str, Any]]]
+):
+    """
+    Brings a cached agent's tools up to date with servers whose manifest or tool
+    permissions changed since it was built (see `server_tool_state`). Only tools that were
+    added, removed (or disabled) or changed are swapped in the agent's registry, whose
+    search index is updated in place; everything else, built tools included, is kept.
+    A server whose rebuild comes back empty while permissions still allow some of its tools
+    is left as it is and retried on a later request.
+    """
+    registry = getattr(agent_executor, "tool_registry", None)
+    states = getattr(agent_executor, "server_states", None)
+    # Without permission rows we can't tell which tools are enabled; keep the agent as it is
+    if registry is None or states is None or permission_rows is None:
+        return
+
+    for server_name, server_info in user_servers.items():
+        if not isinstance(server_info, dict):
+            continue
+        state = server_tool_state(server_info, permission_rows)
+        if states.get(server_name) == state:
+            continue
+
+        fresh = await build_server_tools(
+            server_name, server_info, user_id=user_id, blocking=False, tool_permissions=permission_rows
+        )
+        # Another request may have applied the same update while we were building
+        if states.get(server_name) == state:
+            continue
+
+        current = registry.list_server_tools(server_name)
+        if not fresh and current and not _all_disabled(current, server_info, permission_rows):
+            # The build failed (catalog unavailable, server down); keep the registered tools
+            # and leave the state stale so a later request retries
+            logger.warning(f"Could not rebuild tools of '{server_name}' for user {user_id}; keeping cached tools")
+            continue
+        diff = diff_server_tools(current, fresh)
+        stale = set(diff["removed"]) | set(diff["changed"])
+        incoming = set(diff["added"]) | set(diff["changed"])
+
+        registry.remove_tools([t.name for t in current if t.tool_name in stale])
+        additions = [t for t in fresh if t.tool_name in incoming]
+        registry.register_tools(
+            deduplicate_tool_names(additions, taken_names=[t.name for t in registry.list_tools()])
+        )
+        states[server_name] = state
+        if any(diff.values()):
+            logger.info(
+                f"Synced tools of '{server_name}' into cached agent for user {user_id}: "
+                f"added={diff['added']}, removed={diff['removed']}, changed={diff['changed']}"
+            )
+
 def invalidate_agent_cache(user_id: str):
     """
     Manually invalidate the cache for a user.
@@ -137,3 +211,80 @@ def invalidate_agent_cache(user_id: str):
     if user_id in _AGENT_CACHE:
         logger.info(f"Invalidating agent cache for user {user_id}")
         del _AGENT_CACHE[user_id]
+
+
+async def _load_user_servers(user_id: str) -> Dict[str, Any]:
+    from app.database.database import AsyncSessionLocal
+    from app.services.mcp.config import get_user_servers
+
+    async with AsyncSessionLocal() as db:
+        return await get_user_servers(db, user_id=user_id)
+
+
+async def _open_server_sessions(user_servers: Dict[str, Any]) -> Tuple[int, int]:
+    """Opens (or reuses) a pooled MCP session per server; returns (ready, total)."""
+    from app.services.agent.tools import create_connector
+
+    connectors = [create_connector(name, info) for name, info in user_servers.items()]
+    results = await asyncio.gather(*(c.warm_up() for c in connectors))
+    return sum(results), len(connectors)
+
+
+async def warm_up_agent(user_id: str, model_provider: str = "gemini", model_name: str = "gemini-2.5-flash"):
+    """
+    Builds (or reuses) the user's agent and opens pooled MCP sessions for each of their
+    servers, so the first prompt doesn't pay for the build and the handshakes.
+    """
+    user_servers = await _load_user_servers(user_id)
+    _, is_cache_hit = await get_or_create_agent(user_id, user_servers, model_provider, model_name)
+    ready, total = await _open_server_sessions(user_servers)
+    logger.info(
+        f"Warm-up for user {user_id}: agent {'cached' if is_cache_hit else 'built'}, "
+        f"{ready}/{total} MCP sessions ready"
+    )
+
+
+async def warm_up_sessions(user_id: str):
+    """
+    Opens pooled MCP sessions for the user's servers without building an agent. Used at
+    login, before the client has picked a model (the agent is warmed for that model by
+    `POST /api/agent/warmup`).
+    """
+    ready, total = await _open_server_sessions(await _load_user_servers(user_id))
+    logger.info(f"Session warm-up for user {user_id}: {ready}/{total} MCP sessions ready")
+
+
+def _schedule(key: Tuple, warm_up, user_id: str) -> bool:
+    if _WARMUPS.is_inflight(key):
+        return False
+
+    async def _run():
+        try:
+            await _WARMUPS.do(key, warm_up)
+        except Exception as e:
+            logger.warning(f"Warm-up failed for user {user_id}: {e}")
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _WARMUP_TASKS.add(task)
+    task.add_done_callback(_WARMUP_TASKS.discard)
+    return True
+
+
+def schedule_warm_up(user_id: str, model_provider: str = "gemini", model_name: str = "gemini-2.5-flash") -> bool:
+    """
+    Starts `warm_up_agent` in the background. Returns False if one is already running
+    for the same user and model.
+    """
+    return _schedule(
+        (user_id, model_provider, model_name),
+        lambda: warm_up_agent(user_id, model_provider, model_name),
+        user_id,
+    )
+
+
+def schedule_session_warm_up(user_id: str) -> bool:
+    """
+    Starts `warm_up_sessions` in the background. Returns False if one is already running
+    for the user.
+    """
+    return _schedule((user_id, "sessions"), lambda: warm_up_sessions(user_id), user_id)
@@ -0,0 +1,140 @@
+"""
+Per-server circuit breakers for MCP connections.
+
+When a server keeps failing with connection/timeout errors its breaker opens and calls
+fail fast instead of waiting on connect errors and retries. After a cool-down a single
+probe call is let through (half-open); its outcome closes or re-opens the circuit.
+"""
+import logging
+import os
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MCP_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("MCP_CIRCUIT_FAILURE_THRESHOLD", 3))
+MCP_CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("MCP_CIRCUIT_RECOVERY_TIMEOUT", 30))
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one MCP server.
+
+    Args:
+        name (str): Server identifier used in logs (usually the server URL).
+        failure_threshold (int): Consecutive failures that open the circuit.
+        recovery_timeout (float): Seconds the circuit stays open before allowing a probe.
+    """
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = MCP_CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = MCP_CIRCUIT_RECOVERY_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        self._last_failure_at: Optional[float] = None
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self.retry_in() <= 0:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 if not open)."""
+        if self._state != CircuitState.OPEN or self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def is_available(self) -> bool:
+        """True unless the circuit is open. Does not consume the half-open probe."""
+        return self.state != CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        Returns True if a call may proceed. In half-open state only one probe call is
+        allowed at a time.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._state != CircuitState.CLOSED:
+            logger.info(f"Circuit for {self.name} closed after successful call")
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Frees the half-open probe slot when a call ended without a verdict (e.g. cancelled)."""
+        self._probe_in_flight = False
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        self._failures += 1
+        self._last_failure_at = time.time()
+        if error is not None:
+            self._last_error = str(error)[:500]
+
+        if self._state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != CircuitState.OPEN:
+                logger.warning(f"Circuit for {self.name} OPEN after {self._failures} failure(s): {self._last_error}")
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Health state for the API and the agent."""
+        state = self.state
+        return {
+            "state": state.value,
+            "available": state != CircuitState.OPEN,
+            "consecutive_failures": self._failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+            "last_error": self._last_error,
+            "last_failure_at": self._last_failure_at,
+        }
+
+
+# server_url -> breaker, shared by every connector in the process
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(server_url: str) -> CircuitBreaker:
+    breaker = _BREAKERS.get(server_url)
+    if breaker is None:
+        breaker = _BREAKERS[server_url] = CircuitBreaker(server_url)
+    return breaker
+
+
+def is_server_available(server_url: Optional[str]) -> bool:
+    """True if calls to `server_url` are currently allowed (unknown servers are available)."""
+    if not server_url or server_url not in _BREAKERS:
+        return True
+    return _BREAKERS[server_url].is_available()
+
+
+def server_health(server_url: str) -> Dict[str, Any]:
+    if server_url not in _BREAKERS:
+        return CircuitBreaker(server_url).snapshot()
+    return _BREAKERS[server_url].snapshot()
@@ -54,7 +54,10 @@ async def get_user_servers(db: AsyncSession, user_id: str) -> Dict[str, Dict[str
             "url": setting.server_url,
             "credentials": setting.credentials,
             "oauth_config": oauth_config,
-            "tools_manifest": setting.tools_manifest  # NEW: Include cached tool definitions
+            "tools_manifest": setting.tools_manifest,  # NEW: Include cached tool definitions
+            "tool_catalog": setting.tool_catalog,  # Precompiled form of the manifest
+            "manifest_version": setting.manifest_version or 0,  # Lets cached agents patch in tool changes
+            "transport": setting.transport
         }
     
     if server_dict:
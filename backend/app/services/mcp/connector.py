@@ -1,11 +1,17 @@
 import asyncio
+import os
+from datetime import timedelta
 from typing import Dict, Any, List, Optional
 from urllib.parse import urlparse, parse_qs
-from mcp import ClientSession
+import anyio
+from mcp import ClientSession, types
+from mcp.shared.exceptions import McpError
 from mcp.client.sse import sse_client
 from mcp.client.streamable_http import streamablehttp_client
 import httpx
 import json
+from pydantic import ValidationError
+import time
 import logging
 import logging
 from sqlalchemy import select
@@ -14,17 +20,136 @@ from ...database.database import AsyncSessionLocal
 import logging
 from contextlib import AsyncExitStack
 
+from .session_pool import session_pool, credential_fingerprint, SessionKey
+from .singleflight import SingleFlight
+from .tools_cache import ToolsCache
+from .circuit_breaker import get_breaker
+from .retry_policy import get_retry_policy, RETRY_REASON_AUTH, RETRY_REASON_TRANSIENT
+from .exceptions import CircuitOpenError, ToolCallError, ToolCallTimeoutError
+from .result_cache import result_cache_key, get_cached_result, set_cached_result
+from .latency import adaptive_timeout, record_latency
+from ..tool_events import emit_tool_event, bind_tool_event_emitter
+
 logger = logging.getLogger(__name__)
 
-# Module-level cache for tool lists: (server_url, token_hash) -> (tools_data, timestamp)
-_TOOLS_CACHE: Dict[str, Any] = {}
+# Module-level cache for tool lists: (server_url, credential_fingerprint) -> tools_data
+# Bounded by entry count and byte size, with a TTL (see tools_cache.py)
+_TOOLS_CACHE = ToolsCache()
+
+# In-flight tools/list requests, so concurrent cache misses share one network call
+_LIST_TOOLS_FLIGHT = SingleFlight("mcp-list-tools")
+
+# Transports, in default probe order
+TRANSPORT_SSE = "sse"
+TRANSPORT_STREAMABLE_HTTP = "streamable_http"
+_TRANSPORTS = (TRANSPORT_SSE, TRANSPORT_STREAMABLE_HTTP)
+
+# Last transport that worked per server_url, shared by every connector in the process
+_TRANSPORT_CACHE: Dict[str, str] = {}
+
+# Extra time allowed for writing the request before the transport itself is considered stuck
+MCP_TOOL_CALL_GRACE = float(os.getenv("MCP_TOOL_CALL_GRACE", 5))
+
+# Fire-and-forget work (cancellations, latency samples), kept referenced until it finishes
+_BACKGROUND_TASKS: set = set()
+
+
+def _spawn_background(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+def _is_transient_exception(exc) -> bool:
+    """Check if exception is a transient network/connection error."""
+    if isinstance(exc, ToolCallError):
+        return False  # The server answered; retrying on a new session won't help
+    transient_types = (
+        ConnectionError,
+        ConnectionResetError,
+        ConnectionRefusedError,
+        ConnectionAbortedError,
+        TimeoutError,
+        asyncio.TimeoutError,
+        OSError,  # Covers many network-level errors
+    )
+    # Direct type check
+    if isinstance(exc, transient_types):
+        return True
+    # Check error message for common transient patterns
+    msg = str(exc).lower()
+    transient_patterns = [
+        "connection reset", "connection refused", "connection closed",
+        "timed out", "timeout", "temporarily unavailable",
+        "network unreachable", "broken pipe", "eof",
+    ]
+    if any(p in msg for p in transient_patterns):
+        return True
+    # Check nested exceptions
+    if getattr(exc, '__cause__', None) and _is_transient_exception(exc.__cause__):
+        return True
+    if getattr(exc, '__context__', None) and _is_transient_exception(exc.__context__):
+        return True
+    if hasattr(exc, 'exceptions'):
+        for sub_exc in exc.exceptions:
+            if _is_transient_exception(sub_exc):
+                return True
+    return False
+
+
+def _is_auth_exception(exc) -> bool:
+    """Recursively check for 401 or auth-related errors in exceptions and nested groups."""
+    if isinstance(exc, ToolCallError):
+        return False
+    msg = str(exc).lower()
+    if "401" in msg or "unauthorized" in msg or "authentication failed" in msg:
+        return True
+    # Check direct cause or context
+    if getattr(exc, '__cause__', None) and _is_auth_exception(exc.__cause__):
+        return True
+    if getattr(exc, '__context__', None) and _is_auth_exception(exc.__context__):
+        return True
+    # Check nested exceptions (ExceptionGroup / TaskGroup)
+    if hasattr(exc, 'exceptions'):
+        for sub_exc in exc.exceptions:
+            if _is_auth_exception(sub_exc):
+                return True
+    return False
+
+
+def _is_session_exception(exc) -> bool:
+    """
+    True if `exc` means the session's transport is broken and the pooled session must be
+    replaced; False for failures scoped to a single call (tool errors, validation, timeouts).
+    """
+    if isinstance(exc, ToolCallError):
+        return False
+    if isinstance(exc, McpError):
+        return exc.error.code == types.CONNECTION_CLOSED
+    if isinstance(exc, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, httpx.TransportError)):
+        return True
+    if hasattr(exc, 'exceptions'):
+        return any(_is_session_exception(sub_exc) for sub_exc in exc.exceptions)
+    return _is_transient_exception(exc)
+
+
+def invalidate_tools_cache(server_url: Optional[str] = None) -> int:
+    """
+    Drops cached tool lists for a server (all credentials), or all servers if omitted.
+    Returns the number of entries removed.
+    """
+    removed = _TOOLS_CACHE.invalidate(server_url)
+    if removed:
+        logger.info(f"Invalidated {removed} cached tool list(s) for {server_url or 'all servers'}")
+    return removed
+
 
 class MCPConnector:
     """
     Manages persistent connections and tool execution for Model Context Protocol (MCP) servers.
 
     This class handles:
-    - Establishing and maintaining sessions (SSE or HTTP).
+    - Leasing pooled sessions (SSE or HTTP) from the shared session pool.
     - Authentication and Token Management (OAuth, Refresh).
     - Tool discovery and caching.
     - Reliable tool execution with retries and error handling.
@@ -42,7 +167,8 @@ class MCPConnector:
         server_name: Optional[str] = None,
         oauth_config: Optional[Dict] = None,
         db_session: Optional[Any] = None,
-        setting_id: Optional[int] = None
+        setting_id: Optional[int] = None,
+        transport: Optional[str] = None
     ):
         """
         Initialize the MCP Connector.
@@ -54,20 +180,20 @@ class MCPConnector:
             oauth_config (dict, optional): Config for OAuth flow (client_id, etc.).
             db_session (Any, optional): Storage session (not primarily used here, usually passed to managers).
             setting_id (int, optional): ID to update credentials in the DB.
+            transport (str, optional): Previously discovered transport ("sse" or "streamable_http").
         """
         self.server_url = server_url
         self.server_name = server_name
         self.oauth_config = oauth_config
         self.db_session = db_session
         self.setting_id = setting_id
+        self.transport = transport if transport in _TRANSPORTS else None
         self._parsed_url = urlparse(server_url)
         self._credentials = self._parse_credentials(credentials)
         self._token = self._extract_token()
         
-        # Session management
-        self._session: Optional[ClientSession] = None
-        self._exit_stack: Optional[AsyncExitStack] = None
-        self._lock = asyncio.Lock()
+        # Session management: sessions live in the process-wide pool and are leased per operation
+        self._last_session_key: Optional[SessionKey] = None
         
         # Determine header format based on server
         if "figma.com" in server_url:
@@ -228,78 +354,177 @@ class MCPConnector:
         
         return True
 
-    async def list_tools(self) -> List[Dict[str, Any]]:
+    async def list_tools(self, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Lists the server's tools, from the tools cache when possible.
+
+        Args:
+            force (bool): Always ask the server, without the cache and without joining a fetch
+                already in flight (which may have started before a refresh). The result
+                replaces the cached list.
+        """
         # 0. Ensure token is valid BEFORE checking cache
         # This prevents returning cached tools when the user's session is actually expired
         if not await self._ensure_valid_token():
              # Should practically unreachable as _ensure_valid_token raises exceptions on failure
              raise RuntimeError(f"Token validation failed for {self.server_name}")
 
+        cache_key = self._session_key
+        if force:
+            tools = await self._execute_with_retry(self._list_tools_internal)
+            _TOOLS_CACHE.set(cache_key, tools)
+            return tools
+
         # 1. Check module-level cache
-        cache_key = f"{self.server_url}:{hash(str(self._token))}"
-        if cache_key in _TOOLS_CACHE:
+        cached_tools = _TOOLS_CACHE.get(cache_key)
+        if cached_tools is not None:
             logger.info(f"Returning cached tools for {self.server_name or self.server_url}")
-            return _TOOLS_CACHE[cache_key]
+            return cached_tools
+
+        # 2. Execute and cache (coalesced with concurrent misses for the same key); the
+        # result is dropped if the cache is invalidated while the fetch is running
+        async def _fetch():
+            generation = _TOOLS_CACHE.generation(cache_key)
+            tools = await self._execute_with_retry(self._list_tools_internal)
+            _TOOLS_CACHE.set(cache_key, tools, generation=generation)
+            return tools
 
-        # 2. Execute and cache
-        tools = await self._execute_with_retry(self._list_tools_internal)
-        _TOOLS_CACHE[cache_key] = tools
-        return tools
+        return await _LIST_TOOLS_FLIGHT.do(cache_key, _fetch)
 
-    async def _get_session(self) -> ClientSession:
+    @property
+    def _session_key(self) -> SessionKey:
+        """Pool key for the current credentials; changes when the token is refreshed."""
+        return (self.server_url, credential_fingerprint(self._headers))
+
+    async def _open_session(self, exit_stack: AsyncExitStack) -> ClientSession:
         """
-        Returns a persistent session, creating it if necessary.
+        Opens the transport and initializes a new MCP session inside `exit_stack`.
+        Used by the session pool on a miss; ownership of the stack stays with the pool.
         """
-        async with self._lock:
-            if self._session:
-                return self._session
+        logger.info(f"Initializing persistent MCP session for {self.server_name or self.server_url}")
 
-            logger.info(f"Initializing persistent MCP session for {self.server_name or self.server_url}")
-            self._exit_stack = AsyncExitStack()
-            
+        # Try the remembered transport first; only re-probe the others if it fails
+        known = _TRANSPORT_CACHE.get(self.server_url) or self.transport
+        order = [known] + [t for t in _TRANSPORTS if t != known] if known else list(_TRANSPORTS)
+
+        first_error: Optional[Exception] = None
+        for transport in order:
+            attempt_stack = AsyncExitStack()
             try:
-                # Determine method
-                try:
-                    # SSE
-                    ctx = sse_client(self.server_url, headers=self._headers)
-                    read_stream, write_stream = await self._exit_stack.enter_async_context(ctx)
-                except Exception as e:
-                    logger.warning(f"SSE failed for {self.server_url}, trying Streamable HTTP: {e}")
-                    ctx = streamablehttp_client(self.server_url, headers=self._headers)
-                    read_stream, write_stream, _ = await self._exit_stack.enter_async_context(ctx)
-
-                self._session = await self._exit_stack.enter_async_context(ClientSession(read_stream, write_stream))
-                await self._session.initialize()
-                return self._session
+                session = await self._connect_transport(attempt_stack, transport)
             except Exception as e:
-                if self._exit_stack:
-                    await self._exit_stack.aclose()
-                self._exit_stack = None
-                self._session = None
-                raise e
+                await attempt_stack.aclose()
+                if _is_auth_exception(e):
+                    # The server answered; another transport won't fix the credentials, and
+                    # the retry loop needs this error to force a token refresh
+                    raise
+                logger.warning(f"{transport} transport failed for {self.server_url}: {e}")
+                if first_error is None:
+                    first_error = e
+                continue
+
+            exit_stack.push_async_callback(attempt_stack.aclose)
+            await self._remember_transport(transport)
+            return session
+
+        # Report the remembered transport's failure: the fallbacks' errors (404/405 from a
+        # server that doesn't speak them) would hide it. The transport stays remembered.
+        raise first_error
+
+    async def _connect_transport(self, exit_stack: AsyncExitStack, transport: str) -> ClientSession:
+        """Opens `transport` and completes the MCP initialize handshake over it."""
+        if transport == TRANSPORT_SSE:
+            ctx = sse_client(self.server_url, headers=self._headers)
+            read_stream, write_stream = await exit_stack.enter_async_context(ctx)
+        else:
+            ctx = streamablehttp_client(self.server_url, headers=self._headers)
+            read_stream, write_stream, _ = await exit_stack.enter_async_context(ctx)
+
+        session = await exit_stack.enter_async_context(ClientSession(read_stream, write_stream))
+        await session.initialize()
+        return session
+
+    async def _remember_transport(self, transport: str):
+        """
+        Caches the working transport in memory and persists it on the server setting,
+        so later cold sessions skip the failed probe.
+        """
+        _TRANSPORT_CACHE[self.server_url] = transport
+        if transport == self.transport:
+            return
+        self.transport = transport
+
+        if self.setting_id:
+            try:
+                async with AsyncSessionLocal() as session:
+                    from ...models.settings import McpServerSetting
+                    stmt = select(McpServerSetting).where(McpServerSetting.id == self.setting_id)
+                    result = await session.execute(stmt)
+                    setting = result.scalars().first()
+
+                    if setting and setting.transport != transport:
+                        setting.transport = transport
+                        session.add(setting)
+                        await session.commit()
+                        logger.info(f"Stored transport '{transport}' for {self.server_name} (Setting ID: {self.setting_id})")
+            except Exception as e:
+                logger.error(f"Failed to store transport in database: {e}")
+
+    def _lease_session(self):
+        """
+        Leases a warm session from the shared pool for the duration of an `async with` block.
+        """
+        key = self._session_key
+        self._last_session_key = key
+        return session_pool.lease(key, self._open_session)
+
+    async def warm_up(self) -> bool:
+        """
+        Opens (or reuses) this server's pooled session ahead of the first tool call.
+
+        Returns:
+            bool: True if a healthy session is ready; failures are logged, not raised.
+        """
+        async def _lease():
+            async with self._lease_session():
+                return True
+
+        try:
+            return await self._execute_with_retry(_lease)
+        except Exception as e:
+            logger.info(f"Warm-up skipped for {self.server_name or self.server_url}: {e}")
+            return False
 
     async def close(self):
-        """Clean up the persistent session."""
-        async with self._lock:
-            if self._exit_stack:
-                await self._exit_stack.aclose()
-            self._exit_stack = None
-            self._session = None
+        """Discard the pooled session so the next operation opens a fresh one."""
+        if self._last_session_key:
+            await session_pool.discard(self._last_session_key)
+        self._last_session_key = None
 
     async def _list_tools_internal(self):
-        session = await self._get_session()
-        tools_result = await session.list_tools()
+        session = None
+        try:
+            async with self._lease_session() as session:
+                tools_result = await session.list_tools()
+        except Exception as e:
+            if session is not None and _is_session_exception(e):
+                logger.warning(f"Transport failed while listing tools on {self.server_url}, discarding session: {e}")
+                await session_pool.discard(self._session_key, session)
+            raise
         return await self._process_tools_result(tools_result)
 
     async def _execute_with_retry(self, operation, *args, **kwargs):
         """
-        Generic retry logic for authentication and transient network errors.
+        Generic retry logic for authentication and transient network errors,
+        guarded by the server's circuit breaker.
 
         Strategy:
+        0. Fail fast with CircuitOpenError while the server's circuit is open.
         1. Validate token.
         2. Attempt operation.
         3. On Auth Error (401): Force refresh token and retry.
-        4. On Transient Error (Timeout/Connection): Clear session and retry once.
+        4. On Transient Error (Timeout/Connection): Retry with backoff on a fresh session.
+        Retries follow the server's RetryPolicy (attempt limit, time budget, jitter).
 
         Args:
             operation (Callable): Async function to execute.
@@ -310,102 +535,87 @@ class MCPConnector:
             Any: The result of the operation.
 
         Raises:
+            CircuitOpenError: If the server is currently considered down.
             RequiresAuthenticationError: If re-auth is needed even after refresh.
             RuntimeError: If token validation fails hard.
             Exception: Original exception if not handled by retry logic.
         """
-        # Helper to detect transient/connection errors
-        def is_transient_exception(exc):
-            """Check if exception is a transient network/connection error."""
-            transient_types = (
-                ConnectionError,
-                ConnectionResetError,
-                ConnectionRefusedError,
-                ConnectionAbortedError,
-                TimeoutError,
-                asyncio.TimeoutError,
-                OSError,  # Covers many network-level errors
-            )
-            # Direct type check
-            if isinstance(exc, transient_types):
-                return True
-            # Check error message for common transient patterns
-            msg = str(exc).lower()
-            transient_patterns = [
-                "connection reset", "connection refused", "connection closed",
-                "timed out", "timeout", "temporarily unavailable",
-                "network unreachable", "broken pipe", "eof",
-            ]
-            if any(p in msg for p in transient_patterns):
-                return True
-            # Check nested exceptions
-            if getattr(exc, '__cause__', None) and is_transient_exception(exc.__cause__):
-                return True
-            if getattr(exc, '__context__', None) and is_transient_exception(exc.__context__):
-                return True
-            if hasattr(exc, 'exceptions'):
-                for sub_exc in exc.exceptions:
-                    if is_transient_exception(sub_exc):
-                        return True
-            return False
+        breaker = get_breaker(self.server_url)
+        if not breaker.allow_request():
+            raise CircuitOpenError(self.server_name or self.server_url, breaker.retry_in())
 
-        # Recursively check for 401 or auth-related errors in exceptions and nested groups
-        def is_auth_exception(exc):
-            msg = str(exc).lower()
-            if "401" in msg or "unauthorized" in msg or "authentication failed" in msg:
-                return True
-            # Check direct cause or context
-            if getattr(exc, '__cause__', None) and is_auth_exception(exc.__cause__):
-                return True
-            if getattr(exc, '__context__', None) and is_auth_exception(exc.__context__):
-                return True
-            # Check nested exceptions (ExceptionGroup / TaskGroup)
-            if hasattr(exc, 'exceptions'):
-                for sub_exc in exc.exceptions:
-                    if is_auth_exception(sub_exc):
-                        return True
-            return False
+        try:
+            result = await self._attempt_with_retry(operation, *args, **kwargs)
+        except ToolCallTimeoutError:
+            # A slow tool says nothing about the server's health either way
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            # Only connection-level failures count against the server; auth and
+            # tool errors mean it answered.
+            if _is_transient_exception(e):
+                breaker.record_failure(e)
+            else:
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+        breaker.record_success()
+        return result
 
+    async def _attempt_with_retry(self, operation, *args, **kwargs):
+        """
+        Runs `operation` under the server's retry policy (see retry_policy.py): transient
+        errors get a fresh connection after a jittered backoff, an auth error gets one
+        forced token refresh, and nothing is retried past the attempt limit or time budget.
+        """
         # 1. Initial Standard Check
         if not await self._ensure_valid_token():
              raise RuntimeError(f"Token refresh failed for {self.server_name}. Please re-authenticate.")
 
-        try:
-            return await operation(*args, **kwargs)
-        except Exception as e:
-            # Priority 1: Auth errors -> Refresh token and retry
-            if is_auth_exception(e):
-                logger.warning(f"Authentication failed for {self.server_name} (Error: {e}). Forcing token refresh and retrying...")
-                
-                # Force Refresh
-                if await self._ensure_valid_token(force_refresh=True):
-                    # Clear stale session before retry
-                    await self.close()
-                    try:
-                        logger.info(f"Retrying operation for {self.server_name} with new token...")
-                        return await operation(*args, **kwargs)
-                    except Exception as retry_e:
-                        logger.error(f"Retry failed for {self.server_name}: {retry_e}")
-                        if is_auth_exception(retry_e):
-                             from .exceptions import RequiresAuthenticationError
-                             raise RequiresAuthenticationError(self.server_name)
-                        raise retry_e
+        run = get_retry_policy(self.server_url).begin()
+        while True:
+            try:
+                result = await operation(*args, **kwargs)
+                run.succeeded()
+                return result
+            except Exception as e:
+                # Priority 1: Auth errors -> Refresh token and retry (once; a second 401 means re-auth)
+                if _is_auth_exception(e):
+                    if run.retries.get(RETRY_REASON_AUTH):
+                        logger.error(f"Retry failed for {self.server_name}: {e}")
+                        from .exceptions import RequiresAuthenticationError
+                        raise RequiresAuthenticationError(self.server_name)
+                    reason = RETRY_REASON_AUTH
+                # Priority 2: Transient errors -> Clear session and retry
+                elif _is_transient_exception(e):
+                    reason = RETRY_REASON_TRANSIENT
                 else:
-                     raise RuntimeError(f"Forced token refresh failed for {self.server_name}. Please re-authenticate.")
-            
-            # Priority 2: Transient errors -> Clear session and retry once
-            elif is_transient_exception(e):
-                logger.warning(f"Transient error for {self.server_name} (Error: {e}). Clearing session and retrying...")
-                await self.close()  # Clear dead session
-                try:
-                    logger.info(f"Retrying operation for {self.server_name} with fresh connection...")
-                    return await operation(*args, **kwargs)
-                except Exception as retry_e:
-                    logger.error(f"Retry after transient error failed for {self.server_name}: {retry_e}")
-                    raise retry_e
-            
-            else:
-                raise e
+                    raise
+
+                delay = run.next_delay(reason)
+                if delay is None:
+                    logger.error(
+                        f"Giving up on {self.server_name} after {run.attempts} attempt(s) "
+                        f"({run.remaining():.1f}s of retry budget left): {e}"
+                    )
+                    raise
+
+                if reason == RETRY_REASON_AUTH:
+                    logger.warning(f"Authentication failed for {self.server_name} (Error: {e}). Forcing token refresh and retrying...")
+                    if not await self._ensure_valid_token(force_refresh=True):
+                        raise RuntimeError(f"Forced token refresh failed for {self.server_name}. Please re-authenticate.")
+                else:
+                    logger.warning(
+                        f"Transient error for {self.server_name} (Error: {e}). "
+                        f"Retrying with a fresh connection in {delay:.2f}s (attempt {run.attempts})..."
+                    )
+                # A broken session was already discarded by the operation that saw it fail
+                # (identity-checked, so a replacement opened by another call survives)
+                if delay:
+                    await asyncio.sleep(delay)
 
     async def _process_tools_result(self, tools_result) -> List[Dict[str, Any]]:
         tool_list = []
@@ -420,14 +630,111 @@ class MCPConnector:
                 else:
                     input_schema = tool.inputSchema
 
+            # Behaviour hints (readOnlyHint, destructiveHint, ...) drive result caching
+            annotations = getattr(tool, "annotations", None)
+            if annotations is not None and hasattr(annotations, "model_dump"):
+                annotations = annotations.model_dump(exclude_none=True)
+
             tool_list.append({
                 "name": tool.name,
                 "description": tool.description,
                 "argument_schema": input_schema,
+                "annotations": annotations or None,
             })
         return tool_list
 
-    async def run_tool(self, tool_name: str, parameters: dict):
+    async def _call_tool(self, session: ClientSession, tool_name: str, parameters: dict, timeout: float):
+        """
+        Sends one `tools/call` over a (possibly shared) session with its own deadline.
+
+        Requests on a session are multiplexed by JSON-RPC id, so a timeout or cancellation
+        here only affects this call: the server is sent `notifications/cancelled` for it and
+        the session stays in the pool for the other in-flight calls.
+
+        Progress notifications for the call are forwarded to the current request's stream as
+        `tool_progress` events while the call is still running. The call's duration is added
+        to the tool's latency histogram, which drives its adaptive timeout.
+
+        Raises:
+            ToolCallTimeoutError: If the server did not answer within `timeout` seconds.
+            ToolCallError: If the server rejected the call or returned an invalid result.
+        """
+        # send_request takes the next id synchronously when call_tool starts, so this is ours.
+        # `_request_id` is SDK-private (see the mcp pin in pyproject.toml); without it we
+        # can't name the request and skip the cancellation notice.
+        request_id = getattr(session, "_request_id", None)
+        server = self.server_name or self.server_url
+        # Notifications are dispatched by the session's reader task, outside this request's context
+        emit = bind_tool_event_emitter()
+        started_at = time.monotonic()
+
+        async def _on_progress(progress: float, total: Optional[float], message: Optional[str]):
+            emit(
+                "tool_progress",
+                tool_name=tool_name,
+                server_name=self.server_name,
+                progress=progress,
+                total=total,
+                message=message,
+                elapsed_seconds=round(time.monotonic() - started_at, 2),
+            )
+
+        try:
+            result = await session.call_tool(
+                tool_name,
+                parameters,
+                read_timeout_seconds=timedelta(seconds=timeout),
+                progress_callback=_on_progress,
+            )
+            _spawn_background(record_latency(self.server_url, tool_name, time.monotonic() - started_at))
+            return result
+        except McpError as e:
+            if e.error.code == httpx.codes.REQUEST_TIMEOUT:
+                if request_id is not None:
+                    self._cancel_request(session, request_id, f"Timed out after {timeout:.0f}s")
+                _spawn_background(record_latency(self.server_url, tool_name, timeout, timed_out=True))
+                raise ToolCallTimeoutError(server, tool_name, timeout) from e
+            if _is_session_exception(e) or _is_auth_exception(e):
+                raise
+            # The server answered, so the round trip is still a valid latency sample
+            _spawn_background(record_latency(self.server_url, tool_name, time.monotonic() - started_at))
+            raise ToolCallError(server, tool_name, e.error.message) from e
+        except ValidationError as e:
+            raise ToolCallError(server, tool_name, f"Invalid result: {e}") from e
+        except RuntimeError as e:
+            # Raised by the SDK when structured content doesn't match the tool's output schema
+            if _is_session_exception(e):
+                raise
+            raise ToolCallError(server, tool_name, str(e)) from e
+        except asyncio.CancelledError:
+            if request_id is not None:
+                self._cancel_request(session, request_id, "Cancelled by client")
+            raise
+
+    def _cancel_request(self, session: ClientSession, request_id: int, reason: str):
+        """Asks the server to stop working on `request_id` without blocking the caller."""
+        async def _send():
+            try:
+                await session.send_notification(
+                    types.ClientNotification(
+                        types.CancelledNotification(
+                            params=types.CancelledNotificationParams(requestId=request_id, reason=reason)
+                        )
+                    )
+                )
+            except Exception as e:
+                logger.debug(f"Could not send cancellation for request {request_id} to {self.server_url}: {e}")
+
+        _spawn_background(_send())
+
+    async def run_tool(
+        self,
+        tool_name: str,
+        parameters: dict,
+        cache_ttl: int = 0,
+        user_scope: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
         """
         Executes a specific tool on the MCP server.
 
@@ -437,23 +744,61 @@ class MCPConnector:
         Args:
             tool_name (str): The name of the tool to run.
             parameters (dict): The arguments to pass to the tool.
+            cache_ttl (int): Seconds to cache a successful result (read-only tools only; 0 disables).
+            user_scope (str, optional): Scope for cached results, usually the user ID.
+                Defaults to the credential fingerprint.
+            timeout (float, optional): Per-tool deadline override in seconds. Defaults to the
+                adaptive timeout learned from the tool's observed latency (see latency.py).
 
         Returns:
             str or Any: The tool output or error message.
         """
+        cache_key = None
+        if cache_ttl > 0:
+            cache_key = result_cache_key(self.server_url, tool_name, parameters, user_scope or self._session_key[1])
+            cached = await get_cached_result(cache_key)
+            if cached is not None:
+                logger.info(f"Tool result cache hit for {tool_name} on {self.server_name or self.server_url}")
+                emit_tool_event(
+                    "tool_cache_hit",
+                    tool_name=tool_name,
+                    server_name=self.server_name,
+                    age_seconds=round(time.time() - cached.get("cached_at", time.time()), 1),
+                )
+                return cached["data"]
+
+        call_timeout = await adaptive_timeout(self.server_url, tool_name, timeout)
+
         async def _run_tool_internal(tool_name, parameters):
-            session = await self._get_session()
+            session = None
             try:
-                result = await asyncio.wait_for(session.call_tool(tool_name, parameters), timeout=60.0)
+                async with self._lease_session() as session:
+                    # The outer deadline only fires if the transport itself hangs (e.g. on write)
+                    result = await asyncio.wait_for(
+                        self._call_tool(session, tool_name, parameters, call_timeout),
+                        timeout=call_timeout + MCP_TOOL_CALL_GRACE,
+                    )
                 return result.output if hasattr(result, "output") else result
             except Exception as e:
-                # If call failed, maybe session is dead, clear it so next call retries
-                logger.warning(f"Tool call failed for {tool_name}, clearing session: {e}")
-                await self.close()
-                raise e
+                if session is not None and _is_session_exception(e):
+                    # Only a broken transport resets the shared session; call-level
+                    # errors leave it to the other calls in flight on it.
+                    logger.warning(f"Transport failed during {tool_name} on {self.server_url}, discarding session: {e}")
+                    await session_pool.discard(self._session_key, session)
+                else:
+                    logger.warning(f"Tool call {tool_name} failed on {self.server_name or self.server_url}: {e}")
+                raise
 
         try:
-             return await self._execute_with_retry(_run_tool_internal, tool_name, parameters)
+             result = await self._execute_with_retry(_run_tool_internal, tool_name, parameters)
+             if cache_key:
+                 await set_cached_result(cache_key, result, cache_ttl)
+             return result
+        except CircuitOpenError as e:
+             logger.warning(f"Skipping {tool_name}: {e}")
+             return f"Error: {self.server_name or self.server_url} is temporarily unavailable. {e.message}"
+        except ToolCallError as e:
+             return f"Error: {tool_name} failed on {self.server_name or self.server_url}. {e.message}"
         except Exception as e:
              # Final fallback to return string error so agent doesn't crash
              return f"Error: Tool execution failed for {self.server_name}. {str(e)}"
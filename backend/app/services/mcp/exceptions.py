@@ -7,3 +7,38 @@ class RequiresAuthenticationError(Exception):
         self.server_name = server_name
         self.message = message
         super().__init__(f"{message} for {server_name}")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when calls to an MCP server are short-circuited because its circuit breaker is open
+    (the server failed repeatedly and is in its cool-down period).
+    """
+    def __init__(self, server_name: str, retry_in: float = 0.0):
+        self.server_name = server_name
+        self.retry_in = retry_in
+        self.message = f"Server unavailable, retrying in {retry_in:.0f}s"
+        super().__init__(f"{self.message} ({server_name})")
+
+
+class ToolCallError(Exception):
+    """
+    Raised when a single tool call fails while the MCP session itself is healthy
+    (the server returned a JSON-RPC error, or the result failed validation).
+    Call-level errors never reset the shared session.
+    """
+    def __init__(self, server_name: str, tool_name: str, message: str):
+        self.server_name = server_name
+        self.tool_name = tool_name
+        self.message = message
+        super().__init__(f"{tool_name} on {server_name}: {message}")
+
+
+class ToolCallTimeoutError(ToolCallError):
+    """
+    Raised when a tool call exceeds its deadline. The request is cancelled on the server
+    (`notifications/cancelled`); other calls on the same session are unaffected.
+    """
+    def __init__(self, server_name: str, tool_name: str, timeout: float):
+        self.timeout = timeout
+        super().__init__(server_name, tool_name, f"Timed out after {timeout:.0f}s")
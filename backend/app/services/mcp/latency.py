@@ -0,0 +1,194 @@
+"""
+Per-(server, tool) latency tracking and adaptive tool-call timeouts.
+
+Latencies are kept as log-bucketed streaming histograms in Redis (one hash per tool, each
+field a bucket count), so every worker process learns from the same samples. Bucket bounds
+grow by `_BUCKET_FACTOR`, which keeps percentile error under 25% with ~50 buckets covering
+10ms to 10 minutes. When a histogram grows past MCP_LATENCY_MAX_SAMPLES its counts are halved,
+so old samples fade out and the percentiles follow the tool's current behaviour.
+
+The timeout for a call is p99 * MCP_ADAPTIVE_TIMEOUT_HEADROOM, clamped to
+[MCP_ADAPTIVE_TIMEOUT_MIN, MCP_ADAPTIVE_TIMEOUT_MAX]. Until a tool has
+MCP_LATENCY_MIN_SAMPLES samples the default MCP_TOOL_CALL_TIMEOUT applies.
+"""
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default per-call deadline, used until enough latency samples exist
+MCP_TOOL_CALL_TIMEOUT = float(os.getenv("MCP_TOOL_CALL_TIMEOUT", 60))
+MCP_ADAPTIVE_TIMEOUT_MIN = float(os.getenv("MCP_ADAPTIVE_TIMEOUT_MIN", 5))
+MCP_ADAPTIVE_TIMEOUT_MAX = float(os.getenv("MCP_ADAPTIVE_TIMEOUT_MAX", 300))
+MCP_ADAPTIVE_TIMEOUT_HEADROOM = float(os.getenv("MCP_ADAPTIVE_TIMEOUT_HEADROOM", 1.5))
+MCP_LATENCY_MIN_SAMPLES = int(os.getenv("MCP_LATENCY_MIN_SAMPLES", 20))
+MCP_LATENCY_MAX_SAMPLES = int(os.getenv("MCP_LATENCY_MAX_SAMPLES", 5000))
+# How long a process reuses a computed timeout before re-reading the histogram
+MCP_LATENCY_REFRESH_INTERVAL = float(os.getenv("MCP_LATENCY_REFRESH_INTERVAL", 60))
+# Histograms for tools that stop being called expire after this many seconds
+MCP_LATENCY_RETENTION = int(os.getenv("MCP_LATENCY_RETENTION", 14 * 24 * 3600))
+
+LATENCY_KEY_PREFIX = "mcp:latency:"
+
+_BUCKET_BASE = 0.01  # seconds
+_BUCKET_FACTOR = 1.25
+_BUCKET_COUNT = 50
+
+# (server_url, tool_name) -> (expires_at, timeout)
+_TIMEOUT_CACHE: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+
+def _bucket_index(seconds: float) -> int:
+    if seconds <= _BUCKET_BASE:
+        return 0
+    index = int(math.ceil(math.log(seconds / _BUCKET_BASE, _BUCKET_FACTOR)))
+    return min(index, _BUCKET_COUNT - 1)
+
+
+def _bucket_upper_bound(index: int) -> float:
+    return _BUCKET_BASE * (_BUCKET_FACTOR ** index)
+
+
+def _server_hash(server_url: str) -> str:
+    return hashlib.sha256(server_url.encode("utf-8")).hexdigest()[:16]
+
+
+def _histogram_key(server_url: str, tool_name: str) -> str:
+    return f"{LATENCY_KEY_PREFIX}{_server_hash(server_url)}:{tool_name}"
+
+
+def _tools_index_key(server_url: str) -> str:
+    return f"{LATENCY_KEY_PREFIX}{_server_hash(server_url)}:__tools__"
+
+
+def _percentile(buckets: Dict[int, int], total: int, q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+    if total <= 0:
+        return None
+    rank = q * total
+    seen = 0
+    for index in sorted(buckets):
+        seen += buckets[index]
+        if seen >= rank:
+            return _bucket_upper_bound(index)
+    return _bucket_upper_bound(max(buckets))
+
+
+def timeout_from_p99(p99: Optional[float], samples: int) -> float:
+    """Turns an observed p99 into a call deadline (the default until there are enough samples)."""
+    if p99 is None or samples < MCP_LATENCY_MIN_SAMPLES:
+        return MCP_TOOL_CALL_TIMEOUT
+    return min(MCP_ADAPTIVE_TIMEOUT_MAX, max(MCP_ADAPTIVE_TIMEOUT_MIN, p99 * MCP_ADAPTIVE_TIMEOUT_HEADROOM))
+
+
+async def record_latency(server_url: str, tool_name: str, seconds: float, timed_out: bool = False):
+    """
+    Adds one call duration to the tool's histogram.
+
+    Args:
+        server_url (str): MCP server the tool belongs to.
+        tool_name (str): Tool name as known by the server.
+        seconds (float): Observed duration of the `tools/call` round trip.
+        timed_out (bool): True if the call hit its deadline; the deadline is recorded as a
+            lower bound, so repeated timeouts push p99 (and the next timeout) up.
+    """
+    key = _histogram_key(server_url, tool_name)
+    try:
+        from ..redis.redis_client import async_redis_client
+        pipe = async_redis_client.pipeline(transaction=False)
+        pipe.hincrby(key, str(_bucket_index(seconds)), 1)
+        pipe.hincrby(key, "count", 1)
+        pipe.hincrbyfloat(key, "sum", seconds)
+        if timed_out:
+            pipe.hincrby(key, "timeouts", 1)
+        pipe.expire(key, MCP_LATENCY_RETENTION)
+        pipe.sadd(_tools_index_key(server_url), tool_name)
+        pipe.expire(_tools_index_key(server_url), MCP_LATENCY_RETENTION)
+        await pipe.execute()
+    except Exception as e:
+        logger.debug(f"Failed to record latency for {tool_name}: {e}")
+
+
+async def get_latency_stats(server_url: str, tool_name: str) -> Dict[str, Any]:
+    """
+    Returns the learned latency profile of a tool.
+
+    Returns:
+        dict: samples, timeouts, mean/p50/p90/p99 in seconds (None without samples) and the
+        adaptive `timeout_seconds` that calls currently get.
+    """
+    key = _histogram_key(server_url, tool_name)
+    try:
+        from ..redis.redis_client import async_redis_client
+        raw = await async_redis_client.hgetall(key)
+    except Exception as e:
+        logger.warning(f"Failed to read latency histogram for {tool_name}: {e}")
+        raw = {}
+
+    buckets = {int(field): int(value) for field, value in raw.items() if field.isdigit()}
+    samples = sum(buckets.values())
+    total_seconds = float(raw.get("sum", 0) or 0)
+    recorded = int(raw.get("count", 0) or 0)
+
+    if samples > MCP_LATENCY_MAX_SAMPLES:
+        await _decay(key, buckets, total_seconds, recorded, int(raw.get("timeouts", 0) or 0))
+
+    p99 = _percentile(buckets, samples, 0.99)
+    return {
+        "samples": samples,
+        "timeouts": int(raw.get("timeouts", 0) or 0),
+        "mean": round(total_seconds / recorded, 3) if recorded else None,
+        "p50": _percentile(buckets, samples, 0.50),
+        "p90": _percentile(buckets, samples, 0.90),
+        "p99": p99,
+        "timeout_seconds": round(timeout_from_p99(p99, samples), 1),
+    }
+
+
+async def list_tracked_tools(server_url: str) -> List[str]:
+    """Names of the server's tools that have latency samples."""
+    try:
+        from ..redis.redis_client import async_redis_client
+        return sorted(await async_redis_client.smembers(_tools_index_key(server_url)))
+    except Exception as e:
+        logger.warning(f"Failed to list latency-tracked tools for {server_url}: {e}")
+        return []
+
+
+async def adaptive_timeout(server_url: str, tool_name: str, override: Optional[float] = None) -> float:
+    """
+    Returns the deadline in seconds for the next call to a tool.
+
+    Args:
+        server_url (str): MCP server the tool belongs to.
+        tool_name (str): Tool name as known by the server.
+        override (float, optional): Per-tool setting from the user; wins over learned values.
+    """
+    if override:
+        return float(override)
+
+    cache_key = (server_url, tool_name)
+    cached = _TIMEOUT_CACHE.get(cache_key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+
+    stats = await get_latency_stats(server_url, tool_name)
+    timeout = stats["timeout_seconds"]
+    _TIMEOUT_CACHE[cache_key] = (now + MCP_LATENCY_REFRESH_INTERVAL, timeout)
+    return timeout
+
+
+async def _decay(key: str, buckets: Dict[int, int], total_seconds: float, recorded: int, timeouts: int):
+    """Halves every count so recent samples outweigh old ones. Races with writers only cost precision."""
+    try:
+        from ..redis.redis_client import async_redis_client
+        mapping = {str(index): count // 2 for index, count in buckets.items()}
+        mapping.update({"count": recorded // 2, "sum": total_seconds / 2, "timeouts": timeouts // 2})
+        await async_redis_client.hset(key, mapping=mapping)
+    except Exception as e:
+        logger.debug(f"Failed to decay latency histogram {key}: {e}")
@@ -0,0 +1,90 @@
+"""
+Redis-backed cache for results of read-only MCP tools.
+
+A tool is eligible when its MCP annotations carry `readOnlyHint: true` or when the user
+set an explicit cache TTL for it (`ToolPermission.cache_ttl_seconds`). Entries are keyed
+by (server, tool, canonicalized arguments, user scope) so results never leak between users.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default TTL for tools annotated readOnlyHint; 0 disables annotation-based caching
+MCP_TOOL_RESULT_CACHE_TTL = int(os.getenv("MCP_TOOL_RESULT_CACHE_TTL", 300))
+
+RESULT_CACHE_PREFIX = "mcp:tool_result:"
+
+
+def resolve_cache_ttl(annotations: Optional[Dict[str, Any]], override: Optional[int] = None) -> int:
+    """
+    Returns the result-cache TTL in seconds for a tool (0 = not cached).
+
+    Args:
+        annotations (dict, optional): MCP tool annotations from the manifest.
+        override (int, optional): Per-tool setting. None = use annotations, 0 = never cache.
+    """
+    if override is not None:
+        return max(0, int(override))
+    if annotations and annotations.get("readOnlyHint") is True:
+        return MCP_TOOL_RESULT_CACHE_TTL
+    return 0
+
+
+def result_cache_key(server_url: str, tool_name: str, parameters: Dict[str, Any], scope: str) -> str:
+    """Builds the Redis key for a tool call with canonicalized (sorted, compact) arguments."""
+    canonical_args = json.dumps(parameters or {}, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(
+        "\x1f".join([server_url, tool_name, canonical_args, scope or ""]).encode("utf-8")
+    ).hexdigest()
+    return f"{RESULT_CACHE_PREFIX}{digest}"
+
+
+def _serialize(result: Any) -> Optional[str]:
+    if getattr(result, "isError", False):
+        return None  # Never cache failures
+    if hasattr(result, "model_dump"):
+        return json.dumps({"kind": "call_tool_result", "cached_at": time.time(), "data": result.model_dump(mode="json")})
+    try:
+        return json.dumps({"kind": "json", "cached_at": time.time(), "data": result})
+    except (TypeError, ValueError):
+        return None
+
+
+def _deserialize(raw: str) -> Optional[Dict[str, Any]]:
+    payload = json.loads(raw)
+    if payload.get("kind") == "call_tool_result":
+        from mcp.types import CallToolResult
+        payload["data"] = CallToolResult.model_validate(payload["data"])
+    return payload
+
+
+async def get_cached_result(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns {"data": result, "cached_at": ts} for a cached call, or None.
+    Cache errors are logged and treated as misses.
+    """
+    try:
+        from ..redis.redis_client import async_redis_client
+        raw = await async_redis_client.get(key)
+        return _deserialize(raw) if raw else None
+    except Exception as e:
+        logger.warning(f"Tool result cache read failed: {e}")
+        return None
+
+
+async def set_cached_result(key: str, result: Any, ttl: int):
+    if ttl <= 0:
+        return
+    raw = _serialize(result)
+    if raw is None:
+        return
+    try:
+        from ..redis.redis_client import async_redis_client
+        await async_redis_client.set(key, raw, ex=ttl)
+    except Exception as e:
+        logger.warning(f"Tool result cache write failed: {e}")
@@ -0,0 +1,145 @@
+"""
+Per-server retry policy for MCP operations.
+
+All retrying of MCP calls (tools/list, tools/call, session warm-up) goes through one
+`RetryPolicy` per server, so the worst case of a single operation is bounded and easy to
+state: at most MCP_RETRY_MAX_ATTEMPTS attempts, and no new attempt starts once
+MCP_RETRY_BUDGET seconds have passed since the first one. Delays between attempts use
+exponential backoff with full jitter, so callers that failed together don't retry together.
+
+Retries are only for failures a new attempt can fix (transient connection errors, an
+expired token); the connector decides which is which. Counters per server are exposed with
+the server's health.
+"""
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MCP_RETRY_MAX_ATTEMPTS = int(os.getenv("MCP_RETRY_MAX_ATTEMPTS", 3))
+# Total seconds an operation may spend before no further attempt is started
+MCP_RETRY_BUDGET = float(os.getenv("MCP_RETRY_BUDGET", 20))
+MCP_RETRY_BASE_DELAY = float(os.getenv("MCP_RETRY_BASE_DELAY", 0.5))
+MCP_RETRY_MAX_DELAY = float(os.getenv("MCP_RETRY_MAX_DELAY", 5))
+
+RETRY_REASON_AUTH = "auth"
+RETRY_REASON_TRANSIENT = "transient"
+
+
+class RetryRun:
+    """
+    Retry state of one operation, created by `RetryPolicy.begin()`.
+
+    Args:
+        policy (RetryPolicy): Policy the run belongs to (limits and counters).
+    """
+    def __init__(self, policy: "RetryPolicy"):
+        self.policy = policy
+        self.started_at = time.monotonic()
+        self.attempts = 1
+        self.retries: Dict[str, int] = {}
+
+    def remaining(self) -> float:
+        """Seconds left in the run's time budget."""
+        return max(0.0, self.started_at + self.policy.budget - time.monotonic())
+
+    def next_delay(self, reason: str) -> Optional[float]:
+        """
+        Reserves another attempt and returns how long to wait before it, or None if the
+        attempt limit or the time budget is used up.
+
+        Args:
+            reason (str): Why the retry is needed (RETRY_REASON_AUTH or RETRY_REASON_TRANSIENT).
+                Auth retries follow a token refresh and are not delayed.
+        """
+        if self.attempts >= self.policy.max_attempts:
+            self.policy.stats["exhausted_attempts"] += 1
+            return None
+        delay = 0.0 if reason == RETRY_REASON_AUTH else self.policy.backoff(self.retries.get(reason, 0) + 1)
+        if delay >= self.remaining():
+            self.policy.stats["exhausted_budget"] += 1
+            return None
+
+        self.attempts += 1
+        self.retries[reason] = self.retries.get(reason, 0) + 1
+        self.policy.stats["retries"] += 1
+        self.policy.stats[f"{reason}_retries"] += 1
+        return delay
+
+    def succeeded(self):
+        """Records the outcome of a run that ended in success."""
+        if self.attempts > 1:
+            self.policy.stats["recovered"] += 1
+
+
+class RetryPolicy:
+    """
+    Attempt limit, time budget and jittered backoff shared by every operation on one server.
+
+    Args:
+        name (str): Server identifier used in logs (usually the server URL).
+        max_attempts (int): Attempts per operation, the first one included.
+        budget (float): Seconds after the first attempt during which retries may start.
+        base_delay (float): Backoff before the first retry (upper bound of the jitter).
+        max_delay (float): Cap on a single backoff.
+    """
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int = MCP_RETRY_MAX_ATTEMPTS,
+        budget: float = MCP_RETRY_BUDGET,
+        base_delay: float = MCP_RETRY_BASE_DELAY,
+        max_delay: float = MCP_RETRY_MAX_DELAY,
+    ):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.budget = budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats: Dict[str, int] = {
+            "operations": 0,
+            "retries": 0,
+            f"{RETRY_REASON_AUTH}_retries": 0,
+            f"{RETRY_REASON_TRANSIENT}_retries": 0,
+            "recovered": 0,
+            "exhausted_attempts": 0,
+            "exhausted_budget": 0,
+        }
+
+    def backoff(self, retry_number: int) -> float:
+        """Full-jitter exponential backoff: uniform in [0, min(max_delay, base * 2^(n-1))]."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        return random.uniform(0, ceiling)
+
+    def begin(self) -> RetryRun:
+        """Starts tracking one operation."""
+        self.stats["operations"] += 1
+        return RetryRun(self)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Limits and counters for the API."""
+        return {
+            "max_attempts": self.max_attempts,
+            "budget_seconds": self.budget,
+            **self.stats,
+        }
+
+
+# server_url -> policy, shared by every connector in the process
+_POLICIES: Dict[str, RetryPolicy] = {}
+
+
+def get_retry_policy(server_url: str) -> RetryPolicy:
+    policy = _POLICIES.get(server_url)
+    if policy is None:
+        policy = _POLICIES[server_url] = RetryPolicy(server_url)
+    return policy
+
+
+def retry_stats(server_url: str) -> Dict[str, Any]:
+    if server_url not in _POLICIES:
+        return RetryPolicy(server_url).snapshot()
+    return _POLICIES[server_url].snapshot()
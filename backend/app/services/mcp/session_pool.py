@@ -0,0 +1,293 @@
+"""
+Process-wide pool of warm MCP client sessions.
+
+Sessions are keyed by (server_url, credential fingerprint) so that rebuilt agents
+and concurrent users of the same server share an already-initialized session
+instead of paying the transport + `initialize` handshake again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from mcp import ClientSession
+
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# (server_url, credential_fingerprint)
+SessionKey = Tuple[str, str]
+# Opens a transport inside the given exit stack and returns an initialized session
+SessionFactory = Callable[[AsyncExitStack], Awaitable[ClientSession]]
+
+MCP_POOL_MAX_SIZE = int(os.getenv("MCP_POOL_MAX_SIZE", 64))
+MCP_POOL_IDLE_TIMEOUT = float(os.getenv("MCP_POOL_IDLE_TIMEOUT", 300))
+MCP_POOL_PING_INTERVAL = float(os.getenv("MCP_POOL_PING_INTERVAL", 60))
+MCP_POOL_PING_TIMEOUT = float(os.getenv("MCP_POOL_PING_TIMEOUT", 10))
+# Requests one session carries at once; further leases wait for a slot
+MCP_SESSION_MAX_INFLIGHT = int(os.getenv("MCP_SESSION_MAX_INFLIGHT", 32))
+
+
+def credential_fingerprint(headers: Optional[Dict[str, str]]) -> str:
+    """
+    Returns a short, non-reversible fingerprint of the auth headers used for a session.
+    Unauthenticated connections share the empty fingerprint.
+    """
+    if not headers:
+        return ""
+    encoded = json.dumps(headers, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+@dataclass
+class PooledSession:
+    """
+    A single initialized MCP session owned by the pool.
+
+    The transport and session contexts are entered and exited inside a dedicated owner
+    task, because anyio-based transports must be closed from the task that opened them.
+
+    Attributes:
+        key (SessionKey): Pool key the session was opened for.
+        session (ClientSession): The initialized MCP client session.
+        owner (asyncio.Task): Task holding the transport contexts open.
+        stop (asyncio.Event): Set to make the owner task close the session.
+        inflight (asyncio.Semaphore): Bounds the requests multiplexed over the session.
+        leases (int): Number of callers currently using the session.
+        pooled (bool): False for overflow sessions opened while the pool was full.
+        retired (bool): Set when the session was discarded; it is closed once the last lease returns.
+    """
+    key: SessionKey
+    session: ClientSession
+    owner: asyncio.Task
+    stop: asyncio.Event
+    inflight: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(MCP_SESSION_MAX_INFLIGHT))
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0
+    pooled: bool = True
+    retired: bool = False
+
+
+class MCPSessionPool:
+    """
+    Bounded pool of MCP sessions with lease/return semantics.
+
+    MCP sessions multiplex requests by JSON-RPC id, so a single pooled session can be
+    leased by several callers at once. Idle sessions are pinged periodically and
+    evicted once they exceed the idle timeout.
+
+    Args:
+        max_size (int): Maximum number of pooled sessions.
+        idle_timeout (float): Seconds an unleased session may stay open.
+        ping_interval (float): Seconds between health-check sweeps.
+    """
+    def __init__(
+        self,
+        max_size: int = MCP_POOL_MAX_SIZE,
+        idle_timeout: float = MCP_POOL_IDLE_TIMEOUT,
+        ping_interval: float = MCP_POOL_PING_INTERVAL,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self._entries: "OrderedDict[SessionKey, PooledSession]" = OrderedDict()
+        self._janitor: Optional[asyncio.Task] = None
+        # Concurrent misses for the same key share one handshake
+        self._opening = SingleFlight("mcp-session-open")
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "ping_failures": 0,
+            "overflow": 0,
+        }
+
+    @asynccontextmanager
+    async def lease(self, key: SessionKey, factory: SessionFactory) -> AsyncIterator[ClientSession]:
+        """
+        Leases a session for the duration of the `async with` block.
+        """
+        entry = await self.acquire(key, factory)
+        try:
+            async with entry.inflight:
+                yield entry.session
+        finally:
+            await self.release(entry)
+
+    async def acquire(self, key: SessionKey, factory: SessionFactory) -> PooledSession:
+        """
+        Returns a leased session for `key`, opening a new one via `factory` on a miss.
+        Every successful call must be paired with `release`.
+        """
+        self._ensure_janitor()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.owner.done():
+            # Transport died underneath us (server closed the stream)
+            await self.discard(key)
+            entry = None
+
+        if entry is not None:
+            self.stats["hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            entry = await self._opening.do(key, lambda: self._open_and_insert(key, factory))
+
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+        if entry.pooled:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def release(self, entry: PooledSession):
+        """Returns a leased session to the pool."""
+        entry.leases = max(0, entry.leases - 1)
+        entry.last_used = time.monotonic()
+        if entry.leases == 0 and (entry.retired or not entry.pooled):
+            await self._close(entry)
+
+    async def discard(self, key: SessionKey, session: Optional[ClientSession] = None):
+        """
+        Drops the pooled session for `key` (e.g. after a transport error or token refresh).
+        In-flight leases keep working; the session is closed when the last one returns.
+
+        Args:
+            key (SessionKey): Pool key to drop.
+            session (ClientSession, optional): Only drop the entry if it still holds this
+                session, so a failure on an old session doesn't evict its healthy replacement.
+        """
+        entry = self._entries.get(key)
+        if entry is None or (session is not None and entry.session is not session):
+            return
+        self._entries.pop(key, None)
+        entry.retired = True
+        if entry.leases == 0:
+            await self._close(entry)
+
+    async def close_all(self):
+        """Closes every pooled session and stops the health-check task. Used at shutdown."""
+        if self._janitor and not self._janitor.done():
+            self._janitor.cancel()
+        self._janitor = None
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            entry.retired = True
+            await self._close(entry)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns pool size and counters for diagnostics."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "leased": sum(1 for e in self._entries.values() if e.leases),
+            "coalesced_opens": self._opening.stats["coalesced"],
+            **self.stats,
+        }
+
+    async def _open_and_insert(self, key: SessionKey, factory: SessionFactory) -> PooledSession:
+        return self._insert(await self._open(key, factory))
+
+    async def _open(self, key: SessionKey, factory: SessionFactory) -> PooledSession:
+        loop = asyncio.get_running_loop()
+        ready: asyncio.Future = loop.create_future()
+        stop = asyncio.Event()
+
+        async def _owner():
+            try:
+                async with AsyncExitStack() as exit_stack:
+                    session = await factory(exit_stack)
+                    ready.set_result(session)
+                    await stop.wait()
+            except asyncio.CancelledError:
+                if not ready.done():
+                    ready.cancel()
+                raise
+            except BaseException as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                else:
+                    logger.warning(f"Pooled MCP session for {key[0]} terminated: {e}")
+
+        owner = loop.create_task(_owner())
+        try:
+            session = await ready
+        except asyncio.CancelledError:
+            stop.set()
+            owner.cancel()
+            raise
+        return PooledSession(key=key, session=session, owner=owner, stop=stop)
+
+    def _insert(self, entry: PooledSession) -> PooledSession:
+        if len(self._entries) >= self.max_size:
+            self._evict_idle(len(self._entries) - self.max_size + 1)
+        if len(self._entries) >= self.max_size:
+            # Every pooled session is busy: serve this caller without pooling
+            logger.warning(f"MCP session pool full ({self.max_size}); opening overflow session for {entry.key[0]}")
+            self.stats["overflow"] += 1
+            entry.pooled = False
+            return entry
+        self._entries[entry.key] = entry
+        return entry
+
+    def _evict_idle(self, count: int):
+        """Evicts up to `count` least-recently-used sessions that have no active leases."""
+        for key, entry in list(self._entries.items()):
+            if count <= 0:
+                break
+            if entry.leases == 0:
+                self._entries.pop(key, None)
+                entry.retired = True
+                self.stats["evictions"] += 1
+                asyncio.get_running_loop().create_task(self._close(entry))
+                count -= 1
+
+    async def _close(self, entry: PooledSession):
+        entry.stop.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(entry.owner), timeout=MCP_POOL_PING_TIMEOUT)
+        except asyncio.TimeoutError:
+            entry.owner.cancel()
+        except Exception as e:
+            logger.debug(f"Error closing MCP session for {entry.key[0]}: {e}")
+
+    def _ensure_janitor(self):
+        if self._janitor is None or self._janitor.done():
+            self._janitor = asyncio.get_running_loop().create_task(self._janitor_loop())
+
+    async def _janitor_loop(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await self._sweep()
+            except Exception as e:
+                logger.error(f"MCP session pool sweep failed: {e}")
+
+    async def _sweep(self):
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.leases:
+                continue  # Active traffic is its own health check
+            if now - entry.last_used > self.idle_timeout:
+                logger.info(f"Evicting idle MCP session for {key[0]}")
+                self.stats["evictions"] += 1
+                await self.discard(key)
+                continue
+            try:
+                await asyncio.wait_for(entry.session.send_ping(), timeout=MCP_POOL_PING_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Health ping failed for pooled MCP session {key[0]}, discarding: {e}")
+                self.stats["ping_failures"] += 1
+                await self.discard(key)
+
+
+# Shared instance used by every MCPConnector in the process
+session_pool = MCPSessionPool()
@@ -0,0 +1,67 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key await one shared in-flight call and all
+receive its result (or its exception), instead of each hitting the remote server.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    In-flight request table keyed by an arbitrary hashable key.
+
+    The first caller for a key starts the operation as a separate task; later callers
+    await the same task. The entry is removed as soon as the operation finishes, so the
+    next call after completion starts a fresh operation.
+    """
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `fn()` once for all concurrent callers with the same `key`.
+
+        Args:
+            key (Hashable): Identity of the request.
+            fn (Callable): Zero-argument coroutine function performing the request.
+
+        Returns:
+            The shared result of `fn()`.
+
+        Raises:
+            Exception: Whatever `fn()` raised, re-raised in every waiter.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = asyncio.get_running_loop().create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.stats["coalesced"] += 1
+            logger.debug(f"{self.name}: joining in-flight call for {key}")
+
+        # Shield so a cancelled waiter does not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def is_inflight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,151 @@
+"""
+Bounded, TTL-aware cache for MCP `tools/list` results.
+
+Entries are keyed by (server_url, credential fingerprint) and evicted in LRU order when
+either the entry count or the approximate byte size exceeds its limit.
+
+Invalidation bumps a generation counter (per server, or global). A fetch that read the
+generation before it started writes its result with it, and the write is dropped if the
+cache was invalidated meanwhile, so a slow pre-refresh fetch can't repopulate stale tools.
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MCP_TOOLS_CACHE_MAX_ENTRIES = int(os.getenv("MCP_TOOLS_CACHE_MAX_ENTRIES", 512))
+MCP_TOOLS_CACHE_MAX_BYTES = int(os.getenv("MCP_TOOLS_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+MCP_TOOLS_CACHE_TTL = float(os.getenv("MCP_TOOLS_CACHE_TTL", 600))
+
+
+@dataclass
+class _CacheEntry:
+    value: List[Dict[str, Any]]
+    size: int
+    expires_at: float
+
+
+class ToolsCache:
+    """
+    LRU cache with a maximum entry count, a maximum byte size and a per-entry TTL.
+
+    Args:
+        max_entries (int): Maximum number of cached tool lists.
+        max_bytes (int): Maximum total size (JSON-encoded) of cached tool lists.
+        ttl (float): Seconds after which an entry is considered stale.
+    """
+    def __init__(
+        self,
+        max_entries: int = MCP_TOOLS_CACHE_MAX_ENTRIES,
+        max_bytes: int = MCP_TOOLS_CACHE_MAX_BYTES,
+        ttl: float = MCP_TOOLS_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        # Bumped by invalidate(): everything, and per server_url
+        self._generation = 0
+        self._server_generations: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "stale_writes": 0,
+        }
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        """Invalidation generation of `key`; pass it to `set` to detect invalidations in between."""
+        server_url = key[0] if isinstance(key, tuple) else None
+        return self._generation, self._server_generations.get(server_url, 0)
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Returns the cached tool list for `key`, or None on a miss or expired entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: List[Dict[str, Any]], generation: Optional[Tuple[int, int]] = None):
+        """
+        Caches `value` under `key`, evicting least-recently-used entries as needed.
+
+        Args:
+            generation (tuple, optional): `generation(key)` read before `value` was fetched;
+                the write is dropped if the key was invalidated since.
+        """
+        if generation is not None and generation != self.generation(key):
+            self.stats["stale_writes"] += 1
+            logger.info(f"Dropping tool list for {key} fetched before the cache was invalidated")
+            return
+
+        try:
+            size = len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            size = len(str(value))
+
+        if size > self.max_bytes:
+            logger.warning(f"Tool list for {key} is {size} bytes, larger than the cache limit; not caching.")
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        while self._entries and (len(self._entries) >= self.max_entries or self._bytes + size > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+        self._entries[key] = _CacheEntry(value=value, size=size, expires_at=time.monotonic() + self.ttl)
+        self._bytes += size
+
+    def invalidate(self, server_url: Optional[str] = None) -> int:
+        """
+        Drops cached tool lists for `server_url` (all credentials), or everything if omitted.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        if server_url is None:
+            self._generation += 1
+            keys = list(self._entries.keys())
+        else:
+            self._server_generations[server_url] = self._server_generations.get(server_url, 0) + 1
+            keys = [k for k in self._entries if isinstance(k, tuple) and k[0] == server_url]
+        for key in keys:
+            self._remove(key)
+        self.stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns size and counters for diagnostics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": (self.stats["hits"] / lookups) if lookups else 0.0,
+            **self.stats,
+        }
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
@@ -4,13 +4,24 @@ Helper functions for tool permission checking and approval management.
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models import ToolPermission, ToolApproval
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import asyncio
+import os
+import time
 import uuid
 
+# Safety net for changes made by other worker processes, which can't invalidate this one's cache
+TOOL_APPROVAL_CACHE_TTL = float(os.getenv("TOOL_APPROVAL_CACHE_TTL", 300))
+
 
 class PendingApproval:
     """Stores pending approval requests"""
     _pending = {}
+    # approval_id -> Event set once the request is approved, denied or removed.
+    # Kept apart from `_pending` so the request data stays plain and serializable.
+    _events = {}
     
     @classmethod
     def create(cls, user_id: str, tool_name: str, server_name: str, tool_input: dict, approval_id: str = None) -> str:
@@ -42,6 +53,7 @@ class PendingApproval:
             'approval_type': None,  # 'once' or 'always'
             'created_at': datetime.utcnow() # Add timestamp for filtering stale requests
         }
+        cls._events[approval_id] = asyncio.Event()
         print(f"DEBUG: PendingApproval CREATED {approval_id} for {tool_name}")
         return approval_id
     
@@ -56,6 +68,7 @@ class PendingApproval:
         if approval_id in cls._pending:
             cls._pending[approval_id]['approved'] = True
             cls._pending[approval_id]['approval_type'] = approval_type
+            cls._notify(approval_id)
             print(f"DEBUG: PendingApproval APPROVED {approval_id}")
         else:
             print(f"DEBUG: PendingApproval APPROVED failed - {approval_id} not found")
@@ -65,6 +78,7 @@ class PendingApproval:
         """Deny a pending request"""
         if approval_id in cls._pending:
             cls._pending[approval_id]['approved'] = False
+            cls._notify(approval_id)
             print(f"DEBUG: PendingApproval DENIED {approval_id}")
         else:
             print(f"DEBUG: PendingApproval DENY failed - {approval_id} not found")
@@ -75,6 +89,39 @@ class PendingApproval:
         if approval_id in cls._pending:
             cls._pending.pop(approval_id, None)
             print(f"DEBUG: PendingApproval REMOVED {approval_id}")
+        # Wake anyone still waiting; they see the request as gone
+        event = cls._events.pop(approval_id, None)
+        if event is not None:
+            event.set()
+
+    @classmethod
+    def _notify(cls, approval_id: str):
+        event = cls._events.get(approval_id)
+        if event is not None:
+            event.set()
+
+    @classmethod
+    async def wait(cls, approval_id: str, timeout: float) -> Optional[bool]:
+        """
+        Wait until a request is approved or denied.
+
+        Returns:
+            True if approved, False if denied or removed, None if still pending after `timeout` seconds.
+        """
+        pending = cls._pending.get(approval_id)
+        if pending is None:
+            return False
+        if pending['approved'] is not None:
+            return pending['approved']
+
+        event = cls._events.setdefault(approval_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        pending = cls._pending.get(approval_id)
+        return pending['approved'] if pending else False
 
 
 async def check_tool_permission(db: AsyncSession, user_id: str, server_setting_id: int, tool_name: str) -> bool:
@@ -97,6 +144,83 @@ async def check_tool_permission(db: AsyncSession, user_id: str, server_setting_i
     return permission.is_enabled
 
 
+@dataclass(frozen=True)
+class StandingApproval:
+    """A user's stored approval preference for one tool."""
+    approval_type: str
+    expires_at: Optional[datetime] = None
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return self.expires_at < (now or datetime.utcnow())
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Rows may come back timezone-aware; the rest of this module works in naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ApprovalCache:
+    """
+    Per-user, in-memory copy of the `ToolApproval` table.
+
+    A user's rows are loaded in one query on first use and kept until `invalidate` is
+    called (by `save_tool_approval` and the tool-approval routes) or TOOL_APPROVAL_CACHE_TTL
+    passes, so permission checks on the hot path are dict lookups.
+    """
+    def __init__(self, ttl: float = TOOL_APPROVAL_CACHE_TTL):
+        self.ttl = ttl
+        # user_id -> (loaded_at, {tool_name: StandingApproval})
+        self._users: Dict[str, tuple] = {}
+
+    async def get(self, user_id: str, db: AsyncSession = None) -> Dict[str, StandingApproval]:
+        """
+        Returns the user's standing approvals by tool name, loading them on a miss.
+        Opens its own session when `db` is not given.
+        """
+        cached = self._users.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+
+        if db is None:
+            from app.database.database import AsyncSessionLocal
+            async with AsyncSessionLocal() as session:
+                approvals = await self._load(session, user_id)
+        else:
+            approvals = await self._load(db, user_id)
+        self._users[user_id] = (time.monotonic(), approvals)
+        return approvals
+
+    async def _load(self, db: AsyncSession, user_id: str) -> Dict[str, StandingApproval]:
+        result = await db.execute(
+            select(ToolApproval).filter(ToolApproval.user_id == user_id)
+        )
+        return {
+            row.tool_name: StandingApproval(row.approval_type, _naive_utc(row.expires_at))
+            for row in result.scalars().all()
+        }
+
+    def invalidate(self, user_id: str):
+        """Drops a user's cached approvals; the next check reloads them."""
+        self._users.pop(user_id, None)
+
+
+approval_cache = ApprovalCache()
+
+
+async def get_standing_approvals(user_id: str, db: AsyncSession = None) -> Dict[str, StandingApproval]:
+    """The user's standing approvals by tool name (cached; see `ApprovalCache`)."""
+    return await approval_cache.get(user_id, db)
+
+
+def invalidate_approval_cache(user_id: str):
+    """Call after changing a user's `ToolApproval` rows."""
+    approval_cache.invalidate(user_id)
+
+
 async def check_tool_approval(db: AsyncSession, user_id: str, tool_name: str) -> tuple[bool, str | None]:
     """
     Check if user has a standing approval for this tool.
@@ -108,23 +232,13 @@ async def check_tool_approval(db: AsyncSession, user_id: str, tool_name: str) ->
     if tool_name.startswith("_"):
         return False, 'always'
 
-    result = await db.execute(
-        select(ToolApproval).filter(
-            ToolApproval.user_id == user_id,
-            ToolApproval.tool_name == tool_name
-        )
-    )
-    approval = result.scalars().first()
+    approvals = await approval_cache.get(user_id, db)
+    approval = approvals.get(tool_name)
     
-    if approval is None:
+    # Expired rows count as missing; they are overwritten by the next save
+    if approval is None or approval.is_expired():
         return True, None  # Needs approval, no standing approval
     
-    # Check if approval has expired
-    if approval.expires_at and approval.expires_at < datetime.utcnow():
-        await db.delete(approval)
-        await db.commit()
-        return True, None
-    
     if approval.approval_type == 'always':
         return False, 'always'  # No approval needed
     elif approval.approval_type == 'never':
@@ -168,5 +282,6 @@ async def save_tool_approval(db: AsyncSession, user_id: str, tool_name: str, app
         db.add(approval)
     
     await db.commit()
+    invalidate_approval_cache(user_id)
     await db.refresh(approval)
     return approval
@@ -2,16 +2,61 @@ import json
 import logging
 import asyncio
 from datetime import datetime
-from typing import AsyncGenerator, Dict, Any, Optional
+from typing import AsyncGenerator, AsyncIterator, Dict, Any, Optional, Tuple
 
 from langchain_core.messages import AIMessage
 from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
 
 from ..services.security.permissions import PendingApproval
+from ..services.tool_events import open_tool_event_sink, close_tool_event_sink
 from ..services.agent.agent_factory import get_session_memory
 
 logger = logging.getLogger(__name__)
 
+# Tool events that get their own SSE event name; everything else goes to the scratchpad
+_TOOL_EVENT_CHANNELS = {"tool_progress": "tool_progress"}
+
+
+async def _merge_tool_events(
+    agent_events: AsyncIterator[dict], tool_events: asyncio.Queue
+) -> AsyncGenerator[Tuple[str, dict], None]:
+    """
+    Interleaves agent events with side-channel tool events as they happen.
+
+    The agent stream is consumed by a pump task that feeds the same queue tools emit into,
+    so progress from a long-running tool call is yielded while the agent stream itself is
+    blocked on that call.
+
+    Yields:
+        tuple: ("agent", event) or ("tool", tool_event).
+    """
+    async def _pump():
+        try:
+            async for event in agent_events:
+                tool_events.put_nowait(("agent", event))
+        except Exception as e:
+            tool_events.put_nowait(("done", e))
+            return
+        tool_events.put_nowait(("done", None))
+
+    pump = asyncio.create_task(_pump())
+    try:
+        while True:
+            item = await tool_events.get()
+            if not isinstance(item, tuple):
+                yield "tool", item
+                continue
+            kind, payload = item
+            if kind == "done":
+                if payload is not None:
+                    raise payload
+                return
+            yield kind, payload
+    finally:
+        if not pump.done():
+            pump.cancel()
+
+
 async def stream_agent_events(
     agent_executor, 
     agent_input: Dict[str, Any], 
@@ -35,10 +80,21 @@ async def stream_agent_events(
     # Get memory instance for saving final answer
     memory = get_session_memory(hybrid_session_key)
 
+    # Side channel for events emitted from inside tool execution (result-cache hits, progress)
+    tool_events, tool_events_token = open_tool_event_sink()
+    events = _merge_tool_events(
+        agent_executor.astream_events(agent_input, config=config, version="v1"), tool_events
+    )
+
     try:
         logger.info(f"Starting stream for session {session_id} (resume={resume})")
         
-        async for event in agent_executor.astream_events(agent_input, config=config, version="v1"):
+        async for source, event in events:
+            if source == "tool":
+                channel = _TOOL_EVENT_CHANNELS.get(event.get("type"), "scratchpad")
+                yield {"event": channel, "data": json.dumps(event, default=str)}
+                continue
+
             event_type = event["event"]
             
             if event_type == "on_tool_start":
@@ -178,5 +234,7 @@ async def stream_agent_events(
         yield {"event": "server_error", "data": json.dumps({'type': 'error', 'message': "An internal error occurred."})}
     
     finally:
+        await events.aclose()
+        close_tool_event_sink(tool_events_token)
         yield {"event": "stream_end", "data": json.dumps({'type': 'stream_end', 'session_id': session_id, 'user_id': user_id})}
         logger.info(f"Stream ended for session {hybrid_session_key}.")
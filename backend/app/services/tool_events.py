@@ -0,0 +1,54 @@
+"""
+Side channel for tool-execution events that LangChain's event stream doesn't carry
+(e.g. result-cache hits, progress notifications), from MCP connectors to the SSE stream of the current request.
+
+The stream opens a sink (an asyncio.Queue held in a ContextVar); tasks spawned while
+running the agent inherit the context, so connectors can emit into it without any
+request object being threaded through the tool call.
+"""
+import asyncio
+import logging
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_event_sink: ContextVar[Optional[asyncio.Queue]] = ContextVar("tool_event_sink", default=None)
+
+
+def open_tool_event_sink() -> Tuple[asyncio.Queue, Token]:
+    """Creates a sink for the current context. Pair with `close_tool_event_sink`."""
+    queue: asyncio.Queue = asyncio.Queue()
+    token = _event_sink.set(queue)
+    return queue, token
+
+
+def close_tool_event_sink(token: Token):
+    try:
+        _event_sink.reset(token)
+    except ValueError:
+        # Generator finalized from a different context; nothing left to reset
+        pass
+
+
+def emit_tool_event(event_type: str, **payload: Any):
+    """Publishes an event to the current request's stream, if one is listening."""
+    queue = _event_sink.get()
+    if queue is None:
+        return
+    queue.put_nowait({"type": event_type, **payload})
+
+
+def bind_tool_event_emitter() -> Callable[..., None]:
+    """
+    Returns an `emit_tool_event` bound to the current request's sink, for callbacks that
+    run in another task's context (e.g. MCP progress notifications, which are dispatched
+    by the pooled session's reader task).
+    """
+    queue = _event_sink.get()
+
+    def _emit(event_type: str, **payload: Any):
+        if queue is not None:
+            queue.put_nowait({"type": event_type, **payload})
+
+    return _emit
@@ -0,0 +1,100 @@
+"""
+Benchmark of tool search scoring at registry sizes of 1k, 10k and 100k tools.
+
+Compares, on a synthetic catalog with a Zipf-like vocabulary:
+- `rank_bm25.BM25Okapi`: `get_scores` over the whole corpus plus a full sort (the old registry);
+- `IncrementalBM25` pure-Python path (postings of the query terms, heap top-k);
+- `IncrementalBM25` vectorized path (CSR sparse dot product, `argpartition` top-k).
+
+Also reports index build time and the cost of replacing one document.
+
+Usage (from backend/):
+    python -m benchmarks.bm25_search [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import random
+import time
+
+from app.services.Agent.bm25_index import IncrementalBM25
+
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+VOCABULARY_SIZE = 20000
+TOP_K = 5
+
+
+def _vocabulary_sampler(rng: random.Random):
+    words = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    weights = [1.0 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    return lambda n: rng.choices(words, weights=weights, k=n)
+
+
+def _corpus(size: int, rng: random.Random):
+    sample = _vocabulary_sampler(rng)
+    # Tool name + description: roughly 10-40 tokens
+    return {f"server{i % 50}_tool{i}": sample(rng.randint(10, 40)) for i in range(size)}, sample
+
+
+def _per_query_ms(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run(size: int, query_count: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs, sample = _corpus(size, rng)
+    queries = [sample(rng.randint(2, 6)) for _ in range(query_count)]
+    names = list(docs)
+    row = {"tools": size}
+
+    if BM25Okapi is not None:
+        start = time.perf_counter()
+        okapi = BM25Okapi(list(docs.values()))
+        row["okapi_build_ms"] = (time.perf_counter() - start) * 1000
+
+        def okapi_search(query):
+            scores = okapi.get_scores(query)
+            return sorted(zip(names, scores), key=lambda x: x[1], reverse=True)[:TOP_K]
+        row["okapi_query_ms"] = _per_query_ms(okapi_search, queries[: max(5, query_count // 10)])
+
+    for label, min_docs in (("python", float("inf")), ("csr", 0)):
+        index = IncrementalBM25(vectorize_min_docs=min_docs)
+        start = time.perf_counter()
+        for doc_id, tokens in docs.items():
+            index.add(doc_id, tokens)
+        index.top_k(queries[0], TOP_K)  # compiles the matrix on the vectorized path
+        row[f"{label}_build_ms"] = (time.perf_counter() - start) * 1000
+        row[f"{label}_query_ms"] = _per_query_ms(lambda q: index.top_k(q, TOP_K), queries)
+
+        start = time.perf_counter()
+        victim = names[len(names) // 2]
+        index.update(victim, sample(20))
+        row[f"{label}_update_ms"] = (time.perf_counter() - start) * 1000
+        # First query after a change: scores the pending document on the side
+        row[f"{label}_query_after_update_ms"] = _per_query_ms(lambda q: index.top_k(q, TOP_K), queries[:20])
+
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    columns = None
+    for size in args.sizes:
+        row = run(size, args.queries)
+        if columns is None:
+            columns = list(row)
+            print(" | ".join(columns))
+        print(" | ".join(f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Test setup: points the app at a throwaway SQLite database before anything imports
+`app.database.database`, so tests never touch a configured DATABASE_URL.
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}"
+
+# `app.models` imports `.user` while the module file is `User.py`. That only resolves on
+# case-insensitive filesystems; elsewhere, register the module under its imported name.
+_USER_MODEL = BACKEND_DIR / "app" / "models" / "User.py"
+if not (BACKEND_DIR / "app" / "models" / "user.py").exists() and "app.models.user" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("app.models.user", _USER_MODEL)
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules["app.models.user"] = _module
+    _spec.loader.exec_module(_module)
@@ -0,0 +1,169 @@
+import random
+
+import pytest
+
+from app.services.Agent.bm25_index import AGENT_BM25_COMPACT_RATIO, IncrementalBM25, np
+from app.services.Agent.tool_registry import ToolRegistry
+
+PYTHON_ONLY = float("inf")
+
+needs_numpy = pytest.mark.skipif(np is None, reason="the vectorized path requires NumPy")
+
+
+def _corpus(size, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(60)]
+    return rng, vocabulary, {
+        f"doc{i}": [rng.choice(vocabulary) for _ in range(rng.randint(3, 15))] for i in range(size)
+    }
+
+
+def _build(docs, vectorize_min_docs=PYTHON_ONLY):
+    index = IncrementalBM25(vectorize_min_docs=vectorize_min_docs)
+    for doc_id, tokens in docs.items():
+        index.add(doc_id, tokens)
+    return index
+
+
+def _assert_same_scores(actual, expected):
+    assert actual.keys() == expected.keys()
+    for doc_id, score in expected.items():
+        assert actual[doc_id] == pytest.approx(score)
+
+
+class _Tool:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+
+
+def test_incremental_changes_match_a_rebuild():
+    rng, vocabulary, docs = _corpus(80)
+    index = _build(docs)
+
+    for doc_id in list(docs)[:20]:
+        index.remove(doc_id)
+        del docs[doc_id]
+    for doc_id in list(docs)[:10]:
+        docs[doc_id] = [rng.choice(vocabulary) for _ in range(5)]
+        index.update(doc_id, docs[doc_id])
+    docs["new"] = ["w1", "w2", "w2"]
+    index.add("new", docs["new"])
+
+    rebuilt = _build(docs)
+    for query in (["w1"], ["w2", "w7", "w59"], ["w3", "w3", "unknown"]):
+        _assert_same_scores(index.get_scores(query), rebuilt.get_scores(query))
+    assert index.stats() == rebuilt.stats()
+
+
+def test_remove_drops_every_trace_of_a_document():
+    index = IncrementalBM25()
+    index.add("a", ["alpha", "beta"])
+    index.add("b", ["beta"])
+
+    assert index.remove("a")
+    assert not index.remove("a")
+    assert "a" not in index
+    assert index.document_frequency("alpha") == 0
+    assert index.stats()["terms"] == 1
+    assert index.average_length == 1.0
+    assert index.get_scores(["alpha"]) == {}
+
+
+def test_scores_follow_bm25():
+    index = IncrementalBM25()
+    index.add("short", ["issue"])
+    index.add("long", ["issue", "comment", "comment", "label"])
+    index.add("other", ["label"])
+
+    scores = index.get_scores(["issue"])
+
+    assert set(scores) == {"short", "long"}
+    # Same term frequency: the shorter document scores higher
+    assert scores["short"] > scores["long"]
+    assert 0 < index.idf("issue") < index.idf("missing")
+    [(best, _)] = index.top_k(["issue", "comment"], 1)
+    assert best == "long"
+
+
+def test_doc_ids_restrict_scoring():
+    _, _, docs = _corpus(40)
+    index = _build(docs)
+    allowed = list(docs)[::3]
+
+    scores = index.get_scores(["w1", "w2"], doc_ids=allowed)
+
+    assert set(scores) <= set(allowed)
+    _assert_same_scores(scores, {d: s for d, s in index.get_scores(["w1", "w2"]).items() if d in allowed})
+
+
+def test_registry_search_tracks_registered_tools():
+    registry = ToolRegistry()
+    registry.register_tools([
+        _Tool("github_search_issues", "Search issues in a repository"),
+        _Tool("slack_post_message", "Post a message to a channel"),
+    ])
+    assert [t.name for t in registry.search("issues", mode="bm25")] == ["github_search_issues"]
+
+    registry.register_tools([_Tool("github_search_issues", "List pull requests")])
+    assert registry.search("issues", mode="bm25") == []
+    assert [t.name for t in registry.search("pull requests", mode="bm25")] == ["github_search_issues"]
+
+    registry.remove_tools(["slack_post_message"])
+    assert registry.search("message", mode="bm25") == []
+    assert registry.stats()["registered"] == 1
+
+
+@needs_numpy
+def test_vectorized_scores_match_the_python_path():
+    _, _, docs = _corpus(300)
+    python_index, csr_index = _build(docs), _build(docs, vectorize_min_docs=0)
+
+    for query in (["w1"], ["w2", "w7", "w59"], ["w3", "w3", "unknown"]):
+        _assert_same_scores(csr_index.get_scores(query), python_index.get_scores(query))
+    assert csr_index.stats()["vectorized"]
+
+
+@needs_numpy
+def test_vectorized_top_k_matches_a_full_sort():
+    _, _, docs = _corpus(300)
+    index = _build(docs, vectorize_min_docs=0)
+    query = ["w4", "w9", "w20"]
+
+    scores = index.get_scores(query)
+    expected = sorted(scores.values(), reverse=True)[:7]
+
+    assert [score for _, score in index.top_k(query, 7)] == pytest.approx(expected)
+    assert len(index.top_k(query, len(docs) * 2)) == len(scores)
+
+
+@needs_numpy
+def test_changes_after_compiling_are_scored_until_the_next_compile():
+    rng, vocabulary, docs = _corpus(300)
+    index = _build(docs, vectorize_min_docs=0)
+    query = ["w1", "w5", "w8"]
+    index.top_k(query, 5)  # compiles the matrix
+
+    index.remove("doc0")
+    del docs["doc0"]
+    docs["doc1"] = ["w1", "w1", "w5"]
+    index.update("doc1", docs["doc1"])
+    docs["fresh"] = ["w8", "w8", "w8"]
+    index.add("fresh", docs["fresh"])
+    # Rows masked out of the matrix (doc0, old doc1) plus documents scored on the side (doc1, fresh)
+    assert index.stats()["pending"] == 4
+
+    expected = _build(docs).get_scores(query)
+    _assert_same_scores(index.get_scores(query), expected)
+    assert [doc for doc, _ in index.top_k(query, 3)] == sorted(expected, key=expected.get, reverse=True)[:3]
+    allowed = {"doc0", "doc1", "doc2", "fresh"}
+    _assert_same_scores(
+        index.get_scores(query, doc_ids=allowed), {d: s for d, s in expected.items() if d in allowed}
+    )
+
+    # Enough changes trigger a recompile on the next query
+    for doc_id in list(docs)[: int(len(docs) * AGENT_BM25_COMPACT_RATIO) + 1]:
+        docs[doc_id] = [rng.choice(vocabulary) for _ in range(6)]
+        index.update(doc_id, docs[doc_id])
+    _assert_same_scores(index.get_scores(query), _build(docs).get_scores(query))
+    assert index.stats()["pending"] == 0
@@ -0,0 +1,144 @@
+import asyncio
+import itertools
+
+import pytest
+
+from app.services.mcp import circuit_breaker
+from app.services.mcp.circuit_breaker import CircuitBreaker, CircuitState, get_breaker, is_server_available
+from app.services.mcp.connector import MCPConnector
+from app.services.mcp.exceptions import CircuitOpenError, ToolCallError, ToolCallTimeoutError
+from app.services.mcp.retry_policy import get_retry_policy
+
+_URLS = itertools.count()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def connector():
+    """Connector for a fresh server URL, with a valid token and a single attempt per call."""
+    url = f"http://breaker-{next(_URLS)}.test/mcp"
+    connector = MCPConnector(url, server_name="Flaky")
+
+    async def _token_ok(force_refresh=False):
+        return True
+
+    connector._ensure_valid_token = _token_ok
+    get_retry_policy(url).max_attempts = 1
+    return connector
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("http://s", failure_threshold=3, recovery_timeout=30)
+
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.allow_request()
+    breaker.record_failure(ConnectionError("refused"))
+
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["last_error"] == "refused"
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("http://s", failure_threshold=2, recovery_timeout=30)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("http://s", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow_request()
+
+    clock.now += 1
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("http://s", failure_threshold=3, recovery_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.retry_in() == 30
+
+
+def test_connector_fails_fast_while_open(connector):
+    calls = []
+
+    async def _refused():
+        calls.append(1)
+        raise ConnectionRefusedError("connection refused")
+
+    async def _scenario():
+        for _ in range(get_breaker(connector.server_url).failure_threshold):
+            with pytest.raises(ConnectionRefusedError):
+                await connector._execute_with_retry(_refused)
+        with pytest.raises(CircuitOpenError):
+            await connector._execute_with_retry(_refused)
+
+    asyncio.run(_scenario())
+
+    assert len(calls) == get_breaker(connector.server_url).failure_threshold
+    assert not is_server_available(connector.server_url)
+
+
+def test_errors_from_a_responding_server_do_not_open_the_circuit(connector):
+    async def _rejected():
+        raise ToolCallError("Flaky", "search", "invalid arguments")
+
+    async def _scenario():
+        for _ in range(get_breaker(connector.server_url).failure_threshold + 1):
+            with pytest.raises(ToolCallError):
+                await connector._execute_with_retry(_rejected)
+
+    asyncio.run(_scenario())
+
+    assert get_breaker(connector.server_url).state == CircuitState.CLOSED
+
+
+def test_tool_timeout_frees_the_half_open_probe(connector):
+    breaker = get_breaker(connector.server_url)
+    breaker.recovery_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    async def _slow():
+        raise ToolCallTimeoutError("Flaky", "search", 5)
+
+    with pytest.raises(ToolCallTimeoutError):
+        asyncio.run(connector._execute_with_retry(_slow))
+
+    # No verdict on the server: still half-open, and the next call may probe
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+from contextlib import AsyncExitStack
+
+import httpx
+import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from app.services.mcp import connector as connector_module
+from app.services.mcp.connector import TRANSPORT_SSE, TRANSPORT_STREAMABLE_HTTP, MCPConnector
+from app.services.mcp.exceptions import ToolCallTimeoutError
+from app.services.mcp.retry_policy import get_retry_policy
+from app.services.mcp.session_pool import MCPSessionPool, session_pool
+
+_URLS = itertools.count()
+
+
+class _FakeSession:
+    async def send_ping(self):
+        return None
+
+
+@pytest.fixture
+def connector():
+    """Connector for a fresh server URL with a valid token, instant retries and fake sessions."""
+    url = f"http://connector-{next(_URLS)}.test/mcp"
+    connector = MCPConnector(url, server_name="Test")
+    connector.opened = []
+
+    async def _token_ok(force_refresh=False):
+        return True
+
+    async def _open_session(exit_stack):
+        session = _FakeSession()
+        connector.opened.append(session)
+        return session
+
+    connector._ensure_valid_token = _token_ok
+    connector._open_session = _open_session
+    policy = get_retry_policy(url)
+    policy.base_delay = policy.max_delay = 0
+    return connector
+
+
+def test_discard_only_drops_the_session_it_names():
+    pool = MCPSessionPool()
+
+    async def _open(exit_stack):
+        return _FakeSession()
+
+    async def _scenario():
+        key = ("http://pool.test/mcp", "")
+        async with pool.lease(key, _open) as old:
+            pass
+        await pool.discard(key, old)
+        async with pool.lease(key, _open) as replacement:
+            pass
+        # A late failure report for the old session must not evict its replacement
+        await pool.discard(key, old)
+        held = pool._entries[key].session
+        await pool.close_all()
+        return old, replacement, held
+
+    old, replacement, held = asyncio.run(_scenario())
+
+    assert replacement is not old
+    assert held is replacement
+
+
+def test_retry_keeps_a_replacement_session_opened_by_another_call(connector):
+    attempts = []
+
+    async def _operation():
+        async with connector._lease_session() as session:
+            attempts.append(session)
+            if len(attempts) == 1:
+                # Another call saw this session break and replaced it while we were using it
+                await session_pool.discard(connector._session_key, session)
+                async with connector._lease_session():
+                    pass
+                raise ConnectionResetError("connection reset")
+        return session
+
+    async def _scenario():
+        try:
+            result = await connector._execute_with_retry(_operation)
+            return result, session_pool._entries[connector._session_key].session
+        finally:
+            await session_pool.close_all()
+
+    result, pooled = asyncio.run(_scenario())
+
+    assert len(connector.opened) == 2
+    assert result is connector.opened[1]
+    assert pooled is connector.opened[1]
+
+
+def _probing_connector(monkeypatch, failures):
+    """Connector that remembers streamable HTTP; `failures` maps transport -> error to raise."""
+    url = f"http://transport-{next(_URLS)}.test/mcp"
+    monkeypatch.setitem(connector_module._TRANSPORT_CACHE, url, TRANSPORT_STREAMABLE_HTTP)
+    connector = MCPConnector(url, server_name="Test")
+    connector.tried = []
+
+    async def _connect_transport(exit_stack, transport):
+        connector.tried.append(transport)
+        if transport in failures:
+            raise failures[transport]
+        return _FakeSession()
+
+    connector._connect_transport = _connect_transport
+    return connector
+
+
+def test_auth_error_is_raised_without_probing_other_transports(monkeypatch):
+    connector = _probing_connector(monkeypatch, {
+        TRANSPORT_STREAMABLE_HTTP: RuntimeError("HTTP 401 Unauthorized"),
+        TRANSPORT_SSE: RuntimeError("HTTP 405 Method Not Allowed"),
+    })
+
+    with pytest.raises(RuntimeError, match="401"):
+        asyncio.run(connector._open_session(AsyncExitStack()))
+
+    assert connector.tried == [TRANSPORT_STREAMABLE_HTTP]
+    assert connector_module._TRANSPORT_CACHE[connector.server_url] == TRANSPORT_STREAMABLE_HTTP
+
+
+def test_known_transport_error_is_raised_when_every_transport_fails(monkeypatch):
+    connector = _probing_connector(monkeypatch, {
+        TRANSPORT_STREAMABLE_HTTP: ConnectionRefusedError("connection refused"),
+        TRANSPORT_SSE: RuntimeError("HTTP 404 Not Found"),
+    })
+
+    with pytest.raises(ConnectionRefusedError):
+        asyncio.run(connector._open_session(AsyncExitStack()))
+
+    assert connector.tried == [TRANSPORT_STREAMABLE_HTTP, TRANSPORT_SSE]
+    assert connector_module._TRANSPORT_CACHE[connector.server_url] == TRANSPORT_STREAMABLE_HTTP
+
+
+def test_fallback_transport_is_used_when_the_known_one_fails(monkeypatch):
+    connector = _probing_connector(monkeypatch, {
+        TRANSPORT_STREAMABLE_HTTP: ConnectionRefusedError("connection refused"),
+    })
+
+    asyncio.run(connector._open_session(AsyncExitStack()))
+
+    assert connector.tried == [TRANSPORT_STREAMABLE_HTTP, TRANSPORT_SSE]
+    assert connector_module._TRANSPORT_CACHE[connector.server_url] == TRANSPORT_SSE
+
+
+def test_timeout_without_a_request_id_skips_the_cancellation(connector, monkeypatch):
+    async def _record_latency(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(connector_module, "record_latency", _record_latency)
+
+    class _TimingOutSession:
+        # No `_request_id`: the SDK no longer exposes the id of the request in flight
+        notifications = []
+
+        async def call_tool(self, name, arguments, read_timeout_seconds=None, progress_callback=None):
+            raise McpError(types.ErrorData(code=httpx.codes.REQUEST_TIMEOUT, message="Timed out"))
+
+        async def send_notification(self, notification):
+            self.notifications.append(notification)
+
+    session = _TimingOutSession()
+
+    async def _scenario():
+        with pytest.raises(ToolCallTimeoutError):
+            await connector._call_tool(session, "search", {}, timeout=1)
+        await asyncio.sleep(0)
+
+    asyncio.run(_scenario())
+
+    assert session.notifications == []
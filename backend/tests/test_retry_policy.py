@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+
+import pytest
+
+from app.services.mcp.connector import MCPConnector
+from app.services.mcp.exceptions import RequiresAuthenticationError, ToolCallError
+from app.services.mcp.retry_policy import (
+    RETRY_REASON_AUTH, RETRY_REASON_TRANSIENT, RetryPolicy, get_retry_policy, retry_stats,
+)
+
+_URLS = itertools.count()
+
+
+@pytest.fixture
+def connector():
+    """Connector for a fresh server URL with instant retries; records forced token refreshes."""
+    url = f"http://retry-{next(_URLS)}.test/mcp"
+    connector = MCPConnector(url, server_name="Flaky")
+    connector.refreshes = 0
+
+    async def _token_ok(force_refresh=False):
+        connector.refreshes += force_refresh
+        return True
+
+    connector._ensure_valid_token = _token_ok
+    policy = get_retry_policy(url)
+    policy.base_delay = policy.max_delay = 0
+    return connector
+
+
+def _failing(times, error):
+    calls = []
+
+    async def _operation():
+        calls.append(1)
+        if len(calls) <= times:
+            raise error
+        return "ok"
+
+    return _operation, calls
+
+
+def test_backoff_is_capped_full_jitter():
+    policy = RetryPolicy("http://s", base_delay=0.5, max_delay=2)
+
+    for retry_number, ceiling in ((1, 0.5), (2, 1.0), (3, 2.0), (6, 2.0)):
+        delays = [policy.backoff(retry_number) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling / 2
+
+
+def test_attempt_limit_counts_the_first_attempt():
+    policy = RetryPolicy("http://s", max_attempts=3, base_delay=0)
+    run = policy.begin()
+
+    assert run.next_delay(RETRY_REASON_TRANSIENT) == 0
+    assert run.next_delay(RETRY_REASON_TRANSIENT) == 0
+    assert run.next_delay(RETRY_REASON_TRANSIENT) is None
+    assert run.attempts == 3
+    assert policy.stats["exhausted_attempts"] == 1
+
+
+def test_no_retry_once_the_budget_is_spent():
+    policy = RetryPolicy("http://s", max_attempts=10, budget=0)
+    run = policy.begin()
+
+    assert run.next_delay(RETRY_REASON_TRANSIENT) is None
+    assert run.next_delay(RETRY_REASON_AUTH) is None
+    assert policy.stats["exhausted_budget"] == 2
+
+
+def test_transient_errors_are_retried_until_success(connector):
+    operation, calls = _failing(2, ConnectionResetError("connection reset"))
+
+    assert asyncio.run(connector._execute_with_retry(operation)) == "ok"
+
+    assert len(calls) == 3
+    stats = retry_stats(connector.server_url)
+    assert stats["transient_retries"] == 2
+    assert stats["recovered"] == 1
+
+
+def test_transient_errors_give_up_at_the_attempt_limit(connector):
+    operation, calls = _failing(10, ConnectionResetError("connection reset"))
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(connector._execute_with_retry(operation))
+
+    assert len(calls) == get_retry_policy(connector.server_url).max_attempts
+
+
+def test_auth_error_forces_one_token_refresh(connector):
+    operation, calls = _failing(1, RuntimeError("HTTP 401 Unauthorized"))
+
+    assert asyncio.run(connector._execute_with_retry(operation)) == "ok"
+
+    assert connector.refreshes == 1
+    assert len(calls) == 2
+
+
+def test_second_auth_error_requires_reauthentication(connector):
+    operation, calls = _failing(10, RuntimeError("HTTP 401 Unauthorized"))
+
+    with pytest.raises(RequiresAuthenticationError):
+        asyncio.run(connector._execute_with_retry(operation))
+
+    assert connector.refreshes == 1
+    assert len(calls) == 2
+
+
+def test_tool_errors_are_not_retried(connector):
+    operation, calls = _failing(1, ToolCallError("Flaky", "search", "timeout in tool logic"))
+
+    with pytest.raises(ToolCallError):
+        asyncio.run(connector._execute_with_retry(operation))
+
+    assert len(calls) == 1
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.database.schema import ADDED_COLUMNS, add_missing_columns
+
+
+def _columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def test_missing_columns_are_added_once():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # Tables as they were created before the columns existed
+        conn.execute(text("CREATE TABLE mcp_server_settings (id INTEGER PRIMARY KEY, server_name VARCHAR)"))
+        conn.execute(text("CREATE TABLE tool_permissions (id INTEGER PRIMARY KEY, tool_name VARCHAR)"))
+        conn.execute(text("INSERT INTO mcp_server_settings (id, server_name) VALUES (1, 'GitHub')"))
+
+    with engine.begin() as conn:
+        added = add_missing_columns(conn)
+    with engine.begin() as conn:
+        assert add_missing_columns(conn) == []
+
+    assert sorted(added) == sorted(f"{table}.{column}" for table, column, _ in ADDED_COLUMNS)
+    assert {"tool_catalog", "manifest_version", "transport"} <= _columns(engine, "mcp_server_settings")
+    assert {"cache_ttl_seconds", "timeout_seconds"} <= _columns(engine, "tool_permissions")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT manifest_version FROM mcp_server_settings")).scalar() == 0
+
+
+def test_absent_tables_are_left_to_create_all():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        assert add_missing_columns(conn) == []
+        assert inspect(conn).get_table_names() == []
@@ -0,0 +1,184 @@
+import asyncio
+
+from app.services.mcp.connector import MCPConnector, invalidate_tools_cache
+from app.services.mcp.session_pool import MCPSessionPool
+from app.services.mcp.singleflight import SingleFlight
+
+
+class _FakeSession:
+    async def send_ping(self):
+        return None
+
+
+def _counting_factory(delay=0.01):
+    """Session factory recording how many sessions it opened."""
+    opened = []
+
+    async def _factory(exit_stack):
+        opened.append(1)
+        await asyncio.sleep(delay)
+        return _FakeSession()
+
+    return _factory, opened
+
+
+def test_singleflight_runs_concurrent_calls_once():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def _fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def _scenario():
+        results = await asyncio.gather(*(flight.do("key", _fetch) for _ in range(10)))
+        # Finished calls are forgotten, so a later call runs again
+        await flight.do("key", _fetch)
+        return results
+
+    assert asyncio.run(_scenario()) == ["result"] * 10
+    assert len(calls) == 2
+    assert flight.stats == {"calls": 2, "coalesced": 9}
+    assert flight.inflight() == 0
+
+
+def test_singleflight_shares_the_exception():
+    flight = SingleFlight("test")
+
+    async def _fail():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("refused")
+
+    async def _scenario():
+        return await asyncio.gather(*(flight.do("key", _fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert flight.stats["calls"] == 1
+
+
+def test_singleflight_waiter_cancellation_does_not_cancel_the_call():
+    flight = SingleFlight("test")
+
+    async def _fetch():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def _scenario():
+        first = asyncio.ensure_future(flight.do("key", _fetch))
+        second = asyncio.ensure_future(flight.do("key", _fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(_scenario()) == "result"
+
+
+def test_pool_opens_one_session_for_concurrent_misses():
+    pool = MCPSessionPool()
+    factory, opened = _counting_factory()
+
+    async def _scenario():
+        key = ("http://pool.test/mcp", "")
+        entries = await asyncio.gather(*(pool.acquire(key, factory) for _ in range(8)))
+        other = await pool.acquire(("http://other.test/mcp", ""), factory)
+        try:
+            return entries, other
+        finally:
+            for entry in entries + [other]:
+                await pool.release(entry)
+            await pool.close_all()
+
+    entries, other = asyncio.run(_scenario())
+
+    assert len(opened) == 2
+    assert len({id(entry.session) for entry in entries}) == 1
+    assert other.session is not entries[0].session
+    assert pool.stats["misses"] == 9
+    assert pool._opening.stats["coalesced"] == 7
+
+
+def test_pool_reuses_a_released_session():
+    pool = MCPSessionPool()
+    factory, opened = _counting_factory(delay=0)
+
+    async def _scenario():
+        key = ("http://pool.test/mcp", "")
+        async with pool.lease(key, factory) as first:
+            pass
+        async with pool.lease(key, factory) as second:
+            pass
+        await pool.close_all()
+        return first, second
+
+    first, second = asyncio.run(_scenario())
+
+    assert first is second
+    assert len(opened) == 1
+    assert pool.stats["hits"] == 1
+
+
+def test_concurrent_list_tools_fetch_once():
+    connector = MCPConnector("http://tools.test/mcp", server_name="Tools")
+    invalidate_tools_cache(connector.server_url)
+    fetches = []
+
+    async def _token_ok(force_refresh=False):
+        return True
+
+    async def _list_tools_internal():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return [{"name": "search", "description": "Search", "argument_schema": None, "annotations": None}]
+
+    connector._ensure_valid_token = _token_ok
+    connector._list_tools_internal = _list_tools_internal
+
+    async def _scenario():
+        return await asyncio.gather(*(connector.list_tools() for _ in range(5)))
+
+    results = asyncio.run(_scenario())
+
+    assert len(fetches) == 1
+    assert all(result == results[0] for result in results)
+    # Later calls are served from the tools cache
+    asyncio.run(connector.list_tools())
+    assert len(fetches) == 1
+    invalidate_tools_cache(connector.server_url)
+
+
+def test_forced_refresh_skips_a_stale_fetch_in_flight():
+    connector = MCPConnector("http://refresh.test/mcp", server_name="Refresh")
+    invalidate_tools_cache(connector.server_url)
+    manifest = {"tools": ["old"]}
+    fetching = asyncio.Event()
+
+    async def _token_ok(force_refresh=False):
+        return True
+
+    async def _list_tools_internal():
+        tools = [{"name": name} for name in manifest["tools"]]
+        fetching.set()
+        await asyncio.sleep(0.02)
+        return tools
+
+    connector._ensure_valid_token = _token_ok
+    connector._list_tools_internal = _list_tools_internal
+
+    async def _scenario():
+        stale = asyncio.create_task(connector.list_tools())
+        await fetching.wait()
+        # The server changes and a refresh runs while the first fetch is still in flight
+        manifest["tools"] = ["new"]
+        invalidate_tools_cache(connector.server_url)
+        refreshed = await connector.list_tools(force=True)
+        return await stale, refreshed
+
+    stale, refreshed = asyncio.run(_scenario())
+
+    assert stale == [{"name": "old"}]
+    assert refreshed == [{"name": "new"}]
+    # The stale fetch finished last but did not overwrite the refreshed list
+    assert asyncio.run(connector.list_tools()) == [{"name": "new"}]
+    invalidate_tools_cache(connector.server_url)
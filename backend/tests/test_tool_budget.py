@@ -0,0 +1,44 @@
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel
+
+from app.services.Agent.tool_budget import select_tools, tool_tokens
+
+
+class _Query(BaseModel):
+    query: str
+
+
+class _LongQuery(BaseModel):
+    query: str
+    repository: str
+    labels: list[str]
+    include_closed_issues_and_pull_requests: bool
+
+
+def _tool(args_schema, description="Search"):
+    return StructuredTool.from_function(
+        func=lambda **kwargs: "", name="search", description=description, args_schema=args_schema,
+    )
+
+
+def test_estimates_follow_the_tool_not_its_name():
+    small, large = _tool(_Query), _tool(_LongQuery)
+
+    assert tool_tokens(small) < tool_tokens(large)
+    assert small.metadata["schema_tokens"] == tool_tokens(small)
+    assert large.metadata["schema_tokens"] == tool_tokens(large)
+
+
+def test_selection_fits_the_budget_and_keeps_pinned_tools():
+    tools = [
+        StructuredTool.from_function(func=lambda **kwargs: "", name=name, description="x" * size)
+        for name, size in (("search_tools", 40), ("big", 400), ("small", 40))
+    ]
+    budget = tool_tokens(tools[0]) + tool_tokens(tools[2])
+
+    selected, spent = select_tools(
+        tools, budget, relevance={"big": 1.0, "small": 0.1}, usage={}, pinned=["search_tools"],
+    )
+
+    assert [t.name for t in selected] == ["search_tools", "small"]
+    assert spent == budget
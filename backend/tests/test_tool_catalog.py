@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from app.services.Agent import tool_catalog
+from app.services.Agent.tool_catalog import build_tool_catalog, diff_tool_catalogs, load_tool_catalog
+
+TOOLS = [
+    {"name": "search_issues", "description": "Search issues", "argument_schema": {"type": "object"}, "annotations": None},
+    {"name": "create_issue", "description": None, "argument_schema": None, "annotations": None},
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    tool_catalog._CATALOG_CACHE.clear()
+    yield
+    tool_catalog._CATALOG_CACHE.clear()
+
+
+def test_catalog_entries_are_precomputed():
+    catalog = build_tool_catalog(TOOLS, "Git Hub")
+
+    [search, create] = catalog["tools"]
+    assert search["unique_name"] == "GitHub_search_issues"
+    assert search["description"] == "Search issues This tool is from the 'Git Hub' server."
+    assert create["description"].startswith("No description provided.")
+    assert "search" in search["bm25_tokens"]
+    assert catalog["content_hash"] == build_tool_catalog(TOOLS, "Git Hub")["content_hash"]
+
+
+def test_loaded_catalogs_are_interned_by_setting_and_version():
+    stored = json.dumps(build_tool_catalog(TOOLS, "GitHub"))
+
+    first = load_tool_catalog(stored, "GitHub", setting_id=7, manifest_version=2)
+    again = load_tool_catalog(stored, "GitHub", setting_id=7, manifest_version=2)
+    bumped = load_tool_catalog(stored, "GitHub", setting_id=7, manifest_version=3)
+
+    assert again is first
+    assert bumped is not first
+    assert list(tool_catalog._CATALOG_CACHE) == [(7, "GitHub", 2), (7, "GitHub", 3)]
+
+
+def test_catalog_is_rebuilt_from_the_manifest_for_a_renamed_server():
+    stored = json.dumps(build_tool_catalog(TOOLS, "GitHub"))
+
+    catalog = load_tool_catalog(stored, "Code", json.dumps(TOOLS), setting_id=7, manifest_version=2)
+
+    assert catalog["server_name"] == "Code"
+    assert catalog["tools"][0]["unique_name"] == "Code_search_issues"
+
+
+def test_catalog_without_row_identity_is_not_interned():
+    assert load_tool_catalog(None, "GitHub", json.dumps(TOOLS))["server_name"] == "GitHub"
+    assert load_tool_catalog(None, "GitHub", None, setting_id=7, manifest_version=1) is None
+    assert not tool_catalog._CATALOG_CACHE
+
+
+def test_diff_reports_added_removed_and_changed_tools():
+    old = build_tool_catalog(TOOLS, "GitHub")
+    new = build_tool_catalog(
+        [{**TOOLS[0], "description": "Search issues and pull requests"},
+         {"name": "close_issue", "description": "Close", "argument_schema": None}],
+        "GitHub",
+    )
+
+    assert diff_tool_catalogs(old, new) == {
+        "added": ["close_issue"], "removed": ["create_issue"], "changed": ["search_issues"],
+    }
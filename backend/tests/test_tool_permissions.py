@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.database.database import AsyncSessionLocal, Base, engine
+from app.models import ToolPermission
+from app.services.Agent.tools import build_tools_from_servers, fetch_tool_permissions
+
+USER_ID = "user-1"
+
+
+def _manifest(*names):
+    return json.dumps([
+        {"name": name, "description": f"{name} tool", "argument_schema": None, "annotations": None}
+        for name in names
+    ])
+
+
+SERVERS = {
+    "GitHub": {"id": 1, "url": "http://github.test/mcp", "manifest_version": 1,
+               "tools_manifest": _manifest("search_issues", "create_issue", "delete_repo")},
+    "Slack": {"id": 2, "url": "http://slack.test/mcp", "manifest_version": 1,
+              "tools_manifest": _manifest("post_message", "list_channels")},
+    "Notion": {"id": 3, "url": "http://notion.test/mcp", "manifest_version": 1,
+               "tools_manifest": _manifest("search_pages")},
+}
+
+
+def _run(coro):
+    async def _with_dispose():
+        try:
+            return await coro
+        finally:
+            # Pooled connections belong to this event loop
+            await engine.dispose()
+    return asyncio.run(_with_dispose())
+
+
+@pytest.fixture(autouse=True)
+def permissions_table():
+    async def _setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            db.add_all([
+                ToolPermission(user_id=USER_ID, server_setting_id=1, tool_name="delete_repo", is_enabled=False),
+                ToolPermission(user_id=USER_ID, server_setting_id=2, tool_name="post_message",
+                               is_enabled=True, cache_ttl_seconds=0, timeout_seconds=15),
+                ToolPermission(user_id="someone-else", server_setting_id=3, tool_name="search_pages",
+                               is_enabled=False),
+            ])
+            await db.commit()
+    _run(_setup())
+
+
+@pytest.fixture
+def statements():
+    """SQL statements executed against the test engine while the test runs."""
+    executed = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+
+
+def test_multi_server_build_runs_one_permission_query(statements):
+    tools = _run(build_tools_from_servers(SERVERS, user_id=USER_ID, blocking=False))
+
+    assert len(statements) == 1
+    assert "tool_permissions" in statements[0]
+    names = sorted(tool.name for tool in tools)
+    assert names == [
+        "GitHub_create_issue", "GitHub_search_issues",
+        "Notion_search_pages",
+        "Slack_list_channels", "Slack_post_message",
+    ]
+    post_message = next(tool for tool in tools if tool.name == "Slack_post_message")
+    assert post_message.call_settings == (0, 15)
+
+
+def test_build_with_preloaded_permissions_runs_no_query(statements):
+    permissions = _run(fetch_tool_permissions(USER_ID, [1, 2, 3]))
+    statements.clear()
+
+    tools = _run(build_tools_from_servers(SERVERS, user_id=USER_ID, blocking=False, tool_permissions=permissions))
+
+    assert statements == []
+    assert "GitHub_delete_repo" not in {tool.name for tool in tools}
+
+
+def test_permission_query_failure_fails_closed(monkeypatch, statements):
+    async def _fail(user_id, server_ids):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr("app.services.Agent.tools.fetch_tool_permissions", _fail)
+
+    assert _run(build_tools_from_servers(SERVERS, user_id=USER_ID, blocking=False)) == []
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.Agent.bm25_index import np
+from app.services.Agent.shared_index import shared_index_stats
+from app.services.Agent.tool_registry import ToolRegistry
+from app.services.Agent.tools import build_tools_from_servers, create_tool_search_tool
+
+SERVERS = {
+    "GitHub": {"id": 1, "url": "http://github.test/mcp", "manifest_version": 1, "tools_manifest": json.dumps([
+        {"name": "create_issue", "description": "Create a new issue in a repository"},
+        {"name": "search_issues", "description": "Search issues and pull requests"},
+        {"name": "merge_pull_request", "description": "Merge a pull request"},
+        {"name": "get_file_contents", "description": "Read a file from a repository"},
+    ])},
+    "Slack": {"id": 2, "url": "http://slack.test/mcp", "manifest_version": 1, "tools_manifest": json.dumps([
+        {"name": "post_message", "description": "Post a message to a channel"},
+        {"name": "list_users", "description": "List the members of the workspace"},
+    ])},
+}
+
+QUERIES = ["open a ticket", "search issues", "send a message to the team", "who are the members", "merge my PR"]
+
+
+class _Tool:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+
+
+def _registries():
+    """A registry of catalog descriptors (shared indexes) and a private one over the same tools."""
+    descriptors = asyncio.run(build_tools_from_servers(SERVERS, user_id="user-1", tool_permissions={}))
+    shared = ToolRegistry()
+    shared.register_tools(descriptors)
+    private = ToolRegistry()
+    private.register_tools([_Tool(d.name, d.description) for d in descriptors])
+    return shared, private
+
+
+needs_numpy = pytest.mark.skipif(np is None, reason="needs NumPy")
+
+
+@pytest.mark.parametrize("mode", ["bm25", pytest.param("hybrid", marks=needs_numpy)])
+def test_shared_indexes_rank_like_a_private_index(mode, monkeypatch):
+    monkeypatch.setattr("app.services.Agent.tool_registry.AGENT_TOOL_SEARCH_MODE", mode)
+    shared, private = _registries()
+
+    assert shared_index_stats()["catalogs"] >= 2
+    for query in QUERIES:
+        assert [t.name for t in shared.search(query, mode=mode)] == [t.name for t in private.search(query, mode=mode)]
+        expected = private.relevance_scores(query)
+        actual = shared.relevance_scores(query)
+        assert actual.keys() == expected.keys()
+        for name, score in expected.items():
+            assert actual[name] == pytest.approx(score)
+
+
+@needs_numpy
+def test_shared_and_private_tools_get_the_same_vectors():
+    shared, private = _registries()
+
+    for query in QUERIES + ["github", "slack"]:
+        expected = dict(private._dense_ranking(query, 10))
+        actual = dict(shared._dense_ranking(query, 10))
+        assert actual.keys() == expected.keys()
+        for name, similarity in expected.items():
+            assert actual[name] == pytest.approx(similarity)
+
+
+def test_disabled_tools_are_hidden_from_shared_search():
+    descriptors = asyncio.run(build_tools_from_servers(SERVERS, user_id="user-1", tool_permissions={}))
+    registry = ToolRegistry()
+    registry.register_tools(descriptors)
+
+    registry.remove_tools(["Slack_post_message"])
+
+    assert "Slack_post_message" not in {t.name for t in registry.search("post a message", mode="bm25")}
+
+
+def test_search_tool_returns_the_same_json_sync_and_async():
+    shared, _ = _registries()
+    search_tool = create_tool_search_tool(shared, "user-1")
+
+    sync_result = search_tool.invoke({"query": "search issues"})
+    async_result = asyncio.run(search_tool.ainvoke({"query": "search issues"}))
+
+    assert sync_result == async_result
+    best = json.loads(sync_result)[0]
+    assert best == {
+        "name": "GitHub_search_issues",
+        "description": shared.get_descriptor("GitHub_search_issues").description,
+    }